@@ -3,28 +3,145 @@ Autonity RPC Client
 """
 
 import sys
+from typing import Any
 
-from autonity.contracts.autonity import __version__ as protocol_version
-from click import group, option, version_option
-
-from .commands import (
-    account,
-    block,
-    contract,
-    governance,
-    node,
-    protocol,
-    token,
-    tx,
-    validator,
-)
+from click import ClickException, Context, Parameter, echo, group, option
+
+from . import daemon
+from .__version__ import __version__
+from .lazy_group import LazyCommand, LazyGroup
 from .logging import enable_logging
+from .options import NDJSON_OUTPUT, ndjson_output_requested, output_option
+
+# Command groups are only imported when invoked, so that simple commands do not
+# pay the cost of importing the dependencies of every other command.
+LAZY_SUBCOMMANDS = {
+    "node": LazyCommand(
+        "autonity_cli.commands.node:node_group",
+        "Commands related to querying specific Autonity nodes.",
+    ),
+    "block": LazyCommand(
+        "autonity_cli.commands.block:block_group",
+        "Commands for querying block information.",
+    ),
+    "tx": LazyCommand(
+        "autonity_cli.commands.tx:tx_group",
+        "Commands for transaction creation and processing.",
+    ),
+    "protocol": LazyCommand(
+        "autonity_cli.commands.protocol:protocol_group",
+        "Commands related to Autonity-specific protocol operations.",
+    ),
+    "governance": LazyCommand(
+        "autonity_cli.commands.governance:governance_group",
+        "Commands that can only be called by the governance operator account.",
+    ),
+    "validator": LazyCommand(
+        "autonity_cli.commands.validator:validator",
+        "Commands related to the validators.",
+    ),
+    "account": LazyCommand(
+        "autonity_cli.commands.account:account_group",
+        "Commands related to specific accounts.",
+    ),
+    "token": LazyCommand(
+        "autonity_cli.commands.token:token_group",
+        "Commands for working with ERC20 tokens.",
+    ),
+    "contract": LazyCommand(
+        "autonity_cli.commands.contract:contract_group",
+        "Commands for interacting with arbitrary contracts.",
+    ),
+    "cache": LazyCommand(
+        "autonity_cli.commands.cache:cache_group",
+        "Commands for the cache of chain metadata.",
+    ),
+    "nonce": LazyCommand(
+        "autonity_cli.commands.nonce:nonce_group",
+        "Commands for the local nonce manager.",
+    ),
+    "index": LazyCommand(
+        "autonity_cli.commands.index:index_group",
+        "Commands for the local index of token event logs.",
+    ),
+    "agent": LazyCommand(
+        "autonity_cli.commands.agent:agent",
+        "Hold decrypted keys, and sign on behalf of other `aut` processes.",
+    ),
+    "serve": LazyCommand(
+        "autonity_cli.commands.serve:serve",
+        "Run commands on behalf of other `aut` processes.",
+    ),
+    "shell": LazyCommand(
+        "autonity_cli.commands.shell:shell",
+        "Run commands interactively in a single process.",
+    ),
+}
 
+# Commands which always run in the current process, even with --via-daemon.
+LOCAL_COMMANDS = {"agent", "serve", "shell"}
 
-@group(context_settings=dict(help_option_names=["-h", "--help"]))
+
+class AutGroup(LazyGroup):
+    """
+    The top-level group.  If --via-daemon is given, the command line is sent
+    to an `aut serve` process before any subcommand is loaded.
+    """
+
+    def invoke(self, ctx: Context) -> Any:
+        args = [*ctx.protected_args, *ctx.args]
+        if ctx.params["via_daemon"] and args and args[0] not in LOCAL_COMMANDS:
+            if ctx.params["verbose"]:
+                args.insert(0, "--verbose")
+            if ndjson_output_requested():
+                args[0:0] = ["--output", NDJSON_OUTPUT]
+            try:
+                ctx.exit(daemon.forward(daemon.get_socket_path(None), args))
+            except daemon.DaemonError as exc:
+                raise ClickException(str(exc)) from exc
+
+        return super().invoke(ctx)
+
+
+def _print_version(ctx: Context, _param: Parameter, value: bool) -> None:
+    """
+    Callback for the --version flag.  Loads the protocol version only when it
+    is requested.
+    """
+    if not value or ctx.resilient_parsing:
+        return
+
+    from autonity.contracts.autonity import __version__ as protocol_version
+
+    echo(f"Autonity CLI v{__version__} (Protocol {protocol_version})")
+    ctx.exit()
+
+
+@group(
+    cls=AutGroup,
+    lazy_subcommands=LAZY_SUBCOMMANDS,
+    context_settings=dict(help_option_names=["-h", "--help"]),
+)
 @option("--verbose", "-v", is_flag=True, help="Enable additional output (to stderr)")
-@version_option(message=f"Autonity CLI v%(version)s (Protocol {protocol_version})")
-def aut(verbose: bool) -> None:
+@option(
+    "--via-daemon",
+    is_flag=True,
+    envvar=daemon.VIA_DAEMON_ENV_VAR,
+    help=(
+        "Run the command in an `aut serve` process (listening on "
+        f"{daemon.SOCKET_ENV_VAR} or {daemon.DEFAULT_SOCKET_PATH})."
+    ),
+)
+@output_option
+@option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=_print_version,
+    help="Show the version and exit.",
+)
+def aut(verbose: bool, via_daemon: bool) -> None:
     """
     Command line interface to interact with Autonity.
     """
@@ -34,14 +151,3 @@ def aut(verbose: bool) -> None:
     else:
         # Do not print the full callstack
         sys.tracebacklimit = 0
-
-
-aut.add_command(node.node_group)
-aut.add_command(block.block_group)
-aut.add_command(tx.tx_group)
-aut.add_command(protocol.protocol_group)
-aut.add_command(governance.governance_group)
-aut.add_command(validator.validator)
-aut.add_command(account.account_group)
-aut.add_command(token.token_group)
-aut.add_command(contract.contract_group)
@@ -0,0 +1,321 @@
+"""
+Server and client for the `aut agent` process, which holds keys decrypted
+from keyfiles and signs on behalf of other `aut` processes, so that the
+(deliberately expensive) key derivation of a keyfile is only performed once.
+
+When AUT_AGENT_SOCK is set, keyfile signing first asks the agent listening
+on that socket.  If the agent does not hold the key, the keyfile is
+decrypted locally and the key is added to the agent, which keeps it for its
+TTL.  Each connection carries exactly one JSON request and one JSON reply.
+
+The agent disables core dumps of its process, and only serves processes of
+the same user, checked with the peer credentials of each connection
+(SO_PEERCRED on Linux, getpeereid on macOS and the BSDs).  It refuses to
+start where neither is available.  Between requests, each key is held in a
+buffer which is locked into memory (so that it is not swapped out) and
+zeroed when the key expires.  This limits, but does not prevent, copies of
+the key in ordinary memory: keys are received as JSON strings, and signing
+(via eth_account) works on Python copies of the key which are neither
+locked nor zeroed, and remain until the garbage collector reuses them.
+"""
+
+import ctypes
+import ctypes.util
+import functools
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional, cast
+
+from .logging import log
+
+AGENT_SOCKET_ENV_VAR = "AUT_AGENT_SOCK"
+DEFAULT_AGENT_SOCKET_PATH = "~/.autonity/agent.sock"
+DEFAULT_KEY_TTL = 15 * 60
+"""
+Default time for which the agent holds a key, in seconds.
+"""
+
+REQUEST_TIMEOUT = 10.0
+
+KEY_NOT_HELD = "key not held by agent"
+
+_PR_SET_DUMPABLE = 4
+
+
+class AgentError(Exception):
+    """
+    Failure to communicate with the `aut agent` process, or a request it
+    rejected.
+    """
+
+
+class KeyNotHeldError(AgentError):
+    """
+    The agent does not hold the key for a signing request.
+    """
+
+
+def get_agent_socket_path() -> Optional[str]:
+    """
+    The socket of the agent to use for signing, if AUT_AGENT_SOCK is set.
+    """
+    socket_path = os.getenv(AGENT_SOCKET_ENV_VAR)
+    return os.path.expanduser(socket_path) if socket_path else None
+
+
+def request(socket_path: str, agent_request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send a request to the agent listening on `socket_path`, returning the
+    reply.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(agent_request).encode("utf8"))
+            sock.shutdown(socket.SHUT_WR)
+            reply = json.loads(_read_all(sock))
+    except (OSError, ValueError) as exc:
+        raise AgentError(f"cannot use aut agent at {socket_path}: {exc}") from exc
+
+    if reply.get("error") == KEY_NOT_HELD:
+        raise KeyNotHeldError(KEY_NOT_HELD)
+    if "error" in reply:
+        raise AgentError(reply["error"])
+    return reply
+
+
+def serve(socket_path: str, ttl: float) -> None:
+    """
+    Listen on `socket_path`, serving requests until interrupted.
+    """
+
+    protect_process_memory()
+    with create_server(socket_path, ttl) as server:
+        try:
+            server.serve_forever()
+        finally:
+            server.remove_all_keys()
+            os.unlink(socket_path)
+
+
+def create_server(socket_path: str, ttl: float) -> "AgentServer":
+    """
+    Create an agent listening on `socket_path`, holding keys for `ttl`
+    seconds.
+    """
+
+    if not peer_credentials_supported():
+        raise AgentError(
+            "cannot check the user of connecting processes on this platform, "
+            "so the agent cannot restrict signing to the current user"
+        )
+
+    socket_dir = os.path.dirname(socket_path)
+    if socket_dir:
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            raise AgentError(f"aut agent already listening at {socket_path}")
+        os.unlink(socket_path)
+
+    # Only the current user may connect.  The socket is created with these
+    # permissions, so there is no window in which others can connect.
+    old_umask = os.umask(0o177)
+    try:
+        return AgentServer(socket_path, ttl)
+    finally:
+        os.umask(old_umask)
+
+
+def peer_credentials_supported() -> bool:
+    """
+    True if the uid of the process at the other end of a unix socket can be
+    determined on this platform.
+    """
+    return hasattr(socket, "SO_PEERCRED") or hasattr(_libc(), "getpeereid")
+
+
+def protect_process_memory() -> None:
+    """
+    Prevent the process from dumping core, and from being traced by other
+    (non-root) processes, so that its keys cannot be read by those means.
+    """
+    if sys.platform.startswith("linux"):
+        if _libc().prctl(_PR_SET_DUMPABLE, 0, 0, 0, 0) != 0:
+            log(f"failed to disable core dumps: {os.strerror(ctypes.get_errno())}")
+
+
+class LockedKey:
+    """
+    A private key held in memory which is locked (with `mlock`) so that it
+    cannot be swapped out, and which is zeroed by `wipe`.  `key` returns an
+    ordinary (unlocked) copy, for signing.
+    """
+
+    def __init__(self, key: bytes):
+        self._buffer = ctypes.create_string_buffer(len(key))
+        self._locked = _libc().mlock(ctypes.addressof(self._buffer), len(key)) == 0
+        if not self._locked:
+            log(f"failed to lock key in memory: {os.strerror(ctypes.get_errno())}")
+        ctypes.memmove(self._buffer, key, len(key))
+
+    @property
+    def key(self) -> bytes:
+        return self._buffer.raw
+
+    def wipe(self) -> None:
+        size = len(self._buffer)
+        ctypes.memset(self._buffer, 0, size)
+        if self._locked:
+            _libc().munlock(ctypes.addressof(self._buffer), size)
+            self._locked = False
+
+
+class AgentServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server holding decrypted keys, by address, until they
+    expire.
+    """
+
+    def __init__(self, socket_path: str, ttl: float):
+        super().__init__(socket_path, _RequestHandler)
+        self.ttl = ttl
+        self.keys: Dict[str, LockedKey] = {}
+        self.expiry_times: Dict[str, float] = {}
+
+    def service_actions(self) -> None:
+        # Called by serve_forever between requests.
+        self.remove_expired_keys()
+
+    def add_key(self, key: bytes) -> str:
+        """
+        Hold `key` for the TTL, returning its address.
+        """
+        from eth_account import Account
+
+        address = Account.from_key(key).address
+        self.remove_key(address)
+        self.keys[address] = LockedKey(key)
+        self.expiry_times[address] = time.monotonic() + self.ttl
+        log(f"added key for {address}")
+        return address
+
+    def remove_key(self, address: str) -> None:
+        locked_key = self.keys.pop(address, None)
+        self.expiry_times.pop(address, None)
+        if locked_key is not None:
+            locked_key.wipe()
+            log(f"removed key for {address}")
+
+    def remove_expired_keys(self) -> None:
+        now = time.monotonic()
+        for address, expiry_time in list(self.expiry_times.items()):
+            if expiry_time <= now:
+                self.remove_key(address)
+
+    def remove_all_keys(self) -> None:
+        for address in list(self.keys):
+            self.remove_key(address)
+
+    def execute(self, agent_request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a request received from a client, returning the reply.
+        """
+
+        from eth_account import Account
+        from eth_account.messages import encode_defunct
+
+        self.remove_expired_keys()
+        op = agent_request.get("op")
+        if op == "add":
+            address = self.add_key(bytes.fromhex(agent_request["key"]))
+            return {"address": address}
+        if op == "list":
+            return {"addresses": sorted(self.keys)}
+
+        locked_key = self.keys.get(agent_request.get("address", ""))
+        if locked_key is None:
+            return {"error": KEY_NOT_HELD}
+        account = Account.from_key(locked_key.key)
+        if op == "sign_transaction":
+            signed_tx = account.sign_transaction(agent_request["tx"])
+            return {
+                "signed_tx": {
+                    "raw_transaction": signed_tx.raw_transaction.hex(),
+                    "hash": signed_tx.hash.hex(),
+                    "r": signed_tx.r,
+                    "s": signed_tx.s,
+                    "v": signed_tx.v,
+                }
+            }
+        if op == "sign_message":
+            signable = encode_defunct(text=agent_request["message"])
+            return {"signature": account.sign_message(signable).signature.hex()}
+        return {"error": f"unknown request {op!r}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    timeout = REQUEST_TIMEOUT
+
+    def handle(self) -> None:
+        request_data = self.rfile.read()
+        peer_uid = _peer_uid(self.connection)
+        if peer_uid != os.getuid():
+            log(f"rejected connection from uid {peer_uid}")
+            reply: Dict[str, Any] = {"error": "permission denied"}
+        else:
+            try:
+                server = cast(AgentServer, self.server)
+                reply = server.execute(json.loads(request_data))
+            except Exception as exc:
+                reply = {"error": f"invalid request: {exc}"}
+        self.wfile.write(json.dumps(reply).encode("utf8"))
+
+
+def _peer_uid(sock: socket.socket) -> Optional[int]:
+    """
+    The uid of the process at the other end of a unix socket, using
+    SO_PEERCRED (Linux) or getpeereid (macOS and the BSDs), or None if it
+    cannot be determined.
+    """
+    if hasattr(socket, "SO_PEERCRED"):
+        ucred_size = struct.calcsize("3i")
+        ucred = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, ucred_size)
+        _pid, uid, _gid = struct.unpack("3i", ucred)
+        return uid
+
+    if not hasattr(_libc(), "getpeereid"):
+        return None
+    uid = ctypes.c_uint32()
+    gid = ctypes.c_uint32()
+    if _libc().getpeereid(sock.fileno(), ctypes.byref(uid), ctypes.byref(gid)) != 0:
+        log(f"getpeereid failed: {os.strerror(ctypes.get_errno())}")
+        return None
+    return uid.value
+
+
+@functools.cache
+def _libc() -> ctypes.CDLL:
+    return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+def _read_all(sock: socket.socket) -> bytes:
+    chunks: List[bytes] = []
+    while chunk := sock.recv(65536):
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
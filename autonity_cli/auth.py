@@ -1,9 +1,8 @@
 import json
 from contextlib import contextmanager
-from typing import Iterator, Optional, Protocol, cast
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Protocol, cast
 
 import click
-import trezorlib.ethereum as trezor_eth
 from eth_account import Account
 from eth_account._utils.legacy_transactions import (
     encode_transaction,
@@ -17,14 +16,15 @@ from eth_typing import ChecksumAddress
 from eth_utils.conversions import to_int
 from eth_utils.crypto import keccak
 from hexbytes import HexBytes
-from trezorlib.exceptions import Cancelled
-from trezorlib.messages import Features
-from trezorlib.tools import parse_path
 from web3.types import TxParams
 
-from . import config, device
+from . import agent, config, device, session
+from .keystore_index import find_keyfile
 from .logging import log
-from .utils import to_checksum_address
+from .utils import to_checksum_address, to_json
+
+if TYPE_CHECKING:
+    from trezorlib.messages import Features
 
 
 class Authenticator(Protocol):
@@ -38,6 +38,9 @@ class Authenticator(Protocol):
 
 
 class KeyfileAuthenticator:
+    # If AUT_AGENT_SOCK is set, signing is delegated to the `aut agent`,
+    # which is given the key once this process has decrypted it.
+
     def __init__(self, keyfile: str):
         self.keyfile = keyfile
 
@@ -48,28 +51,77 @@ class KeyfileAuthenticator:
             raise RuntimeError("Unrecognized keyfile format.")
         self.address = to_checksum_address(keyfile_addr)
         self._account: LocalAccount | None = None
+        self.agent_socket_path = agent.get_agent_socket_path()
 
     @property
     def account(self) -> LocalAccount:
+        if self._account is None:
+            self._account = session.get_decrypted_account(self.keyfile)
         if self._account is None:
             password = config.get_keyfile_password(None, self.keyfile)
             privkey = Account.decrypt(self.keydata, password=password)
             self._account = cast(LocalAccount, Account.from_key(privkey))
+            session.add_decrypted_account(self.keyfile, self._account)
+            self._agent_request({"op": "add", "key": privkey.hex()})
         return self._account
 
     def sign_transaction(self, params: TxParams) -> SignedTransaction:
+        reply = self._agent_request(
+            {"op": "sign_transaction", "tx": json.loads(to_json(params))}
+        )
+        if reply is not None:
+            signed_tx = reply["signed_tx"]
+            return SignedTransaction(
+                raw_transaction=HexBytes(signed_tx["raw_transaction"]),
+                hash=HexBytes(signed_tx["hash"]),
+                r=signed_tx["r"],
+                s=signed_tx["s"],
+                v=signed_tx["v"],
+            )
         return self.account.sign_transaction(cast(TransactionDictType, params))
 
     def sign_message(self, message: str) -> bytes:
+        reply = self._agent_request({"op": "sign_message", "message": message})
+        if reply is not None:
+            return bytes.fromhex(reply["signature"])
         signable = encode_defunct(text=message)
         return self.account.sign_message(signable)["signature"]
 
+    def _agent_request(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Send a request for this key to the agent, if one is in use and this
+        process has not already decrypted the key.  None if the agent does
+        not hold the key, or cannot be used (in which case it is not used
+        again).
+        """
+        if self.agent_socket_path is None:
+            return None
+        if request["op"] != "add" and self._account is not None:
+            return None
+        try:
+            return agent.request(
+                self.agent_socket_path, {**request, "address": self.address}
+            )
+        except agent.KeyNotHeldError:
+            return None
+        except agent.AgentError as exc:
+            log(f"not using agent: {exc}")
+            self.agent_socket_path = None
+            return None
+
     def shutdown(self):
         pass
 
 
 class TrezorAuthenticator:
+    # trezorlib (and its USB transport) is only imported when a Trezor is
+    # actually used, so that keyfile users do not pay the import cost.
+
     def __init__(self, path_or_index: str):
+        import trezorlib.ethereum as trezor_eth
+        from trezorlib.exceptions import Cancelled
+        from trezorlib.tools import parse_path
+
         if path_or_index.isdigit():
             path_str = f"{device.TREZOR_DEFAULT_PREFIX}/{int(path_or_index)}"
         else:
@@ -92,12 +144,15 @@ class TrezorAuthenticator:
         self.address = to_checksum_address(address_str)
         self.path_str = path_str
 
-    def device_info(self, features: Features) -> str:
+    def device_info(self, features: "Features") -> str:
         model = str(features.model) or "1"
         label = features.label or "(none)"
         return f"model='{model}', device_id='{features.device_id}', label='{label}'"
 
     def sign_transaction(self, params: "TxParams") -> SignedTransaction:
+        import trezorlib.ethereum as trezor_eth
+        from trezorlib.exceptions import Cancelled
+
         assert "chainId" in params
         assert "gas" in params
         assert "nonce" in params
@@ -154,6 +209,8 @@ class TrezorAuthenticator:
         )
 
     def sign_message(self, message: str) -> bytes:
+        import trezorlib.ethereum as trezor_eth
+
         sigdata = trezor_eth.sign_message(
             self.client,
             self.path,
@@ -167,7 +224,7 @@ class TrezorAuthenticator:
 
 @contextmanager
 def authenticator(
-    *, keyfile: Optional[str], trezor: Optional[str]
+    *, keyfile: Optional[str], trezor: Optional[str], address: Optional[str] = None
 ) -> Iterator[Authenticator]:
     if trezor and keyfile:
         raise RuntimeError("Expected at most one authentication method.")
@@ -175,6 +232,8 @@ def authenticator(
         log(f"using Trezor: {trezor}")
         auth = TrezorAuthenticator(trezor)
     else:
+        if keyfile is None and address:
+            keyfile = keystore_keyfile(to_checksum_address(address))
         log(f"using key file: {keyfile}")
         keyfile = config.get_keyfile(keyfile)
         auth = KeyfileAuthenticator(keyfile)
@@ -184,6 +243,22 @@ def authenticator(
         auth.shutdown()
 
 
+def keystore_keyfile(address: ChecksumAddress) -> str:
+    """
+    The keyfile for `address` in the keystore, found via the keystore index.
+    """
+    keystore_dir = config.get_keystore_directory(None)
+    try:
+        keyfile = find_keyfile(keystore_dir, address)
+    except FileNotFoundError:
+        keyfile = None
+    if keyfile is None:
+        raise click.ClickException(
+            f"No keyfile for {address} in keystore {keystore_dir}"
+        )
+    return keyfile
+
+
 def validate_authenticator_account(
     address: Optional[str],
     keyfile: Optional[str],
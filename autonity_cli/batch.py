@@ -0,0 +1,56 @@
+"""
+Helpers for sending many RPC requests as JSON-RPC batches.
+"""
+
+from typing import Any, Callable, List, Sequence
+
+from web3 import LegacyWebSocketProvider, Web3
+
+from .logging import log
+
+DEFAULT_BATCH_SIZE = 100
+"""
+Default maximum number of requests per JSON-RPC batch.  Nodes typically limit
+the size of batches (e.g. 1000 requests by default for geth-based nodes).
+"""
+
+Request = Callable[[], Any]
+"""
+A function which makes a single request via a Web3 object, e.g.
+`lambda: w3.eth.get_balance(address)`.  Contract calls must call `.call()`
+explicitly.
+"""
+
+
+def batch_requests(
+    w3: Web3, requests: Sequence[Request], batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[Any]:
+    """
+    Make the given requests, in batches of at most `batch_size` requests, and
+    return the results in order.  If `batch_size` is less than 2, the
+    requests are made one at a time.
+    """
+
+    if batch_size < 2:
+        return [request() for request in requests]
+
+    results: List[Any] = []
+    for start in range(0, len(requests), batch_size):
+        with w3.batch_requests() as batch:
+            for request in requests[start : start + batch_size]:
+                batch.add(request())
+            results.extend(batch.execute())
+
+    return results
+
+
+def max_concurrent_requests(w3: Web3, max_in_flight: int) -> int:
+    """
+    The number of requests which may be made concurrently (from different
+    threads) via `w3`: `max_in_flight`, or 1 for WebSocket providers, whose
+    single connection cannot be shared between threads.
+    """
+    if max_in_flight > 1 and isinstance(w3.provider, LegacyWebSocketProvider):
+        log("WebSocket endpoint: making one request at a time")
+        return 1
+    return max_in_flight
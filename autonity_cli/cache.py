@@ -0,0 +1,224 @@
+"""
+Persistent, on-disk cache of chain metadata which (for a given chain) does not
+change, such as the chain ID and the decimals of a token, so that commands do
+not request it from the node every time.
+
+Entries are stored per chain, in a JSON file named after the chain's genesis
+hash, so that they are shared by all endpoints of that chain.  The genesis
+hash of each endpoint is itself cached, but only for `GENESIS_HASH_TTL`, so
+that a chain which is reset behind the same endpoint is soon noticed, while
+commands run in quick succession do not request it every time.  Every entry
+expires after the cache TTL, and the whole cache can be removed with `aut
+cache clear`.
+"""
+
+import json
+import os
+import os.path
+import shutil
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Mapping, Optional, TypeVar, cast
+
+from click import ClickException
+from eth_typing import ChecksumAddress
+
+from .logging import log
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+    from .erc20 import ERC20
+
+DEFAULT_CACHE_DIRECTORY = "~/.cache/aut"
+CACHE_DIRECTORY_ENV_VAR = "AUT_CACHE_DIR"
+CACHE_TTL_ENV_VAR = "AUT_CACHE_TTL"
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60
+"""
+Default lifetime of cache entries, in seconds.
+"""
+
+GENESIS_HASH_TTL = 5 * 60
+"""
+Lifetime of the cached genesis hash of each endpoint, in seconds.  A chain
+reset behind the same endpoint is noticed after at most this long.
+"""
+
+ENDPOINTS_FILE_NAME = "endpoints.json"
+
+T = TypeVar("T")
+
+genesis_hashes: Dict[str, str] = {}
+"""
+Genesis hash of each endpoint used by this process.
+"""
+
+
+def get_cache_directory() -> str:
+    """
+    Directory holding the cache, from the env var, falling back to the
+    default.
+    """
+    return os.path.expanduser(
+        os.getenv(CACHE_DIRECTORY_ENV_VAR, DEFAULT_CACHE_DIRECTORY)
+    )
+
+
+def get_cache_ttl() -> float:
+    """
+    Lifetime of cache entries in seconds, from the env var, falling back to
+    the default.  A value of 0 disables the cache.
+    """
+    ttl = os.getenv(CACHE_TTL_ENV_VAR)
+    if ttl is None:
+        return DEFAULT_CACHE_TTL
+    try:
+        return float(ttl)
+    except ValueError as exc:
+        raise ClickException(
+            f"invalid {CACHE_TTL_ENV_VAR} value '{ttl}' (expected seconds)"
+        ) from exc
+
+
+def cached(w3: "Web3", key: str, fetch: Callable[[], T]) -> T:
+    """
+    The value of `key` for the chain that `w3` is connected to, calling
+    `fetch` (and caching the result) if there is no unexpired entry.  Values
+    must be representable in JSON.
+    """
+
+    ttl = get_cache_ttl()
+    endpoint = provider_endpoint(w3)
+    if ttl <= 0 or endpoint is None:
+        return fetch()
+
+    genesis_hash = genesis_hashes.get(endpoint)
+    if genesis_hash is None:
+        genesis_hash = genesis_hashes[endpoint] = _lookup(
+            ENDPOINTS_FILE_NAME,
+            endpoint,
+            min(ttl, GENESIS_HASH_TTL),
+            lambda: _genesis_hash(w3),
+        )
+    return _lookup(f"{genesis_hash}.json", key, ttl, fetch)
+
+
+def chain_id(w3: "Web3") -> int:
+    """
+    The (cached) chain ID.
+    """
+    return cached(w3, "chain_id", lambda: w3.eth.chain_id)
+
+
+def token_decimals(
+    w3: "Web3", token: ChecksumAddress, fetch: Optional[Callable[[], int]] = None
+) -> int:
+    """
+    The (cached) `decimals` of an ERC20 token.  On a cache miss, `fetch` (by
+    default, a call to the token) requests the value.
+    """
+    return cached(
+        w3, f"decimals:{token}", fetch or (lambda: _erc20(w3, token).decimals())
+    )
+
+
+def token_name(w3: "Web3", token: ChecksumAddress) -> str:
+    """
+    The (cached) `name` of an ERC20 token.
+    """
+    return cached(w3, f"name:{token}", lambda: _erc20(w3, token).name())
+
+
+def token_symbol(w3: "Web3", token: ChecksumAddress) -> str:
+    """
+    The (cached) `symbol` of an ERC20 token.
+    """
+    return cached(w3, f"symbol:{token}", lambda: _erc20(w3, token).symbol())
+
+
+def clear_cache() -> None:
+    """
+    Remove all cache entries.
+    """
+    cache_dir = get_cache_directory()
+    log(f"removing {cache_dir}")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def provider_endpoint(w3: "Web3") -> Optional[str]:
+    """
+    The endpoint (URI or IPC path) of the provider, if it has one.
+    """
+    endpoint = getattr(w3.provider, "endpoint_uri", None)
+    if endpoint is not None:
+        return str(endpoint)
+    ipc_path = getattr(w3.provider, "ipc_path", None)
+    return None if ipc_path is None else os.path.abspath(ipc_path)
+
+
+def _genesis_hash(w3: "Web3") -> str:
+    # Imported here, since only the header is needed.
+    from .user import get_block_header
+
+    genesis_hash = get_block_header(w3, 0).get("hash")
+    if genesis_hash is None:
+        raise ValueError("cannot determine genesis hash")
+    return genesis_hash.to_0x_hex()
+
+
+def _erc20(w3: "Web3", token: ChecksumAddress) -> "ERC20":
+    # Imported here, since the binding is only needed on a cache miss.
+    from .erc20 import ERC20
+
+    return ERC20(w3, token)
+
+
+def _lookup(file_name: str, key: str, ttl: float, fetch: Callable[[], T]) -> T:
+    """
+    Look up `key` in a cache file, calling `fetch` and writing the result to
+    the file if there is no entry younger than `ttl`.
+    """
+
+    file_path = os.path.join(get_cache_directory(), file_name)
+    entries = read_json_file(file_path)
+    now = time.time()
+    entry = entries.get(key)
+    if entry is not None and now - entry["time"] < ttl:
+        return cast(T, entry["value"])
+
+    value = fetch()
+    entries[key] = {"value": value, "time": now}
+    write_json_file(file_path, entries)
+    return value
+
+
+def read_json_file(file_path: str) -> Dict[str, Any]:
+    """
+    The contents of a JSON file written by `write_json_file`, or an empty
+    dictionary if the file does not exist or cannot be read.
+    """
+    try:
+        with open(file_path, "r", encoding="utf8") as cache_f:
+            return json.load(cache_f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        log(f"ignoring unreadable cache file {file_path}: {exc}")
+        return {}
+
+
+def write_json_file(file_path: str, contents: Mapping[str, Any]) -> None:
+    """
+    Replace the file atomically, so that concurrent readers never see a
+    partially written file.  Failures are logged, since the cache is only an
+    optimization.
+    """
+    try:
+        cache_dir = os.path.dirname(file_path)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as cache_f:
+            cache_f.write(json.dumps(contents))
+        os.replace(tmp_path, file_path)
+    except OSError as exc:
+        log(f"failed to write cache file {file_path}: {exc}")
@@ -1,4 +1,3 @@
-import getpass
 import json
 from typing import List, Optional
 
@@ -10,43 +9,48 @@ from eth_account import Account
 from eth_account.messages import encode_defunct
 from hexbytes import HexBytes
 from web3 import Web3
-from web3.types import BlockIdentifier
 
-from .. import config, device
+from .. import config, device, erc20
 from ..auth import (
     authenticator,
     validate_authenticator_account,
 )
+from ..batch import DEFAULT_BATCH_SIZE
 from ..denominations import (
     format_auton_quantity,
     format_newton_quantity,
     format_quantity,
 )
-from ..erc20 import ERC20
 from ..keyfile import (
     PrivateKey,
     create_keyfile_from_private_key,
     get_address_from_keyfile,
 )
+from ..keystore_index import scan_keystore
 from ..logging import log
+from ..multicall import call_with_decimals
 from ..options import (
     authentication_options,
     from_options,
     keyfile_option,
     keystore_option,
+    ndjson_output_requested,
     newton_or_token_option,
     optgroup,
     rpc_endpoint_option,
 )
-from ..user import get_account_stats
+from ..session import prompt_secret
+from ..user import iter_account_stats
 from ..utils import (
-    address_keyfile_dict,
     load_from_file_or_stdin,
     load_from_file_or_stdin_line,
     new_keyfile_from_options,
     newton_or_token_to_address,
+    print_list,
+    print_ndjson,
     prompt_for_new_password,
     to_json,
+    validate_block_identifier,
     web3_from_endpoint_arg,
 )
 
@@ -61,6 +65,11 @@ def account_group() -> None:
 @account_group.command(name="list")
 @optgroup.group("Keyfile accounts")
 @keystore_option(cls=optgroup.option)
+@optgroup.option(
+    "--rebuild-index",
+    is_flag=True,
+    help="Rebuild the keystore index, reading every keyfile",
+)
 @optgroup.group("Trezor accounts")
 @optgroup.option("--trezor", is_flag=True, help="Enumerate Trezor accounts")
 @optgroup.option(
@@ -85,10 +94,19 @@ def account_group() -> None:
     help="Number of Trezor accounts to list",
 )
 def list_cmd(
-    keystore: Optional[str], trezor: bool, prefix: str, start: int, n: int
+    keystore: Optional[str],
+    rebuild_index: bool,
+    trezor: bool,
+    prefix: str,
+    start: int,
+    n: int,
 ) -> None:
     """
     List accounts in keyfiles or in a Trezor device.
+
+    Keyfile accounts are read from an index of the keystore, which is
+    refreshed for keyfiles added, removed or modified since it was written.
+    Accounts are output as they are found.
     """
 
     if trezor and keystore:
@@ -100,9 +118,13 @@ def list_cmd(
         accounts = device.enumerate_accounts(prefix, start, n)
     else:
         keystore = config.get_keystore_directory(keystore)
-        accounts = address_keyfile_dict(keystore).items()
+        accounts = scan_keystore(keystore, rebuild_index)
+    ndjson = ndjson_output_requested()
     for addr, path in accounts:
-        print(addr + " " + path)
+        if ndjson:
+            print_ndjson({"address": addr, "path": path})
+        else:
+            print(addr + " " + path)
 
 
 @account_group.command()
@@ -110,7 +132,17 @@ def list_cmd(
 @authentication_options()
 @option(
     "--asof",
-    help="state as of TAG, one of block number, 'latest', 'earliest', or 'pending'.",
+    help=(
+        "state as of TAG, one of block number, block hash, 'latest', 'earliest', "
+        "or 'pending'."
+    ),
+)
+@option(
+    "--batch-size",
+    type=int,
+    default=DEFAULT_BATCH_SIZE,
+    show_default=True,
+    help="maximum number of RPC requests per JSON-RPC batch (0 to disable batching).",
 )
 @argument("accounts", nargs=-1)
 def info(
@@ -118,7 +150,8 @@ def info(
     keyfile: Optional[str],
     trezor: Optional[str],
     accounts: List[str],
-    asof: Optional[BlockIdentifier],
+    asof: Optional[str],
+    batch_size: int,
 ) -> None:
     """
     Print information about the given account.
@@ -133,8 +166,9 @@ def info(
     addresses = [Web3.to_checksum_address(act) for act in accounts]
 
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    account_stats = get_account_stats(w3, addresses, asof)
-    print(to_json(account_stats, pretty=True))
+    tag = None if asof is None else validate_block_identifier(asof)
+    account_stats = iter_account_stats(w3, addresses, tag, batch_size)
+    print_list(account_stats, lambda stats: to_json(stats, pretty=True))
 
 
 @account_group.command()
@@ -170,9 +204,10 @@ def balance(
         print(format_newton_quantity(autonity.balance_of(account_addr)))
 
     elif token_addresss is not None:
-        token_contract = ERC20(w3, token_addresss)
-        decimals = token_contract.decimals()
-        bal = token_contract.balance_of(account_addr)
+        token_contract = w3.eth.contract(token_addresss, abi=erc20.ABI)
+        bal, decimals = call_with_decimals(
+            w3, token_addresss, token_contract.functions.balanceOf(account_addr)
+        )
         print(format_quantity(bal, decimals))
 
     else:
@@ -289,7 +324,7 @@ def reveal_private_key(
     if confirmation.lower() != "yes":
         raise ClickException("Interrupted")
 
-    password = getpass.getpass("Keyfile password: ")
+    password = prompt_secret("Keyfile password: ")
 
     with open(config.get_keyfile(keyfile_path), encoding="utf-8") as f:
         encrypted_key = f.read()
@@ -303,17 +338,20 @@ def reveal_private_key(
 
 
 @account_group.command()
-@authentication_options()
+@authentication_options(from_address=True)
 @argument(
     "tx-file",
     type=Path(),
     required=True,
 )
-def signtx(keyfile: Optional[str], trezor: Optional[str], tx_file: str) -> None:
+def signtx(
+    keyfile: Optional[str], trezor: Optional[str], from_str: Optional[str], tx_file: str
+) -> None:
     """
     Sign a transaction using the given keyfile.
 
-    Use '-' to read from standard input instead of a file.
+    Use '-' to read from standard input instead of a file.  With --from, the
+    keyfile for the given address is found in the keystore.
 
     If the environment variable 'KEYFILEPWD' is set, this keyfile password will
     be used used. If this is not set, the user is prompted.
@@ -322,7 +360,7 @@ def signtx(keyfile: Optional[str], trezor: Optional[str], tx_file: str) -> None:
     # Read tx
     tx = json.loads(load_from_file_or_stdin(tx_file))
 
-    with authenticator(keyfile=keyfile, trezor=trezor) as auth:
+    with authenticator(keyfile=keyfile, trezor=trezor, address=from_str) as auth:
         # Check for mismatch
         if "from" in tx and tx["from"] != auth.address:
             raise ClickException(
@@ -335,7 +373,7 @@ def signtx(keyfile: Optional[str], trezor: Optional[str], tx_file: str) -> None:
 
 
 @account_group.command()
-@authentication_options()
+@authentication_options(from_address=True)
 @option(
     "--use-message-file",
     "-f",
@@ -350,6 +388,7 @@ def signtx(keyfile: Optional[str], trezor: Optional[str], tx_file: str) -> None:
 def sign_message(
     keyfile: Optional[str],
     trezor: Optional[str],
+    from_str: Optional[str],
     use_message_file: bool,
     message: str,
     signature_file: Optional[str],
@@ -367,7 +406,7 @@ def sign_message(
         message = load_from_file_or_stdin(message)
 
     # Get auth
-    with authenticator(keyfile=keyfile, trezor=trezor) as auth:
+    with authenticator(keyfile=keyfile, trezor=trezor, address=from_str) as auth:
         # Sign the message
         log(f'Signing message: "{message}" (len={len(message)})')
         signature = auth.sign_message(message).hex()
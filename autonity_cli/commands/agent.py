@@ -0,0 +1,66 @@
+import os.path
+import signal
+import sys
+from types import FrameType
+from typing import Optional
+
+from click import ClickException, FloatRange, command, option
+
+from ..agent import (
+    AGENT_SOCKET_ENV_VAR,
+    DEFAULT_AGENT_SOCKET_PATH,
+    DEFAULT_KEY_TTL,
+    AgentError,
+    get_agent_socket_path,
+)
+from ..agent import serve as serve_agent
+from ..logging import log
+
+
+@command()
+@option(
+    "--socket",
+    "socket_path",
+    metavar="PATH",
+    help=(
+        f"unix socket to listen on (falls back to the {AGENT_SOCKET_ENV_VAR} env "
+        f"var, defaults to {DEFAULT_AGENT_SOCKET_PATH})."
+    ),
+)
+@option(
+    "--ttl",
+    type=FloatRange(min=0, min_open=True),
+    default=DEFAULT_KEY_TTL,
+    show_default=True,
+    help="number of seconds for which each key is held.",
+)
+def agent(socket_path: Optional[str], ttl: float) -> None:
+    """
+    Hold decrypted keyfile keys, and sign on behalf of other `aut` processes.
+
+    When the AUT_AGENT_SOCK env var is set to the agent's socket, commands
+    signing with a keyfile ask the agent to sign.  The first time a key is
+    used, the command decrypts the keyfile itself (prompting for the
+    password or using KEYFILEPWD) and gives the key to the agent, which holds
+    it for --ttl seconds.  Until then, other commands signing with the same
+    keyfile skip the expensive key derivation, and do not need the password.
+    Only processes of the same user can use the agent, and it does not start
+    on platforms where the user of connecting processes cannot be checked.
+    """
+
+    # Exit cleanly (wiping keys and removing the socket) when terminated.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+
+    socket_path = socket_path or get_agent_socket_path()
+    socket_path = os.path.expanduser(socket_path or DEFAULT_AGENT_SOCKET_PATH)
+    log(f"listening on {socket_path}")
+    try:
+        serve_agent(socket_path, ttl)
+    except AgentError as exc:
+        raise ClickException(str(exc)) from exc
+    except KeyboardInterrupt:
+        pass
+
+
+def _exit_on_signal(_signum: int, _frame: Optional[FrameType]) -> None:
+    sys.exit(0)
@@ -1,10 +1,20 @@
-from typing import Optional
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List, Mapping, Optional
 
-from click import argument, group
+from click import ClickException, IntRange, Path, argument, group, option
 
+from ..batch import DEFAULT_BATCH_SIZE
+from ..logging import log
 from ..options import rpc_endpoint_option
-from ..user import get_block
-from ..utils import to_json, validate_block_identifier, web3_from_endpoint_arg
+from ..user import DEFAULT_MAX_IN_FLIGHT, get_block, get_block_header, get_block_range
+from ..utils import (
+    block_number_from_arg,
+    to_json,
+    validate_block_identifier,
+    web3_from_endpoint_arg,
+)
 
 
 @group(name="block")
@@ -16,8 +26,13 @@ def block_group() -> None:
 
 @block_group.command()
 @rpc_endpoint_option
+@option(
+    "--header-only",
+    is_flag=True,
+    help="print only the block header, without transactions, uncles or withdrawals.",
+)
 @argument("identifier", default="latest")
-def get(rpc_endpoint: Optional[str], identifier: str) -> None:
+def get(rpc_endpoint: Optional[str], header_only: bool, identifier: str) -> None:
     """
     Print information about the given block.
 
@@ -26,7 +41,10 @@ def get(rpc_endpoint: Optional[str], identifier: str) -> None:
 
     block_id = validate_block_identifier(identifier)
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    block_data = get_block(w3, block_id)
+    if header_only:
+        block_data = get_block_header(w3, block_id)
+    else:
+        block_data = get_block(w3, block_id)
     print(to_json(block_data))
 
 
@@ -39,3 +57,125 @@ def height(rpc_endpoint: Optional[str]) -> None:
 
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
     print(w3.eth.block_number)
+
+
+@block_group.command(name="range")
+@rpc_endpoint_option
+@option(
+    "--full-transactions",
+    "-t",
+    is_flag=True,
+    help="include full transactions, rather than transaction hashes.",
+)
+@option(
+    "--fields",
+    metavar="FIELD,...",
+    help="output only the given (comma-separated) fields of each block.",
+)
+@option(
+    "--batch-size",
+    type=IntRange(min=1),
+    default=DEFAULT_BATCH_SIZE,
+    show_default=True,
+    help="number of blocks per JSON-RPC batch.",
+)
+@option(
+    "--max-in-flight",
+    "-m",
+    type=IntRange(min=1),
+    default=DEFAULT_MAX_IN_FLIGHT,
+    show_default=True,
+    help="maximum number of batches being requested at any time (1 over WebSocket).",
+)
+@option(
+    "--checkpoint",
+    type=Path(dir_okay=False),
+    help=(
+        "file recording the last block output, from which an interrupted "
+        "export is resumed."
+    ),
+)
+@argument("start", type=IntRange(min=0))
+@argument("end", default="latest")
+def range_cmd(
+    rpc_endpoint: Optional[str],
+    full_transactions: bool,
+    fields: Optional[str],
+    batch_size: int,
+    max_in_flight: int,
+    checkpoint: Optional[str],
+    start: int,
+    end: str,
+) -> None:
+    """
+    Print the blocks START to END (inclusive), as NDJSON.
+
+    END is a block number, or "latest" (the default).  Blocks are requested
+    in batches, several at a time, and output in order as they arrive.  With
+    --checkpoint, the number of the last block output is recorded in the
+    given file after each batch, and a later run with the same file resumes
+    after that block.
+    """
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    end_number = block_number_from_arg(w3, end)
+
+    if checkpoint is not None:
+        last_output = _read_checkpoint(checkpoint)
+        if last_output is not None and last_output >= start:
+            log(f"resuming after block {last_output}")
+            start = last_output + 1
+    if start > end_number:
+        return
+
+    field_names = fields.split(",") if fields else None
+    last_number = start - 1
+    for blocks in get_block_range(
+        w3, start, end_number, full_transactions, batch_size, max_in_flight
+    ):
+        for block in blocks:
+            print(to_json(_project(block, field_names)))
+        last_number += len(blocks)
+        if checkpoint is not None:
+            sys.stdout.flush()
+            _write_checkpoint(checkpoint, last_number)
+
+
+def _project(
+    block: Mapping[str, Any], field_names: Optional[List[str]]
+) -> Mapping[str, Any]:
+    """
+    The given fields of a block (all fields if `field_names` is None).
+    """
+    if field_names is None:
+        return block
+    projected: Dict[str, Any] = {}
+    for name in field_names:
+        if name in block:
+            projected[name] = block[name]
+    return projected
+
+
+def _read_checkpoint(checkpoint: str) -> Optional[int]:
+    try:
+        with open(checkpoint, "r", encoding="utf8") as checkpoint_f:
+            contents = checkpoint_f.read().strip()
+    except FileNotFoundError:
+        return None
+    try:
+        return int(contents)
+    except ValueError as exc:
+        raise ClickException(f"invalid checkpoint file {checkpoint}") from exc
+
+
+def _write_checkpoint(checkpoint: str, block_number: int) -> None:
+    """
+    Replace the checkpoint file atomically, so that it is intact if the
+    export is interrupted while writing it.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(checkpoint)), suffix=".tmp"
+    )
+    with os.fdopen(fd, "w", encoding="utf8") as checkpoint_f:
+        checkpoint_f.write(f"{block_number}\n")
+    os.replace(tmp_path, checkpoint)
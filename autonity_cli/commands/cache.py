@@ -0,0 +1,48 @@
+from typing import Optional
+
+from click import group
+
+from ..cache import clear_cache
+from ..options import rpc_endpoint_option
+
+
+@group(name="cache")
+def cache_group() -> None:
+    """
+    Commands for the cache of chain metadata.
+    """
+
+
+@cache_group.command()
+def clear() -> None:
+    """
+    Remove all cached chain metadata (chain IDs, token decimals, etc).
+
+    Entries are fetched again from the node when next needed.  This also
+    removes the cached gas estimates (see `cache gas-report`), and the keystore
+    indexes and Trezor account addresses (see `account list`).  The nonces
+    recorded by the local nonce manager (see `aut nonce`) and the log index
+    (see `aut index`) are kept.
+    """
+    clear_cache()
+
+
+@cache_group.command()
+@rpc_endpoint_option
+def gas_report(rpc_endpoint: Optional[str]) -> None:
+    """
+    Show the cached gas estimates (see --gas-cache) for the chain.
+
+    For each recipient, function selector and calldata length, shows the
+    number of estimates and of receipts recorded, the range of gas used,
+    the gas limit used for new transactions, its headroom over the largest
+    amount of gas used, the number of times it was used (hits), and the
+    number of transactions which ran out of gas (and the largest gas limit
+    among them, which the gas limit is raised above).
+    """
+    # Imported here, so that `cache clear` does not need to load web3.
+    from .. import gas_estimates
+    from ..utils import to_json, web3_from_endpoint_arg
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    print(to_json(gas_estimates.gas_report(w3), pretty=True))
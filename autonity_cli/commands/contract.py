@@ -13,14 +13,17 @@ from ..abi_parser import (
     parse_return_value,
 )
 from ..logging import log
+from ..logs import event_topic, find_abi_event, scan_decoded_logs
 from ..options import (
     contract_options,
     from_options,
+    log_scan_options,
     rpc_endpoint_option,
     tx_aux_options,
     tx_value_option,
 )
 from ..utils import (
+    block_number_from_arg,
     contract_address_and_abi_from_args,
     create_contract_tx_from_args,
     finalize_tx_from_args,
@@ -231,3 +234,48 @@ def tx_cmd(
 
     tx = finalize_tx_from_args(w3, rpc_endpoint, tx, from_addr)
     print(to_json(tx))
+
+
+@contract_group.command(name="logs")
+@rpc_endpoint_option
+@contract_options
+@option(
+    "--event",
+    metavar="NAME",
+    help="only logs of the given event (by default, all logs of the contract).",
+)
+@log_scan_options
+def logs_cmd(
+    rpc_endpoint: Optional[str],
+    contract_address_str: Optional[str],
+    contract_abi_path: Optional[str],
+    event: Optional[str],
+    from_block: int,
+    to_block: str,
+    chunk_size: int,
+    max_in_flight: int,
+) -> None:
+    """
+    Print the logs emitted by a contract, decoded using its ABI, as NDJSON.
+
+    Logs are requested in chunks of blocks, several at a time, and chunks for
+    which the node returns too many results are split.  Logs which do not match
+    an event in the ABI are printed undecoded, with an "event" of null.
+    """
+
+    address, abi = contract_address_and_abi_from_args(
+        contract_address_str, contract_abi_path
+    )
+    topics = []
+    if event is not None:
+        try:
+            topics = [event_topic(find_abi_event(abi, event))]
+        except ValueError as exc:
+            raise ClickException(str(exc)) from exc
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    end = block_number_from_arg(w3, to_block)
+    for decoded_log in scan_decoded_logs(
+        w3, address, abi, topics, from_block, end, chunk_size, max_in_flight
+    ):
+        print(to_json(decoded_log))
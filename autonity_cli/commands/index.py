@@ -0,0 +1,129 @@
+from typing import Optional
+
+from click import ClickException, IntRange, group, option
+from web3 import Web3
+
+from ..erc20 import ABI
+from ..log_index import LogIndex
+from ..logging import log
+from ..logs import address_topic, event_topic, find_abi_event
+from ..options import log_scan_options, newton_or_token_option, rpc_endpoint_option
+from ..utils import (
+    block_number_from_arg,
+    newton_or_token_to_address_require,
+    to_json,
+    web3_from_endpoint_arg,
+)
+
+
+@group(name="index")
+def index_group() -> None:
+    """
+    Commands for the local index of token event logs.
+
+    `index sync` stores the logs of a token locally, after which queries such
+    as `index transfers` are answered without scanning the chain.
+    """
+
+
+@index_group.command()
+@rpc_endpoint_option
+@newton_or_token_option
+@log_scan_options
+@option(
+    "--confirmations",
+    type=IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="with --to-block latest, stop this many blocks before the latest.",
+)
+@option(
+    "--rebuild",
+    is_flag=True,
+    help="remove the logs already indexed for the token, and index it again.",
+)
+def sync(
+    rpc_endpoint: Optional[str],
+    ntn: bool,
+    token: Optional[str],
+    from_block: int,
+    to_block: str,
+    chunk_size: int,
+    max_in_flight: int,
+    confirmations: int,
+    rebuild: bool,
+) -> None:
+    """
+    Index the event logs of a token, up to --to-block.
+
+    A token which is not yet indexed is indexed from --from-block.  After that,
+    only blocks after the last indexed block are scanned.  If the chain has
+    been reorganised since the last sync, logs of the replaced blocks are
+    removed and indexed again.  With --confirmations, the most recent blocks,
+    which are the most likely to be replaced, are left for a later sync.
+    Prints the number of logs added.
+    """
+
+    token_address = newton_or_token_to_address_require(ntn, token)
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    end = block_number_from_arg(w3, to_block)
+    if to_block == "latest":
+        end -= confirmations
+    with LogIndex(w3) as index:
+        if rebuild:
+            index.remove(token_address)
+        try:
+            num_logs = index.sync(
+                token_address, ABI, from_block, end, chunk_size, max_in_flight
+            )
+        except ValueError as exc:
+            raise ClickException(str(exc)) from exc
+    print(num_logs)
+
+
+@index_group.command()
+@rpc_endpoint_option
+@newton_or_token_option
+@option("--sender", metavar="ADDRESS", help="only transfers from ADDRESS.")
+@option("--recipient", metavar="ADDRESS", help="only transfers to ADDRESS.")
+@option(
+    "--from-block",
+    type=IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="first block to include.",
+)
+@option("--to-block", type=IntRange(min=0), help="last block to include.")
+def transfers(
+    rpc_endpoint: Optional[str],
+    ntn: bool,
+    token: Optional[str],
+    sender: Optional[str],
+    recipient: Optional[str],
+    from_block: int,
+    to_block: Optional[int],
+) -> None:
+    """
+    Print the indexed Transfer events of a token, as NDJSON.
+
+    The output is as for `token transfers`, but read from the local index
+    (see `index sync`), so it only includes blocks which have been indexed.
+    """
+
+    token_address = newton_or_token_to_address_require(ntn, token)
+    topics = [
+        event_topic(find_abi_event(ABI, "Transfer")),
+        address_topic(Web3.to_checksum_address(sender)) if sender else None,
+        address_topic(Web3.to_checksum_address(recipient)) if recipient else None,
+    ]
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    with LogIndex(w3) as index:
+        synced_block = index.synced_block(token_address)
+        if synced_block is None:
+            raise ClickException(
+                f"{token_address} is not indexed (see `aut index sync`)"
+            )
+        log(f"{token_address} is indexed up to block {synced_block}")
+        for transfer_log in index.query(token_address, topics, from_block, to_block):
+            print(to_json(transfer_log))
@@ -0,0 +1,91 @@
+from typing import Optional
+
+from click import argument, group
+
+from ..auth import validate_authenticator_account
+from ..nonces import next_nonce, reserve_nonce, sync_nonce
+from ..options import authentication_options, rpc_endpoint_option
+from ..utils import web3_from_endpoint_arg
+
+
+@group(name="nonce")
+def nonce_group() -> None:
+    """
+    Commands for the local nonce manager.
+
+    Transaction commands given --reserve-nonce (or with AUT_RESERVE_NONCE
+    set) take their nonce from the manager, so that commands run
+    concurrently for the same account do not create transactions with the
+    same nonce.
+    """
+
+
+@nonce_group.command()
+@rpc_endpoint_option
+@authentication_options()
+@argument("account_str", metavar="ACCOUNT", default="")
+def sync(
+    rpc_endpoint: Optional[str],
+    keyfile: Optional[str],
+    trezor: Optional[str],
+    account_str: Optional[str],
+) -> None:
+    """
+    Reset the next nonce of ACCOUNT to its pending transaction count.
+
+    Use this after transactions for the account were created elsewhere, or
+    were never sent.  Prints the new next nonce.
+    """
+
+    account_addr = validate_authenticator_account(
+        account_str, keyfile=keyfile, trezor=trezor
+    )
+    print(sync_nonce(web3_from_endpoint_arg(None, rpc_endpoint), account_addr))
+
+
+@nonce_group.command()
+@rpc_endpoint_option
+@authentication_options()
+@argument("account_str", metavar="ACCOUNT", default="")
+def show(
+    rpc_endpoint: Optional[str],
+    keyfile: Optional[str],
+    trezor: Optional[str],
+    account_str: Optional[str],
+) -> None:
+    """
+    Print the next nonce that will be reserved for ACCOUNT.
+
+    Prints nothing if the manager has not yet reserved a nonce for the
+    account.
+    """
+
+    account_addr = validate_authenticator_account(
+        account_str, keyfile=keyfile, trezor=trezor
+    )
+    nonce = next_nonce(web3_from_endpoint_arg(None, rpc_endpoint), account_addr)
+    if nonce is not None:
+        print(nonce)
+
+
+@nonce_group.command()
+@rpc_endpoint_option
+@authentication_options()
+@argument("account_str", metavar="ACCOUNT", default="")
+def reserve(
+    rpc_endpoint: Optional[str],
+    keyfile: Optional[str],
+    trezor: Optional[str],
+    account_str: Optional[str],
+) -> None:
+    """
+    Reserve the next nonce of ACCOUNT, and print it.
+
+    Use this to pass a reserved nonce (via --nonce) to a command which does
+    not support --reserve-nonce.
+    """
+
+    account_addr = validate_authenticator_account(
+        account_str, keyfile=keyfile, trezor=trezor
+    )
+    print(reserve_nonce(web3_from_endpoint_arg(None, rpc_endpoint), account_addr))
@@ -7,7 +7,12 @@ from click import argument, group
 from web3 import Web3
 
 from ..options import rpc_endpoint_option
-from ..utils import autonity_from_endpoint_arg, to_json, web3_from_endpoint_arg
+from ..utils import (
+    autonity_from_endpoint_arg,
+    print_list,
+    to_json,
+    web3_from_endpoint_arg,
+)
 
 
 @group(name="protocol")
@@ -166,7 +171,7 @@ def committee(rpc_endpoint: Optional[str]) -> None:
     The current committee.
     """
 
-    print(_show_json(autonity_from_endpoint_arg(rpc_endpoint).get_committee()))
+    print_list(autonity_from_endpoint_arg(rpc_endpoint).get_committee(), _show_json)
 
 
 @protocol_group.command()
@@ -176,7 +181,9 @@ def validators(rpc_endpoint: Optional[str]) -> None:
     The current validators.
     """
 
-    print(_show_sequence(autonity_from_endpoint_arg(rpc_endpoint).get_validators()))
+    print_list(
+        autonity_from_endpoint_arg(rpc_endpoint).get_validators(), _show_sequence
+    )
 
 
 @protocol_group.command()
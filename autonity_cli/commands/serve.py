@@ -0,0 +1,48 @@
+import signal
+import sys
+from types import FrameType
+from typing import Optional
+
+from click import ClickException, command, option
+
+from ..daemon import SOCKET_ENV_VAR, DaemonError, get_socket_path
+from ..daemon import serve as serve_socket
+from ..logging import log
+
+
+@command()
+@option(
+    "--socket",
+    "socket_path",
+    metavar="PATH",
+    help=(
+        f"unix socket to listen on (falls back to the {SOCKET_ENV_VAR} env var, "
+        "defaults to ~/.autonity/aut.sock)."
+    ),
+)
+def serve(socket_path: Optional[str]) -> None:
+    """
+    Run commands on behalf of other `aut` processes.
+
+    Keeps a process running, with modules loaded and connections to RPC
+    endpoints open, so that commands invoked with `aut --via-daemon` (or with
+    the AUT_VIA_DAEMON env var set) start quickly.  Commands run with the
+    caller's working directory and environment, and cannot prompt for input,
+    so keyfile passwords must be given in the KEYFILEPWD env var.
+    """
+
+    # Exit cleanly (removing the socket) when terminated.
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+
+    socket_path = get_socket_path(socket_path)
+    log(f"listening on {socket_path}")
+    try:
+        serve_socket(socket_path)
+    except DaemonError as exc:
+        raise ClickException(str(exc)) from exc
+    except KeyboardInterrupt:
+        pass
+
+
+def _exit_on_signal(_signum: int, _frame: Optional[FrameType]) -> None:
+    sys.exit(0)
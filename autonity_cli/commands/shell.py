@@ -0,0 +1,65 @@
+import shlex
+from typing import List, Optional
+
+from click import command, echo
+
+from .. import session
+
+PROMPT = "aut> "
+
+# Commands which cannot be nested inside a shell.
+UNAVAILABLE_COMMANDS = {"serve", "shell"}
+
+
+@command()
+def shell() -> None:
+    """
+    Run commands interactively in a single process.
+
+    Each line is executed as the arguments to `aut` (for example `block height`
+    or `tx make --to ...`).  Connections to RPC endpoints are kept open for the
+    whole session, and each keyfile is decrypted at most once, so its password
+    is only requested the first time it is used.  Enter `exit` or CTRL-d to
+    leave the shell.
+    """
+
+    try:
+        # Enables line editing and history for `input`, where available.
+        import readline  # noqa: F401  # pyright: ignore[reportUnusedImport]
+    except ImportError:
+        pass
+
+    session.keep_decrypted_accounts()
+
+    while True:
+        try:
+            line = input(PROMPT)
+        except EOFError:
+            echo()
+            break
+        except KeyboardInterrupt:
+            echo()
+            continue
+
+        args = _parse_line(line)
+        if args is None or not args:
+            continue
+        if args[0] in ("exit", "quit"):
+            break
+        if args[0] in UNAVAILABLE_COMMANDS:
+            echo(f"Error: `{args[0]}` cannot be used in the shell", err=True)
+            continue
+
+        session.run_command(args)
+
+
+def _parse_line(line: str) -> Optional[List[str]]:
+    """
+    Split a line into arguments, as a POSIX shell would.  Returns None (after
+    reporting the error) for malformed lines.
+    """
+    try:
+        return shlex.split(line, comments=True)
+    except ValueError as exc:
+        echo(f"Error: {exc}", err=True)
+        return None
@@ -1,21 +1,28 @@
 from typing import Optional
 
-from click import ClickException, argument, group
+from click import ClickException, argument, group, option
+from eth_typing import ChecksumAddress
 from web3 import Web3
+from web3.contract.contract import Contract
 from web3.exceptions import ContractLogicError
 
 from autonity_cli.auth import validate_authenticator_account
 
+from .. import cache
 from ..denominations import format_quantity
-from ..erc20 import ERC20
+from ..erc20 import ABI, ERC20
+from ..logs import address_topic, event_topic, find_abi_event, scan_decoded_logs
+from ..multicall import call_with_decimals
 from ..options import (
     authentication_options,
     from_options,
+    log_scan_options,
     newton_or_token_option,
     rpc_endpoint_option,
     tx_aux_options,
 )
 from ..utils import (
+    block_number_from_arg,
     create_contract_tx_from_args,
     newton_or_token_to_address_require,
     parse_token_value_representation,
@@ -41,9 +48,8 @@ def name(rpc_endpoint: Optional[str], ntn: bool, token: Optional[str]) -> None:
 
     token_addresss = newton_or_token_to_address_require(ntn, token)
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
     try:
-        token_name = erc.name()
+        token_name = cache.token_name(w3, token_addresss)
     except ContractLogicError as exc:
         raise ClickException(
             "Token does not implement the ERC20 `name` function"
@@ -61,9 +67,8 @@ def symbol(rpc_endpoint: Optional[str], ntn: bool, token: Optional[str]) -> None
 
     token_addresss = newton_or_token_to_address_require(ntn, token)
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
     try:
-        token_symbol = erc.symbol()
+        token_symbol = cache.token_symbol(w3, token_addresss)
     except ContractLogicError as exc:
         raise ClickException(
             "Token does not implement the ERC20 `symbol` function"
@@ -81,8 +86,7 @@ def decimals(rpc_endpoint: Optional[str], ntn: bool, token: Optional[str]) -> No
 
     token_addresss = newton_or_token_to_address_require(ntn, token)
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
-    print(erc.decimals())
+    print(cache.token_decimals(w3, token_addresss))
 
 
 @token_group.command()
@@ -95,9 +99,10 @@ def total_supply(rpc_endpoint: Optional[str], ntn: bool, token: Optional[str]) -
 
     token_addresss = newton_or_token_to_address_require(ntn, token)
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
-    token_decimals = erc.decimals()
-    token_total_supply = erc.total_supply()
+    erc = _erc20_contract(w3, token_addresss)
+    token_total_supply, token_decimals = call_with_decimals(
+        w3, token_addresss, erc.functions.totalSupply()
+    )
     print(format_quantity(token_total_supply, token_decimals))
 
 
@@ -126,9 +131,10 @@ def balance_of(
     )
 
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
-    balance = erc.balance_of(account_addr)
-    token_decimals = erc.decimals()
+    erc = _erc20_contract(w3, token_addresss)
+    balance, token_decimals = call_with_decimals(
+        w3, token_addresss, erc.functions.balanceOf(account_addr)
+    )
     print(format_quantity(balance, token_decimals))
 
 
@@ -156,9 +162,10 @@ def allowance(
     owner_addr = Web3.to_checksum_address(owner)
 
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
-    erc = ERC20(w3, token_addresss)
-    token_allowance = erc.allowance(owner_addr, from_addr)
-    token_decimals = erc.decimals()
+    erc = _erc20_contract(w3, token_addresss)
+    token_allowance, token_decimals = call_with_decimals(
+        w3, token_addresss, erc.functions.allowance(owner_addr, from_addr)
+    )
     print(format_quantity(token_allowance, token_decimals))
 
 
@@ -199,7 +206,7 @@ def transfer(
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
     erc = ERC20(w3, token_addresss)
 
-    token_decimals = erc.decimals()
+    token_decimals = cache.token_decimals(w3, token_addresss)
     amount = parse_token_value_representation(amount_str, token_decimals)
 
     function_call = erc.transfer(recipient_addr, amount)
@@ -256,7 +263,7 @@ def approve(
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
     erc = ERC20(w3, token_addresss)
 
-    token_decimals = erc.decimals()
+    token_decimals = cache.token_decimals(w3, token_addresss)
     amount = parse_token_value_representation(amount_str, token_decimals)
 
     function_call = erc.approve(spender, amount)
@@ -318,7 +325,7 @@ def transfer_from(
     w3 = web3_from_endpoint_arg(None, rpc_endpoint)
     erc = ERC20(w3, token_addresss)
 
-    token_decimals = erc.decimals()
+    token_decimals = cache.token_decimals(w3, token_addresss)
     amount = parse_token_value_representation(amount_str, token_decimals)
 
     function_call = erc.transfer_from(spender, recipient, amount)
@@ -335,3 +342,51 @@ def transfer_from(
     )
 
     print(to_json(tx))
+
+
+@token_group.command()
+@rpc_endpoint_option
+@newton_or_token_option
+@option("--sender", metavar="ADDRESS", help="only transfers from ADDRESS.")
+@option("--recipient", metavar="ADDRESS", help="only transfers to ADDRESS.")
+@log_scan_options
+def transfers(
+    rpc_endpoint: Optional[str],
+    ntn: bool,
+    token: Optional[str],
+    sender: Optional[str],
+    recipient: Optional[str],
+    from_block: int,
+    to_block: str,
+    chunk_size: int,
+    max_in_flight: int,
+) -> None:
+    """
+    Print the Transfer events of a token, as NDJSON.
+
+    Values are in the smallest unit of the token.  Logs are requested in chunks
+    of blocks, several at a time, and chunks for which the node returns too
+    many results are split.
+    """
+
+    token_addresss = newton_or_token_to_address_require(ntn, token)
+    topics = [
+        event_topic(find_abi_event(ABI, "Transfer")),
+        address_topic(Web3.to_checksum_address(sender)) if sender else None,
+        address_topic(Web3.to_checksum_address(recipient)) if recipient else None,
+    ]
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    end = block_number_from_arg(w3, to_block)
+    for transfer_log in scan_decoded_logs(
+        w3, token_addresss, ABI, topics, from_block, end, chunk_size, max_in_flight
+    ):
+        print(to_json(transfer_log))
+
+
+def _erc20_contract(w3: Web3, token_address: ChecksumAddress) -> Contract:
+    """
+    Web3 contract for an ERC20 token, whose view functions can be passed to
+    `multicall`.
+    """
+    return w3.eth.contract(token_address, abi=ABI)
@@ -1,24 +1,79 @@
 import asyncio
+import csv
+import itertools
 import json
-from typing import Optional
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+    cast,
+)
 
-from click import ClickException, Path, argument, group, option
+from click import (
+    Choice,
+    ClickException,
+    File,
+    FloatRange,
+    IntRange,
+    Path,
+    argument,
+    get_text_stream,
+    group,
+    option,
+)
+from eth_account import Account
 from eth_account.datastructures import SignedTransaction
+from eth_account.signers.local import LocalAccount
+from eth_account.types import TransactionDictType
+from eth_typing import ChecksumAddress
 from hexbytes import HexBytes
 from web3 import Web3
+from web3.exceptions import (
+    ProviderConnectionError,
+    RequestTimedOut,
+    TimeExhausted,
+    TransactionNotFound,
+    Web3RPCError,
+)
+from web3.types import TxParams, TxReceipt
+from websockets.exceptions import ConnectionClosed
 
 from autonity_cli.auth import validate_authenticator_account
 
+from .. import cache, fees, gas_estimates
+from ..auth import KeyfileAuthenticator, authenticator
+from ..batch import max_concurrent_requests
 from ..erc20 import ERC20
 from ..logging import log
 from ..options import (
+    authentication_options,
     from_options,
+    gas_cache_option,
+    gas_cache_requested,
     newton_or_token_option,
+    reserve_nonce_requested,
     rpc_endpoint_option,
     tx_aux_options,
     tx_value_option,
 )
-from ..tx import send_tx, wait_for_tx
+from ..tx import (
+    DEFAULT_POLL_INTERVAL,
+    fee_defaults,
+    send_tx,
+    wait_for_tx,
+    wait_for_txs,
+)
 from ..utils import (
     create_contract_tx_from_args,
     create_tx_from_args,
@@ -96,19 +151,63 @@ def make(
 
     token_addresss = newton_or_token_to_address(ntn, token)
 
+    tx = _make_tx(
+        w3,
+        rpc_endpoint,
+        from_addr=from_addr,
+        to_addr=to_addr,
+        token_address=token_addresss,
+        value=value,
+        data=data,
+        gas=gas,
+        gas_price=gas_price,
+        max_fee_per_gas=max_fee_per_gas,
+        max_priority_fee_per_gas=max_priority_fee_per_gas,
+        fee_factor=fee_factor,
+        nonce=nonce,
+        chain_id=chain_id,
+    )
+
+    print(to_json(tx))
+
+
+def _make_tx(
+    w3: Optional[Web3],
+    rpc_endpoint: Optional[str],
+    from_addr: Optional[ChecksumAddress],
+    to_addr: ChecksumAddress,
+    token_address: Optional[ChecksumAddress],
+    value: str,
+    data: Optional[str],
+    gas: Optional[str],
+    gas_price: Optional[str],
+    max_fee_per_gas: Optional[str],
+    max_priority_fee_per_gas: Optional[str],
+    fee_factor: Optional[float],
+    nonce: Optional[int],
+    chain_id: Optional[int],
+) -> TxParams:
+    """
+    Create a transaction transferring AUT (with optional data), or tokens
+    (if `token_address` is given), as `tx make` does.  Values not given are
+    queried from the node.
+    """
+
     # If --fee-factor was given, we must do some computation up-front
 
     # If this is a token call, fill in the "to" and "data" fields
     # using the contract call.  Otherwise, for a plain AUT transfer,
     # use create_transaction and finalize_transaction wrappers.
 
-    if token_addresss:
+    if token_address:
         if not from_addr:
             raise ClickException("`--from` address not specified")
 
         w3 = web3_from_endpoint_arg(w3, rpc_endpoint)
-        erc = ERC20(w3, token_addresss)
-        token_units = parse_token_value_representation(value, erc.decimals())
+        erc = ERC20(w3, token_address)
+        token_units = parse_token_value_representation(
+            value, cache.token_decimals(w3, token_address)
+        )
         function = erc.transfer(to_addr, token_units)
         tx = create_contract_tx_from_args(
             function=function,
@@ -147,9 +246,353 @@ def make(
 
     # Fill in any missing values.
 
-    tx = finalize_tx_from_args(w3, rpc_endpoint, tx, from_addr)
+    return finalize_tx_from_args(w3, rpc_endpoint, tx, from_addr)
 
-    print(to_json(tx))
+
+@tx_group.command()
+@rpc_endpoint_option
+@from_options()
+@tx_aux_options
+@option(
+    "--format",
+    "input_format",
+    type=Choice(["auto", "csv", "ndjson"]),
+    default="auto",
+    show_default=True,
+    help="format of ROWS-FILE ('auto' detects NDJSON, otherwise assumes CSV).",
+)
+@argument("rows-file", type=File("r"), default="-")
+def make_batch(
+    rpc_endpoint: Optional[str],
+    keyfile: Optional[str],
+    trezor: Optional[str],
+    from_str: Optional[str],
+    gas: Optional[str],
+    gas_price: Optional[str],
+    max_priority_fee_per_gas: Optional[str],
+    max_fee_per_gas: Optional[str],
+    fee_factor: Optional[float],
+    nonce: Optional[int],
+    chain_id: Optional[int],
+    input_format: str,
+    rows_file: TextIO,
+) -> None:
+    """
+    Create a transaction for each row of ROWS-FILE, output as NDJSON.
+
+    Each row holds `to` and `value`, and optionally `token` (a token address,
+    or 'ntn') and `data`, with the same meaning as the `tx make` options.
+    ROWS-FILE is either CSV with a header row, or NDJSON (one JSON object per
+    line).  Use '-' (the default) to read from standard input.
+
+    Nonces are assigned consecutively, starting from --nonce (or the
+    transaction count of the account, unless --reserve-nonce is given), and
+    fee parameters are only fetched again when a new block has been produced.
+    All other options apply to every transaction.  Each transaction is output
+    as soon as it is created.
+    """
+
+    from_addr = validate_authenticator_account(from_str, keyfile=keyfile, trezor=trezor)
+    log(f"from_addr: {from_addr}")
+
+    # With --reserve-nonce, each transaction reserves its own nonce (see
+    # `finalize_transaction`).
+    w3: Optional[Web3] = None
+    if nonce is None and not reserve_nonce_requested():
+        w3 = web3_from_endpoint_arg(w3, rpc_endpoint)
+        nonce = w3.eth.get_transaction_count(from_addr)
+    if chain_id is None:
+        w3 = web3_from_endpoint_arg(w3, rpc_endpoint)
+        chain_id = cache.chain_id(w3)
+
+    fees: Optional[_BlockFees] = None
+    if not gas_price and not max_fee_per_gas:
+        fees = _BlockFees(web3_from_endpoint_arg(w3, rpc_endpoint), fee_factor)
+
+    for row_number, row in enumerate(_read_rows(rows_file, input_format), start=1):
+        try:
+            to_addr, token_address, value, data = _parse_row(row)
+            fee_args = {
+                "gas_price": gas_price,
+                "max_fee_per_gas": max_fee_per_gas,
+                "max_priority_fee_per_gas": max_priority_fee_per_gas,
+            }
+            if fees is not None:
+                fee_args.update(fees.fee_args())
+            tx = _make_tx(
+                w3,
+                rpc_endpoint,
+                from_addr=from_addr,
+                to_addr=to_addr,
+                token_address=token_address,
+                value=value,
+                data=data,
+                gas=gas,
+                fee_factor=None,
+                nonce=nonce,
+                chain_id=chain_id,
+                **fee_args,
+            )
+        except ClickException as exc:
+            raise ClickException(f"row {row_number}: {exc.message}") from exc
+        except ValueError as exc:
+            raise ClickException(f"row {row_number}: {exc}") from exc
+
+        print(to_json(tx), flush=True)
+        if nonce is not None:
+            nonce += 1
+
+
+ROW_FIELDS = ("to", "value", "token", "data")
+
+
+def _read_rows(rows_file: TextIO, input_format: str) -> Iterator[Dict[str, str]]:
+    """
+    Stream the rows of a `make-batch` input file, as dicts.
+    """
+
+    lines = iter(rows_file)
+    first_line = next((line for line in lines if line.strip()), None)
+    if first_line is None:
+        return
+    lines = itertools.chain([first_line], lines)
+
+    if input_format == "auto":
+        input_format = "ndjson" if first_line.lstrip().startswith("{") else "csv"
+
+    if input_format == "csv":
+        yield from csv.DictReader(line for line in lines if line.strip())
+        return
+
+    for line in lines:
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                raise ClickException(f"invalid JSON ({exc}): {line.strip()}") from exc
+            if not isinstance(row, dict):
+                raise ClickException(f"expected a JSON object, got: {line.strip()}")
+            fields = cast(Dict[str, Any], row)
+            yield {key: "" if val is None else str(val) for key, val in fields.items()}
+
+
+def _parse_row(
+    row: Dict[str, str],
+) -> Tuple[ChecksumAddress, Optional[ChecksumAddress], str, Optional[str]]:
+    """
+    Validate a `make-batch` row, returning (to, token, value, data).
+    """
+
+    unknown = set(row) - set(ROW_FIELDS)
+    if unknown:
+        raise ClickException(f"unknown field(s): {', '.join(sorted(unknown))}")
+
+    to_str = (row.get("to") or "").strip()
+    if not to_str:
+        raise ClickException("`to` address must be specified")
+
+    token = (row.get("token") or "").strip()
+    token_address = newton_or_token_to_address(
+        token.lower() == "ntn", None if token.lower() in ("", "ntn") else token
+    )
+    value = (row.get("value") or "").strip()
+    if token_address and not value:
+        raise ClickException("`value` must be specified for token transfers")
+
+    data = (row.get("data") or "").strip() or None
+    return Web3.to_checksum_address(to_str), token_address, value, data
+
+
+FEE_REFRESH_INTERVAL = 1.0
+"""
+Minimum time, in seconds, between checks for a new block in `make-batch`.
+"""
+
+
+class _BlockFees:
+    """
+    Fee parameters for the transactions of a batch, as `tx make` would compute
+    them.  These are fetched again only when a new block has been produced
+    (checked at most once per FEE_REFRESH_INTERVAL).
+    """
+
+    def __init__(self, w3: Web3, fee_factor: Optional[float]):
+        self._w3 = w3
+        self._fee_factor = fee_factor
+        self._block_number: Optional[int] = None
+        self._checked_at = 0.0
+        self._fee_args: Dict[str, Optional[str]] = {}
+
+    def fee_args(self) -> Dict[str, Optional[str]]:
+        """
+        Fee arguments for `_make_tx`.
+        """
+        now = time.monotonic()
+        if self._block_number is None or now - self._checked_at >= FEE_REFRESH_INTERVAL:
+            self._checked_at = now
+            block_number = self._w3.eth.block_number
+            if block_number != self._block_number:
+                self._block_number = block_number
+                self._fee_args = self._fetch(block_number)
+
+        return self._fee_args
+
+    def _fetch(self, block_number: int) -> Dict[str, Optional[str]]:
+        if self._fee_factor:
+            max_fee = fees.max_fee_per_gas(self._w3, self._fee_factor, block_number)
+            return {} if max_fee is None else {"max_fee_per_gas": _wei_arg(max_fee)}
+
+        defaults = fee_defaults(self._w3)
+        return {
+            "gas_price": _wei_arg(defaults.get("gasPrice")),
+            "max_fee_per_gas": _wei_arg(defaults.get("maxFeePerGas")),
+            "max_priority_fee_per_gas": _wei_arg(defaults.get("maxPriorityFeePerGas")),
+        }
+
+
+def _wei_arg(value: Optional[Union[int, str]]) -> Optional[str]:
+    """
+    A value in wei, as a fee argument (see `parse_wei_representation`).
+    """
+    return None if value is None else f"{value}wei"
+
+
+SIGN_CHUNK_SIZE = 256
+"""
+Number of transactions passed to a signing process at a time by `sign-batch`.
+"""
+
+SEND_ATTEMPTS = 3
+"""
+Number of times `send-batch` tries to send a transaction, if sending fails
+for reasons other than an error reported by the node.
+"""
+
+SEND_RETRY_DELAY = 0.5
+"""
+Delay, in seconds, before the first retry of a send (increasing linearly for
+later retries).
+"""
+
+# Failures to reach the node (as opposed to errors it reports).  These include
+# the exceptions of requests (all OSErrors) and of websockets.
+_TRANSPORT_ERRORS = (
+    OSError,
+    ConnectionClosed,
+    ProviderConnectionError,
+    RequestTimedOut,
+)
+
+
+@tx_group.command()
+@authentication_options(from_address=True)
+@option(
+    "--jobs",
+    "-j",
+    type=IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="number of processes used for signing (keyfiles only).",
+)
+@argument("txs-file", type=File("r"), default="-")
+def sign_batch(
+    keyfile: Optional[str],
+    trezor: Optional[str],
+    from_str: Optional[str],
+    jobs: int,
+    txs_file: TextIO,
+) -> None:
+    """
+    Sign each transaction in TXS-FILE, output as NDJSON.
+
+    TXS-FILE holds one transaction (as generated by `tx make` or `tx
+    make-batch`) per line.  Use '-' (the default) to read from standard input.
+    The key is decrypted once, and signed transactions are output in input
+    order, in the format of `tx sign`.  Input is processed in fixed-size
+    chunks, so that files of any length can be signed in bounded memory.
+
+    If the environment variable 'KEYFILEPWD' is set, this keyfile password will
+    be used. If this is not set, the user is prompted.
+    """
+
+    lines = _numbered_lines(txs_file)
+    with authenticator(keyfile=keyfile, trezor=trezor, address=from_str) as auth:
+        if jobs == 1:
+            for line_number, line in lines:
+                print(
+                    _sign_line(auth.address, auth.sign_transaction, line_number, line)
+                )
+            return
+
+        if not isinstance(auth, KeyfileAuthenticator):
+            raise ClickException("--jobs can only be used with a keyfile")
+
+        with multiprocessing.Pool(
+            jobs, initializer=_init_signing_process, initargs=(auth.account.key,)
+        ) as pool:
+            while chunk := list(itertools.islice(lines, jobs * SIGN_CHUNK_SIZE)):
+                for signed_tx in pool.map(
+                    _sign_line_in_process, chunk, chunksize=SIGN_CHUNK_SIZE
+                ):
+                    print(signed_tx)
+
+
+def _numbered_lines(txs_file: TextIO) -> Iterator[Tuple[int, str]]:
+    """
+    The non-empty lines of a file, with their (1-based) line numbers.
+    """
+    for line_number, line in enumerate(txs_file, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def _sign_line(
+    address: ChecksumAddress,
+    sign: Callable[[TxParams], SignedTransaction],
+    line_number: int,
+    line: str,
+) -> str:
+    """
+    Sign the transaction on a line of `sign-batch` input, returning the
+    output line.
+    """
+    try:
+        tx = json.loads(line)
+    except ValueError as exc:
+        raise ClickException(f"line {line_number}: invalid JSON ({exc})") from exc
+
+    # Check for mismatch, as for `tx sign`
+    if "from" in tx and tx["from"] != address:
+        raise ClickException(
+            f"line {line_number}: TX from-address {tx['from']} does not match "
+            f"signer's address {address}."
+        )
+
+    try:
+        return to_json(sign(tx)._asdict())
+    except (TypeError, ValueError) as exc:
+        raise ClickException(f"line {line_number}: {exc}") from exc
+
+
+_signing_account: Optional[LocalAccount] = None
+"""
+The account used by `sign-batch` signing processes.
+"""
+
+
+def _init_signing_process(private_key: bytes) -> None:
+    global _signing_account
+    _signing_account = cast(LocalAccount, Account.from_key(private_key))
+
+
+def _sign_line_in_process(numbered_line: Tuple[int, str]) -> str:
+    assert _signing_account is not None
+    account = _signing_account
+
+    def sign(tx: TxParams) -> SignedTransaction:
+        return account.sign_transaction(cast(TransactionDictType, tx))
+
+    return _sign_line(account.address, sign, *numbered_line)
 
 
 @tx_group.command()
@@ -169,6 +612,118 @@ def send(rpc_endpoint: Optional[str], tx_file: str) -> None:
     print(Web3.to_hex(tx_hash))
 
 
+@tx_group.command()
+@rpc_endpoint_option
+@option(
+    "--max-in-flight",
+    "-m",
+    type=IntRange(min=1),
+    default=16,
+    show_default=True,
+    help="maximum number of transactions being sent at any time.",
+)
+@option(
+    "--idempotent",
+    is_flag=True,
+    help=(
+        "report transactions which the node already has (in its pool or in a "
+        "block) as sent, rather than as errors."
+    ),
+)
+@argument("txs-file", type=File("r"), default="-")
+def send_batch(
+    rpc_endpoint: Optional[str], max_in_flight: int, idempotent: bool, txs_file: TextIO
+) -> None:
+    """
+    Send each raw transaction in TXS-FILE, output the results as NDJSON.
+
+    TXS-FILE holds one signed transaction (as generated by `tx sign` or `tx
+    sign-batch`) per line.  Use '-' (the default) to read from standard
+    input.  Up to --max-in-flight transactions are sent concurrently (one at
+    a time over WebSocket endpoints), and for
+    each transaction (in input order) a line holding its `hash`, `status`
+    ('sent', 'known' or 'error') and `error` message is output.  Sends which
+    fail without a response from the node (e.g. timeouts) are retried.  Exits
+    with a non-zero code if any transaction could not be sent.
+    """
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    max_in_flight = max_concurrent_requests(w3, max_in_flight)
+    num_failed = 0
+
+    def output(result: Dict[str, Optional[str]]) -> None:
+        nonlocal num_failed
+        if result["status"] == "error":
+            num_failed += 1
+        print(json.dumps(result), flush=True)
+
+    with ThreadPoolExecutor(max_in_flight) as executor:
+        in_flight: Deque["Future[Dict[str, Optional[str]]]"] = deque()
+        for line_number, line in _numbered_lines(txs_file):
+            try:
+                signed_tx = SignedTransaction(**json.loads(line))
+            except (TypeError, ValueError) as exc:
+                raise ClickException(
+                    f"line {line_number}: invalid transaction"
+                ) from exc
+
+            in_flight.append(executor.submit(_send_raw_tx, w3, signed_tx, idempotent))
+            if len(in_flight) >= max_in_flight:
+                output(in_flight.popleft().result())
+
+        while in_flight:
+            output(in_flight.popleft().result())
+
+    if num_failed:
+        raise ClickException(f"{num_failed} transaction(s) could not be sent")
+
+
+def _send_raw_tx(
+    w3: Web3, signed_tx: SignedTransaction, idempotent: bool
+) -> Dict[str, Optional[str]]:
+    """
+    Send a signed transaction, returning the `send-batch` result.  Transport
+    failures (timeouts, lost connections) are retried, up to SEND_ATTEMPTS
+    times in all, by sending the same raw transaction again.
+    """
+
+    tx_hash_bytes = HexBytes(signed_tx.hash)
+    tx_hash = tx_hash_bytes.to_0x_hex()
+    error = ""
+    for attempt in range(SEND_ATTEMPTS):
+        if attempt:
+            time.sleep(SEND_RETRY_DELAY * attempt)
+        try:
+            send_tx(w3, signed_tx)
+            return {"hash": tx_hash, "status": "sent", "error": None}
+        except Web3RPCError as exc:
+            rpc_error = (exc.rpc_response or {}).get("error")
+            error = rpc_error["message"] if isinstance(rpc_error, dict) else str(exc)
+            break
+        except _TRANSPORT_ERRORS as exc:
+            error = str(exc) or type(exc).__name__
+            log(f"failed to send {tx_hash} (attempt {attempt + 1}): {error}")
+    else:
+        return {"hash": tx_hash, "status": "error", "error": error}
+
+    # The node already has this transaction if it reports it as known, or
+    # if the nonce is used and the transaction itself is on chain.  After a
+    # transport failure, this may be the result of an earlier attempt, in
+    # which case the transaction was sent.
+    if idempotent or attempt > 0:
+        status = "sent" if attempt > 0 else "known"
+        if "already known" in error.lower():
+            return {"hash": tx_hash, "status": status, "error": None}
+        if "nonce too low" in error.lower():
+            try:
+                w3.eth.get_transaction(tx_hash_bytes)
+                return {"hash": tx_hash, "status": status, "error": None}
+            except (TransactionNotFound, *_TRANSPORT_ERRORS):
+                pass
+
+    return {"hash": tx_hash, "status": "error", "error": error}
+
+
 @tx_group.command()
 @rpc_endpoint_option
 @option("--quiet", "-q", is_flag=True, help="do not print the transaction receipt.")
@@ -178,6 +733,7 @@ def send(rpc_endpoint: Optional[str], tx_file: str) -> None:
     type=float,
     help="wait up to some (decimal) number of seconds.",
 )
+@gas_cache_option
 @argument("tx-hash", required=True)
 def wait(
     rpc_endpoint: Optional[str], quiet: bool, timeout: Optional[float], tx_hash: str
@@ -196,11 +752,106 @@ def wait(
     try:
         w3 = web3_from_endpoint_arg(None, rpc_endpoint)
         tx_receipt = wait_for_tx(w3, hash_bytes, timeout=timeout)
+        if gas_cache_requested():
+            _record_gas_used(w3, tx_receipt)
         if not quiet:
             print(to_json(tx_receipt))
 
         if tx_receipt["status"] == 0:
             raise ClickException("Transaction failed")
 
-    except asyncio.TimeoutError:
+    except (asyncio.TimeoutError, TimeExhausted):
         raise ClickException(f"Transaction {tx_hash} timed out")
+
+
+@tx_group.command()
+@rpc_endpoint_option
+@option("--quiet", "-q", is_flag=True, help="do not print the transaction receipts.")
+@option(
+    "--timeout",
+    "-t",
+    type=float,
+    help="wait up to some (decimal) number of seconds.",
+)
+@option(
+    "--poll-interval",
+    type=FloatRange(min=0.0, min_open=True),
+    default=DEFAULT_POLL_INTERVAL,
+    show_default=True,
+    help="seconds between checks for new blocks.",
+)
+@gas_cache_option
+@argument("tx-hashes", nargs=-1)
+def wait_batch(
+    rpc_endpoint: Optional[str],
+    quiet: bool,
+    timeout: Optional[float],
+    poll_interval: float,
+    tx_hashes: Tuple[str, ...],
+) -> None:
+    """
+    Wait for many transactions, and print their receipts as NDJSON.
+
+    Transaction hashes are taken from TX_HASHES or, if none are given, from
+    standard input (one per line).  The output of `tx send-batch` is also
+    accepted, in which case transactions which could not be sent are
+    skipped.  Receipts are printed as the transactions are included in
+    blocks.
+
+    The command will return a non-zero exit code if any transaction failed
+    or timed out.
+    """
+
+    if not tx_hashes:
+        tx_hashes = tuple(_read_tx_hashes(get_text_stream("stdin")))
+    hashes = [HexBytes(validate_32byte_hash_string(h)) for h in tx_hashes]
+
+    w3 = web3_from_endpoint_arg(None, rpc_endpoint)
+    gas_cache = gas_cache_requested()
+    pending = set(hashes)
+    num_failed = 0
+    for tx_receipt in wait_for_txs(w3, hashes, timeout, poll_interval):
+        pending.discard(tx_receipt["transactionHash"])
+        if tx_receipt["status"] == 0:
+            num_failed += 1
+        if gas_cache:
+            _record_gas_used(w3, tx_receipt)
+        if not quiet:
+            print(to_json(tx_receipt), flush=True)
+
+    for tx_hash in hashes:
+        if tx_hash in pending:
+            log(f"timed out waiting for {tx_hash.to_0x_hex()}")
+
+    if num_failed or pending:
+        raise ClickException(
+            f"{num_failed} transaction(s) failed, {len(pending)} timed out"
+        )
+
+
+def _record_gas_used(w3: Web3, tx_receipt: TxReceipt) -> None:
+    """
+    Record the gas used by a transaction in the cache of gas estimates.
+    """
+    tx = w3.eth.get_transaction(tx_receipt["transactionHash"])
+    gas_estimates.record_gas_used(w3, tx, tx_receipt)
+
+
+def _read_tx_hashes(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Transaction hashes from lines holding either a hash, or a `send-batch`
+    result.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield line
+            continue
+
+        result = json.loads(line)
+        if result.get("status") == "error":
+            log(f"skipping unsent transaction {result.get('hash')}")
+            continue
+        yield result["hash"]
@@ -6,7 +6,6 @@ file.
 
 import os
 import os.path
-from getpass import getpass
 from typing import Optional
 
 from click import ClickException
@@ -15,6 +14,7 @@ from web3 import Web3
 
 from .config_file import CONFIG_FILE_NAME, get_config_file
 from .logging import log
+from .session import prompt_secret
 
 DEFAULT_KEYFILE_DIRECTORY = "~/.autonity/keystore"
 KEYFILE_DIRECTORY_ENV_VAR = "KEYFILEDIR"
@@ -79,7 +79,7 @@ def get_keyfile_password(password: Optional[str], keyfile: Optional[str] = None)
     if password is None:
         password = os.getenv(KEYFILE_PASSWORD_ENV_VAR)
         if password is None:
-            password = getpass(
+            password = prompt_secret(
                 f"(consider using '{KEYFILE_PASSWORD_ENV_VAR}' env var).\n"
                 + "Enter passphrase "
                 + ("" if keyfile is None else f"for '{os.path.relpath(keyfile)}' ")
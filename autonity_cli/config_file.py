@@ -70,7 +70,10 @@ config_file_data: ConfigFile = ConfigFile({})
 
 config_file_dir: str = "."
 
-config_file_cached = False
+config_file_cwd: Optional[str] = None
+"""
+Working directory from which the config file was discovered.
+"""
 
 
 def _find_config_file() -> str | None:
@@ -112,14 +115,20 @@ def _find_config_file() -> str | None:
 def get_config_file() -> ConfigFile:
     """
     Load (and cache in memory) the first config file found.  If no
-    config file is found, the empty dictionary is returned.
+    config file is found, the empty dictionary is returned.  The
+    search is repeated if the working directory has changed since the
+    cached file was found (possible when running several commands in
+    one process, see `aut serve`).
     """
 
     global config_file_dir
     global config_file_data
-    global config_file_cached
+    global config_file_cwd
 
-    if not config_file_cached:
+    cwd = os.getcwd()
+    if config_file_cwd != cwd:
+        config_file_dir = "."
+        config_file_data = ConfigFile({})
         config_file_path = _find_config_file()
         if config_file_path:
             config = ConfigParser()
@@ -127,6 +136,6 @@ def get_config_file() -> ConfigFile:
             config_file_dir = os.path.dirname(config_file_path)
             config_file_data = ConfigFile(config[CONFIG_FILE_SECTION_NAME])
 
-        config_file_cached = True
+        config_file_cwd = cwd
 
     return config_file_data
@@ -0,0 +1,273 @@
+"""
+Server and client for running commands in a long-lived `aut serve` process.
+
+The client sends its command line, working directory and environment, as a
+line of JSON, over a unix socket.  The server runs the command in-process, and
+streams its output back as newline-delimited JSON messages: `{"stdout":
+<text>}` and `{"stderr": <text>}` as each line is written (so that
+long-running commands such as `block range` produce output as they go), then
+`{"exit_code": <n>}`.  Standard input is only read if the command reads it:
+the server then sends `{"read_stdin": true}`, and the client replies with a
+line `{"stdin": <base64>}` holding the next chunk of its standard input
+(empty at the end of the input).  Each connection carries exactly one
+request.
+
+The client side is imported by the `aut` entry point, so only depends on
+the standard library.
+"""
+
+import base64
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, cast
+
+DEFAULT_SOCKET_PATH = "~/.autonity/aut.sock"
+SOCKET_ENV_VAR = "AUT_DAEMON_SOCKET"
+VIA_DAEMON_ENV_VAR = "AUT_VIA_DAEMON"
+STDIN_CHUNK_SIZE = 64 * 1024
+
+
+class DaemonError(Exception):
+    """
+    Failure to communicate with the `aut serve` process.
+    """
+
+
+def get_socket_path(socket_path: Optional[str]) -> str:
+    """
+    Socket path from the command line, falling back to the env var, then the
+    default.
+    """
+    if socket_path is None:
+        socket_path = os.getenv(SOCKET_ENV_VAR, DEFAULT_SOCKET_PATH)
+    return os.path.expanduser(socket_path)
+
+
+def forward(socket_path: str, args: Sequence[str]) -> int:
+    """
+    Run a command line (excluding the program name) in the `aut serve`
+    process listening on `socket_path`.  Output is written to this process'
+    stdout and stderr, and the exit status is returned.
+    """
+
+    env = dict(os.environ)
+    env.pop(VIA_DAEMON_ENV_VAR, None)
+    request = {"args": list(args), "cwd": os.getcwd(), "env": env}
+    streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+    # sys.stdin.buffer is a BufferedReader, though typed as BinaryIO.
+    stdin = cast(io.BufferedReader, sys.stdin.buffer)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode("utf8") + b"\n")
+        except OSError as exc:
+            raise DaemonError(
+                f"cannot connect to aut daemon at {socket_path} "
+                "(start one with `aut serve`)"
+            ) from exc
+
+        for message in _read_messages(sock):
+            if "exit_code" in message:
+                return int(message["exit_code"])
+            if "read_stdin" in message:
+                # Only what the command asks for is read, so that the rest of
+                # the input is left for the caller (e.g. a `while read` loop).
+                chunk = base64.b64encode(stdin.read1(STDIN_CHUNK_SIZE)).decode()
+                sock.sendall(json.dumps({"stdin": chunk}).encode("utf8") + b"\n")
+                continue
+            for name, text in message.items():
+                streams[name].write(text)
+                streams[name].flush()
+
+    raise DaemonError("aut daemon closed the connection before the command exited")
+
+
+def serve(socket_path: str) -> None:
+    """
+    Listen on `socket_path`, running each command received, until
+    interrupted.
+    """
+
+    with create_server(socket_path) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def create_server(socket_path: str) -> socketserver.UnixStreamServer:
+    """
+    Create a server listening on `socket_path`.  Commands are run one at a
+    time, since each one may change the working directory and environment of
+    the process.
+    """
+
+    socket_dir = os.path.dirname(socket_path)
+    if socket_dir:
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+    if os.path.exists(socket_path):
+        if _is_listening(socket_path):
+            raise DaemonError(f"aut daemon already listening at {socket_path}")
+        os.unlink(socket_path)
+
+    # Only the current user may connect.  The socket is created with these
+    # permissions, so there is no window in which others can connect.
+    old_umask = os.umask(0o177)
+    try:
+        return socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    finally:
+        os.umask(old_umask)
+
+
+def execute(
+    request: Dict[str, Any], stdin: TextIO, stdout: TextIO, stderr: TextIO
+) -> int:
+    """
+    Execute a request received from a client, reading its input from `stdin`,
+    writing its output to `stdout` and `stderr`, and returning the exit
+    status.
+    """
+
+    from . import session
+
+    args: List[str] = request["args"]
+    env: Dict[str, str] = request["env"]
+    env.pop(VIA_DAEMON_ENV_VAR, None)
+
+    saved_cwd = os.getcwd()
+    saved_env = dict(os.environ)
+    saved_stdin = sys.stdin
+    saved_interactive = session.interactive
+    try:
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(env)
+        sys.stdin = stdin
+        session.interactive = False
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            return session.run_command(args)
+    finally:
+        session.interactive = saved_interactive
+        sys.stdin = saved_stdin
+        os.environ.clear()
+        os.environ.update(saved_env)
+        os.chdir(saved_cwd)
+
+
+class _MessageWriter(io.StringIO):
+    """
+    Text stream which sends what is written to it to the client, as
+    `{<name>: <text>}` messages, at the end of each line and when flushed.
+    The stdout and stderr writers of a connection share a lock, so that
+    messages written from different threads are not interleaved.
+    """
+
+    def __init__(self, wfile: io.BufferedIOBase, name: str, lock: threading.Lock):
+        super().__init__()
+        self._wfile = wfile
+        self._name = name
+        self._lock = lock
+
+    def write(self, s: str) -> int:
+        num_written = super().write(s)
+        if "\n" in s:
+            self.flush()
+        return num_written
+
+    def flush(self) -> None:
+        text = self.getvalue()
+        if text:
+            self.seek(0)
+            self.truncate()
+            _send_message(self._wfile, {self._name: text}, self._lock)
+
+
+class _StdinReader(io.RawIOBase):
+    """
+    Binary stream which requests the client's standard input, a chunk at a
+    time, as the command reads it.  Output written so far is sent first, so
+    that any prompt is shown before the input is read.
+    """
+
+    def __init__(
+        self,
+        rfile: io.BufferedIOBase,
+        wfile: io.BufferedIOBase,
+        lock: threading.Lock,
+        writers: Sequence[TextIO],
+    ):
+        super().__init__()
+        self._rfile = rfile
+        self._wfile = wfile
+        self._lock = lock
+        self._writers = writers
+        self._pending = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if not self._pending and not self._eof:
+            for writer in self._writers:
+                writer.flush()
+            _send_message(self._wfile, {"read_stdin": True}, self._lock)
+            line = self._rfile.readline()
+            self._pending = base64.b64decode(json.loads(line)["stdin"]) if line else b""
+            self._eof = not self._pending
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        request = json.loads(self.rfile.readline())
+        lock = threading.Lock()
+        stdout = _MessageWriter(self.wfile, "stdout", lock)
+        stderr = _MessageWriter(self.wfile, "stderr", lock)
+        stdin = io.TextIOWrapper(
+            io.BufferedReader(
+                _StdinReader(self.rfile, self.wfile, lock, [stdout, stderr])
+            ),
+            encoding="utf8",
+        )
+        try:
+            exit_code = execute(request, stdin, stdout, stderr)
+            stdout.flush()
+            stderr.flush()
+            _send_message(self.wfile, {"exit_code": exit_code}, lock)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client has gone away (e.g. its output was piped to `head`).
+            pass
+
+
+def _send_message(
+    wfile: io.BufferedIOBase, message: Dict[str, Any], lock: threading.Lock
+) -> None:
+    with lock:
+        wfile.write(json.dumps(message).encode("utf8") + b"\n")
+
+
+def _read_messages(sock: socket.socket) -> Iterator[Dict[str, Any]]:
+    with sock.makefile("rb") as rfile:
+        for line in rfile:
+            yield json.loads(line)
+
+
+def _is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
@@ -1,21 +1,35 @@
 """Hardware wallet common functions.
 
-Currently only Trezor devices are supported."""
+Currently only Trezor devices are supported.  trezorlib is imported by each
+function, rather than by this module, so that it is only loaded when a device
+is used."""
+
+import hashlib
+import hmac
+import os.path
+from typing import TYPE_CHECKING, Optional
 
 import click
-import trezorlib.ethereum as trezor_eth
 from eth_typing import ChecksumAddress
-from trezorlib.client import TrezorClient, get_default_client
-from trezorlib.exceptions import Cancelled
-from trezorlib.tools import parse_path
-from trezorlib.transport import DeviceIsBusy
 
+from . import cache
+from .logging import log
 from .utils import to_checksum_address
 
+if TYPE_CHECKING:
+    from eth_keys.datatypes import PublicKey
+    from trezorlib.client import TrezorClient
+    from trezorlib.messages import Features
+
 TREZOR_DEFAULT_PREFIX = "m/44h/60h/0h/0"
 
+TREZOR_DIRECTORY_NAME = "trezor"
+
+
+def get_client() -> "TrezorClient":
+    from trezorlib.client import get_default_client
+    from trezorlib.transport import DeviceIsBusy
 
-def get_client() -> TrezorClient:
     try:
         return get_default_client()
     except DeviceIsBusy as exc:
@@ -29,19 +43,119 @@ def get_client() -> TrezorClient:
 def enumerate_accounts(
     prefix: str, start: int, n: int
 ) -> list[tuple[ChecksumAddress, str]]:
-    accounts: list[tuple[ChecksumAddress, str]] = []
+    """
+    The addresses of the accounts at indices `start` to `start + n - 1` under
+    the BIP32 derivation path `prefix`.
+
+    Addresses are derived locally from the public key of the `prefix` node,
+    so that the device is asked for a single public key rather than for each
+    address.  Hardened indices (or any for which the public key cannot be
+    used) are requested from the device one at a time.  Derived addresses are
+    cached per device, unless the device is protected by a passphrase (which
+    selects one of many wallets).
+    """
+    import trezorlib.ethereum as trezor_eth
+    from trezorlib.exceptions import Cancelled, TrezorFailure
+    from trezorlib.tools import HARDENED_FLAG, Address, parse_path
+
+    try:
+        prefix_path = parse_path(prefix)
+    except ValueError as exc:
+        raise click.ClickException(
+            f"Invalid Trezor BIP32 derivation path '{prefix}'."
+        ) from exc
+
     client = get_client()
+    cache_path = _accounts_cache_path(client.features)
+    accounts_cache = {} if cache_path is None else cache.read_json_file(cache_path)
+    prefix_cache = accounts_cache.setdefault(prefix, {"addresses": {}})
+    addresses: dict[str, str] = prefix_cache["addresses"]
+
+    indices = range(start, start + n)
+    missing = [index for index in indices if str(index) not in addresses]
     try:
-        for index in range(start, start + n):
-            path_str = prefix + f"/{index}"
-            try:
-                path = parse_path(path_str)
-            except ValueError as exc:
-                raise click.ClickException(
-                    f"Invalid Trezor BIP32 derivation path '{path_str}'."
-                ) from exc
-            address_str = trezor_eth.get_address(client, path)
-            accounts.append((to_checksum_address(address_str), path_str))
+        if any(not index & HARDENED_FLAG for index in missing):
+            if "public_key" not in prefix_cache:
+                try:
+                    node = trezor_eth.get_public_node(client, prefix_path).node
+                    prefix_cache["public_key"] = node.public_key.hex()
+                    prefix_cache["chain_code"] = node.chain_code.hex()
+                except TrezorFailure as exc:
+                    log(f"cannot derive addresses from {prefix}: {exc}")
+
+        for index in missing:
+            address = None
+            if not index & HARDENED_FLAG and "public_key" in prefix_cache:
+                address = derive_address(
+                    bytes.fromhex(prefix_cache["public_key"]),
+                    bytes.fromhex(prefix_cache["chain_code"]),
+                    index,
+                )
+            if address is None:
+                log(f"requesting address {prefix}/{index} from device")
+                address = trezor_eth.get_address(client, Address([*prefix_path, index]))
+            addresses[str(index)] = address
     except Cancelled as exc:  # user cancelled optional passphrase prompt
         raise click.Abort() from exc
-    return accounts
+
+    if missing and cache_path is not None:
+        cache.write_json_file(cache_path, accounts_cache)
+
+    return [
+        (to_checksum_address(addresses[str(index)]), f"{prefix}/{index}")
+        for index in indices
+    ]
+
+
+def derive_address(
+    public_key: bytes, chain_code: bytes, index: int
+) -> Optional[ChecksumAddress]:
+    """
+    The address of the (non-hardened) child `index` of the BIP32 node with
+    the given compressed public key and chain code, or None in the (very
+    unlikely) case that the child key is invalid.
+    """
+    from eth_keys.backends.native.jacobian import fast_add
+    from eth_keys.constants import SECPK1_N
+    from eth_keys.main import KeyAPI
+
+    digest = hmac.digest(
+        chain_code, public_key + index.to_bytes(4, "big"), hashlib.sha512
+    )
+    tweak = int.from_bytes(digest[:32], "big")
+    if tweak == 0 or tweak >= SECPK1_N:
+        return None
+
+    parent_point = _point(KeyAPI.PublicKey.from_compressed_bytes(public_key))
+    tweak_point = _point(KeyAPI.PrivateKey(digest[:32]).public_key)
+    x, y = fast_add(parent_point, tweak_point)
+    if x == 0 and y == 0:  # point at infinity
+        return None
+    return KeyAPI.PublicKey(
+        x.to_bytes(32, "big") + y.to_bytes(32, "big")
+    ).to_checksum_address()
+
+
+def _point(public_key: "PublicKey") -> tuple[int, int]:
+    public_key_bytes = public_key.to_bytes()
+    return (
+        int.from_bytes(public_key_bytes[:32], "big"),
+        int.from_bytes(public_key_bytes[32:], "big"),
+    )
+
+
+def _accounts_cache_path(features: "Features") -> Optional[str]:
+    """
+    Path of the file caching the addresses derived for a device, or None if
+    they must not be cached.
+    """
+    if not features.device_id:
+        return None
+    if features.passphrase_protection:
+        log("not caching addresses of a passphrase-protected device")
+        return None
+    return os.path.join(
+        cache.get_cache_directory(),
+        TREZOR_DIRECTORY_NAME,
+        f"{features.device_id}.json",
+    )
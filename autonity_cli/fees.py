@@ -0,0 +1,66 @@
+"""
+Fee oracle, supplying the base fee (and the `--fee-factor` maxFeePerGas) for
+transactions.
+
+Base fees are read with a single `eth_feeHistory` request, rather than
+downloading the whole block, and are cached in memory per endpoint and block
+number.  The cache is shared by all Web3 objects in the process (e.g. all
+commands run by `aut shell` or `aut serve`).
+"""
+
+from collections import OrderedDict
+from decimal import Decimal
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from eth_typing import BlockNumber
+from web3.types import Wei
+
+from .cache import provider_endpoint
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+MAX_CACHED_BLOCKS = 64
+"""
+Maximum number of blocks for which base fees are held in memory.
+"""
+
+_base_fees: "OrderedDict[Tuple[str, int], Optional[Wei]]" = OrderedDict()
+
+
+def base_fee_per_gas(w3: "Web3", block_number: Optional[int] = None) -> Optional[Wei]:
+    """
+    The base fee of a block (by default, the latest block), or None if the
+    block has no base fee.  Blocks given by number are only requested once.
+    """
+
+    endpoint = provider_endpoint(w3)
+    key = None if endpoint is None or block_number is None else (endpoint, block_number)
+    if key in _base_fees:
+        return _base_fees[key]
+
+    fee_history = w3.eth.fee_history(
+        1, "latest" if block_number is None else BlockNumber(block_number)
+    )
+    base_fees = fee_history.get("baseFeePerGas") or []
+    base_fee = Wei(base_fees[0]) if base_fees and base_fees[0] else None
+
+    if endpoint is not None:
+        _base_fees[(endpoint, fee_history["oldestBlock"])] = base_fee
+        while len(_base_fees) > MAX_CACHED_BLOCKS:
+            _base_fees.popitem(last=False)
+
+    return base_fee
+
+
+def max_fee_per_gas(
+    w3: "Web3", fee_factor: float, block_number: Optional[int] = None
+) -> Optional[Wei]:
+    """
+    The maxFeePerGas for a given `--fee-factor`: the base fee of the block
+    multiplied by `fee_factor`, or None if the block has no base fee.
+    """
+    base_fee = base_fee_per_gas(w3, block_number)
+    if base_fee is None:
+        return None
+    return Wei(int(Decimal(base_fee) * Decimal(str(fee_factor))))
@@ -0,0 +1,215 @@
+"""
+Optional cache of gas estimates, so that transactions which use a stable
+amount of gas (e.g. bonding, or claiming rewards) do not need an
+`eth_estimateGas` request each time.
+
+Entries are keyed by the recipient, the 4-byte function selector and a
+bucket of the calldata length, and are stored per chain in
+`<cache-dir>/gas/<chain-id>.json`.  Each entry records the gas estimates
+made for such transactions, and the gas used by them (recorded from their
+receipts by `tx wait` and `tx wait-batch`).  Once an entry exists, the
+largest recorded amount plus GAS_CACHE_MARGIN is used as the gas limit,
+instead of an estimate.  A transaction which runs out of gas records its gas
+limit, so that the next limit exceeds it by GAS_CACHE_MARGIN.
+
+The cache is only used when enabled with --gas-cache (or AUT_GAS_CACHE),
+and `aut cache gas-report` shows how well the cached limits match the gas
+actually used.
+"""
+
+import fcntl
+import json
+import math
+import os
+import os.path
+from contextlib import contextmanager
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    List,
+    Mapping,
+    Optional,
+    cast,
+)
+
+from eth_typing import HexStr
+from hexbytes import HexBytes
+from web3.types import TxData, TxParams, TxReceipt
+
+from . import cache
+from .logging import log
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+GAS_DIRECTORY_NAME = "gas"
+
+GAS_CACHE_MARGIN = 0.2
+"""
+Fraction added to the largest recorded amount of gas, to give the gas limit.
+"""
+
+Entries = Dict[str, Dict[str, Any]]
+
+
+def gas_cache_key(tx: Mapping[str, object]) -> Optional[str]:
+    """
+    The cache key for a transaction: the recipient, the function selector and
+    the calldata length (in 32-byte words after the selector, rounded up to a
+    power of 2).  None for contract creation.
+    """
+    to = tx.get("to")
+    if not to:
+        return None
+
+    data = HexBytes(cast(HexStr, tx.get("data") or tx.get("input") or b""))
+    selector = data[:4].to_0x_hex()
+    num_words = math.ceil(max(len(data) - 4, 0) / 32)
+    bucket = 0 if num_words == 0 else 1 << (num_words - 1).bit_length()
+    return f"{str(to).lower()}:{selector}:{bucket}"
+
+
+def estimate_gas(w3: "Web3", tx: TxParams) -> int:
+    """
+    The gas limit for `tx`, from the cache if it holds an entry for the
+    transaction, otherwise estimated by the node (and recorded).
+    """
+
+    key = gas_cache_key(tx)
+    if key is None:
+        return w3.eth.estimate_gas(tx)
+
+    with _locked_entries(w3) as entries:
+        entry = entries.get(key)
+        if entry is not None:
+            entry["hits"] += 1
+            gas = _gas_limit(entry)
+            log(f"using cached gas limit {gas} for {key}")
+            return gas
+
+    gas = w3.eth.estimate_gas(tx)
+    with _locked_entries(w3) as entries:
+        entry = entries.setdefault(key, _new_entry())
+        entry["estimates"] += 1
+        entry["max_estimate"] = max(entry["max_estimate"], gas)
+    return gas
+
+
+def record_gas_used(w3: "Web3", tx: TxData, tx_receipt: TxReceipt) -> None:
+    """
+    Record the gas used by a transaction, given its receipt.  Only successful
+    transactions are recorded, since a transaction which reverted may have
+    stopped early.  For transactions which ran out of gas (failed, having used
+    their whole gas limit), the gas limit is recorded instead, so that
+    the cached limit is raised above it.
+    """
+
+    key = gas_cache_key(tx)
+    if key is None:
+        return
+
+    gas_used = tx_receipt["gasUsed"]
+    with _locked_entries(w3) as entries:
+        if tx_receipt["status"] == 0:
+            gas = tx.get("gas", 0)
+            if gas_used >= gas:
+                entry = entries.setdefault(key, _new_entry())
+                entry["out_of_gas"] += 1
+                entry["max_out_of_gas"] = max(entry.get("max_out_of_gas", 0), gas)
+                log(f"transaction ran out of gas, raising the gas limit for {key}")
+            return
+
+        entry = entries.setdefault(key, _new_entry())
+        entry["receipts"] += 1
+        entry["max_gas_used"] = max(entry["max_gas_used"], gas_used)
+        entry["min_gas_used"] = min(entry["min_gas_used"] or gas_used, gas_used)
+
+
+def gas_report(w3: "Web3") -> List[Dict[str, Any]]:
+    """
+    The entries of the cache for the connected chain, with the gas limit
+    each would give and its headroom over the largest amount of gas used.
+    """
+
+    with _locked_entries(w3) as entries:
+        report: List[Dict[str, Any]] = []
+        for key, entry in sorted(entries.items()):
+            to, selector, bucket = key.split(":")
+            gas_limit = _gas_limit(entry)
+            max_gas_used = entry["max_gas_used"]
+            report.append(
+                {
+                    "to": to,
+                    "selector": selector,
+                    "calldata_words": int(bucket),
+                    **entry,
+                    "gas_limit": gas_limit,
+                    "headroom": (
+                        round(gas_limit / max_gas_used - 1, 4) if max_gas_used else None
+                    ),
+                }
+            )
+        return report
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {
+        "estimates": 0,
+        "max_estimate": 0,
+        "receipts": 0,
+        "min_gas_used": 0,
+        "max_gas_used": 0,
+        "hits": 0,
+        "out_of_gas": 0,
+        "max_out_of_gas": 0,
+    }
+
+
+def _gas_limit(entry: Dict[str, Any]) -> int:
+    largest = max(
+        entry["max_estimate"], entry["max_gas_used"], entry.get("max_out_of_gas", 0)
+    )
+    return math.ceil(largest * (1 + GAS_CACHE_MARGIN))
+
+
+@contextmanager
+def _locked_entries(w3: "Web3") -> Generator[Entries, None, None]:
+    """
+    The entries for the connected chain, holding an exclusive lock on the
+    file.  Changes to the entries are written back when the context exits.
+    """
+
+    file_path = os.path.join(
+        cache.get_cache_directory(), GAS_DIRECTORY_NAME, f"{cache.chain_id(w3)}.json"
+    )
+    os.makedirs(os.path.dirname(file_path), mode=0o700, exist_ok=True)
+    fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, "r+", encoding="utf8") as gas_f:
+        fcntl.flock(gas_f, fcntl.LOCK_EX)
+        try:
+            entries = _read_entries(gas_f)
+            yield entries
+            _write_entries(gas_f, entries)
+        finally:
+            fcntl.flock(gas_f, fcntl.LOCK_UN)
+
+
+def _read_entries(gas_f: IO[str]) -> Entries:
+    contents = gas_f.read()
+    if not contents:
+        return {}
+    try:
+        return json.loads(contents)
+    except ValueError:
+        log(f"ignoring invalid gas cache file {gas_f.name}")
+        return {}
+
+
+def _write_entries(gas_f: IO[str], entries: Entries) -> None:
+    gas_f.seek(0)
+    gas_f.truncate()
+    json.dump(entries, gas_f)
+    gas_f.flush()
@@ -0,0 +1,221 @@
+"""
+Index of the keyfiles in a keystore directory, so that the account of each
+keyfile is known without reading and parsing every file.
+
+The index of a keystore is stored in
+`<cache-dir>/keystores/<hash-of-keystore-path>.json`, and records the
+address, modification time and size of each file, along with the
+modification time of the directory itself.  On each lookup, the directory
+is only listed if its modification time has changed (i.e. files have been
+added, removed or renamed), and only files whose modification time or size
+has changed are read again, by a pool of threads.  `--rebuild-index`
+discards the index and reads every file.
+
+Modification times are only trusted if they are older than the index by
+more than MTIME_RESOLUTION_NS, since a directory or file changed in the same
+timestamp tick as the index was written would otherwise appear unchanged.
+"""
+
+import hashlib
+import itertools
+import os
+import os.path
+import stat
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from eth_typing import ChecksumAddress
+from web3 import Web3
+
+from . import cache
+from .keyfile import load_keyfile
+from .logging import log
+
+KEYSTORES_DIRECTORY_NAME = "keystores"
+
+SCAN_WORKERS = 8
+"""
+Number of threads reading and parsing keyfiles.
+"""
+
+SCAN_CHUNK_SIZE = 256
+"""
+Number of keyfiles passed to a thread at a time.
+"""
+
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+"""
+Maximum number of chunks queued per thread, bounding the memory used while
+scanning large keystores.
+"""
+
+MTIME_RESOLUTION_NS = 2_000_000_000
+"""
+Coarsest modification time resolution expected of a filesystem.
+"""
+
+Index = Dict[str, Any]
+
+
+def index_file_path(keystore_dir: str) -> str:
+    """
+    Path of the file holding the index of `keystore_dir`.
+    """
+    keystore_hash = hashlib.sha256(os.path.abspath(keystore_dir).encode()).hexdigest()
+    return os.path.join(
+        cache.get_cache_directory(), KEYSTORES_DIRECTORY_NAME, f"{keystore_hash}.json"
+    )
+
+
+def scan_keystore(
+    keystore_dir: str, rebuild: bool = False, workers: int = SCAN_WORKERS
+) -> Iterator[Tuple[ChecksumAddress, str]]:
+    """
+    Generate the (EIP55 checksum address, path) of each keyfile in
+    `keystore_dir`, refreshing the index as necessary.  Keyfiles which must be
+    read are read and parsed by a pool of `workers` threads, and results are
+    generated (in directory order) as they become available.  The index is
+    written once all keyfiles have been generated.  If `rebuild` is True, the
+    existing index is ignored.
+    """
+
+    index_path = index_file_path(keystore_dir)
+    index = {} if rebuild else cache.read_json_file(index_path)
+    indexed_files: Dict[str, Index] = index.get("files", {})
+    trusted_before = index.get("time_ns", 0) - MTIME_RESOLUTION_NS
+    refreshed = False
+
+    # The directory is stat-ed before being listed, so that files added while
+    # listing it cause it to be listed again next time.
+    time_ns = time.time_ns()
+    dir_stat = os.stat(keystore_dir)
+    if _unchanged(index, dir_stat, trusted_before):
+        keystore_files = _indexed_files(keystore_dir, indexed_files)
+    else:
+        log(f"listing keystore {keystore_dir}")
+        keystore_files = _listed_files(keystore_dir)
+        refreshed = True
+
+    files: Dict[str, Index] = {}
+    with ThreadPoolExecutor(workers) as executor:
+        pending: Deque["Future[Tuple[List[Tuple[str, Index]], bool]]"] = deque()
+
+        def next_results() -> Iterator[Tuple[ChecksumAddress, str]]:
+            nonlocal refreshed
+            entries, chunk_refreshed = pending.popleft().result()
+            refreshed = refreshed or chunk_refreshed
+            for file_name, entry in entries:
+                files[file_name] = entry
+                if entry["address"] is not None:
+                    yield entry["address"], os.path.join(keystore_dir, file_name)
+
+        while chunk := list(itertools.islice(keystore_files, SCAN_CHUNK_SIZE)):
+            pending.append(
+                executor.submit(
+                    _scan_chunk, keystore_dir, chunk, indexed_files, trusted_before
+                )
+            )
+            while pending and (
+                len(pending) > workers * MAX_PENDING_CHUNKS_PER_WORKER
+                or pending[0].done()
+            ):
+                yield from next_results()
+
+        while pending:
+            yield from next_results()
+
+    if refreshed or files.keys() != indexed_files.keys():
+        cache.write_json_file(
+            index_path, {"time_ns": time_ns, **_stat_entry(dir_stat), "files": files}
+        )
+
+
+def keystore_accounts(
+    keystore_dir: str, rebuild: bool = False
+) -> Dict[ChecksumAddress, str]:
+    """
+    The accounts of the keyfiles in `keystore_dir`, as a dictionary of EIP55
+    checksum addresses to keyfile paths (see `scan_keystore`).
+    """
+    return dict(scan_keystore(keystore_dir, rebuild))
+
+
+def find_keyfile(keystore_dir: str, address: ChecksumAddress) -> Optional[str]:
+    """
+    The path of the keyfile for `address` in `keystore_dir`, if there is one.
+    """
+    return keystore_accounts(keystore_dir).get(address)
+
+
+def _scan_chunk(
+    keystore_dir: str,
+    chunk: List[Tuple[str, os.stat_result]],
+    indexed_files: Dict[str, Index],
+    trusted_before: int,
+) -> Tuple[List[Tuple[str, Index]], bool]:
+    """
+    The index entries for a chunk of files, reading those which are not
+    unchanged since they were indexed, and whether any were read.
+    """
+    entries: List[Tuple[str, Index]] = []
+    refreshed = False
+    for file_name, file_stat in chunk:
+        entry = indexed_files.get(file_name, {})
+        if not _unchanged(entry, file_stat, trusted_before):
+            file_path = os.path.join(keystore_dir, file_name)
+            entry = {"address": _keyfile_address(file_path), **_stat_entry(file_stat)}
+            refreshed = True
+        entries.append((file_name, entry))
+    return entries, refreshed
+
+
+def _listed_files(keystore_dir: str) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    The name and stat result of each regular file in the keystore.
+    """
+    with os.scandir(keystore_dir) as dir_entries:
+        for dir_entry in dir_entries:
+            if dir_entry.is_file():
+                yield dir_entry.name, dir_entry.stat()
+
+
+def _indexed_files(
+    keystore_dir: str, indexed_files: Dict[str, Index]
+) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    The name and stat result of each file in the index which still exists.
+    """
+    for file_name in indexed_files:
+        try:
+            file_stat = os.stat(os.path.join(keystore_dir, file_name))
+        except FileNotFoundError:
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            yield file_name, file_stat
+
+
+def _stat_entry(st: os.stat_result) -> Index:
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _unchanged(entry: Index, st: os.stat_result, trusted_before: int) -> bool:
+    """
+    Whether a file (or directory) is unchanged since its index entry was
+    recorded.
+    """
+    return (
+        entry.get("mtime_ns") == st.st_mtime_ns < trusted_before
+        and entry.get("size") == st.st_size
+    )
+
+
+def _keyfile_address(file_path: str) -> Optional[ChecksumAddress]:
+    """
+    The address in a keyfile, or None if the file is not a keyfile.
+    """
+    try:
+        return Web3.to_checksum_address("0x" + load_keyfile(file_path)["address"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
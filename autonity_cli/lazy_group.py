@@ -0,0 +1,84 @@
+"""
+Click group which defers importing its subcommands until they are used.
+"""
+
+import dataclasses
+import importlib
+from typing import Any, Dict, List, Mapping, Optional
+
+import click
+from click.utils import make_default_short_help
+
+
+@dataclasses.dataclass(frozen=True)
+class LazyCommand:
+    """
+    Location of a command which has not been imported yet.  `import_path` is
+    of the form "package.module:attribute", and `help` is the short help text
+    displayed in the parent group's command list.
+    """
+
+    import_path: str
+    help: str
+
+
+class LazyGroup(click.Group):
+    """
+    A click Group whose subcommands are given as `LazyCommand`s, and only
+    imported when they are resolved.  Listing the commands (e.g. in the help
+    text) uses the help text held in the `LazyCommand`, so does not import
+    anything.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        lazy_subcommands: Optional[Mapping[str, LazyCommand]] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands: Dict[str, LazyCommand] = dict(lazy_subcommands or {})
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        lazy_command = self.lazy_subcommands.pop(cmd_name, None)
+        if lazy_command is not None:
+            self.add_command(_load_command(lazy_command), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        names = self.list_commands(ctx)
+        if not names:
+            return
+
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows: List[tuple[str, str]] = []
+        for name in names:
+            lazy_command = self.lazy_subcommands.get(name)
+            if lazy_command is not None:
+                rows.append((name, make_default_short_help(lazy_command.help, limit)))
+                continue
+
+            cmd = self.get_command(ctx, name)
+            if cmd is None or cmd.hidden:
+                continue
+            rows.append((name, cmd.get_short_help_str(limit)))
+
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+def _load_command(lazy_command: LazyCommand) -> click.Command:
+    """
+    Import the module holding a lazy command, and return the command object.
+    """
+    module_name, attr_name = lazy_command.import_path.split(":")
+    command = getattr(importlib.import_module(module_name), attr_name)
+    if not isinstance(command, click.Command):
+        raise TypeError(f"{lazy_command.import_path} is not a click Command")
+    return command
@@ -0,0 +1,389 @@
+"""
+Local index of the event logs of contracts, so that queries over their whole
+history (e.g. all transfers of a token to an account) are answered from disk
+rather than by scanning the chain.
+
+The index of each chain is a SQLite database, `<state-dir>/logs/<chain-id>.db`
+(see `state`), holding the logs of each indexed contract (with their decoded
+events), the last block synced for each contract, and the hashes of recently
+synced blocks.  Syncing scans only the blocks after the last synced block, in
+chunks (as by `logs.scan_logs`).  The hash of the last block of each chunk is
+read before and after its logs are fetched, and the chunk is fetched again if
+the chain was reorganised in between, so that logs are never recorded under
+the hash of another fork.  Before and after syncing, the stored block hashes
+are compared with those of the node and, if the chain has been reorganised,
+logs of the replaced blocks are removed, so that those blocks are scanned
+again.
+"""
+
+import json
+import os
+import os.path
+import sqlite3
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from eth_typing import ABI, ChecksumAddress, HexStr
+from web3.types import BlockData, LogReceipt
+
+from . import cache, state
+from .batch import max_concurrent_requests
+from .logging import log
+from .logs import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_IN_FLIGHT,
+    LogDecoder,
+    LogRange,
+    Topics,
+    get_logs,
+    map_chunks,
+)
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+LOGS_DIRECTORY_NAME = "logs"
+
+MAX_TRACKED_BLOCKS = 128
+"""
+Number of synced block hashes kept for detecting reorganisations.
+"""
+
+SYNC_ATTEMPTS = 3
+"""
+Number of times blocks are fetched again while the chain keeps being
+reorganised, before giving up.
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contracts (
+    address TEXT PRIMARY KEY,
+    start_block INTEGER NOT NULL,
+    synced_block INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blocks (
+    block_number INTEGER PRIMARY KEY,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS logs (
+    address TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    transaction_hash TEXT NOT NULL,
+    transaction_index INTEGER NOT NULL,
+    topic0 TEXT,
+    topic1 TEXT,
+    topic2 TEXT,
+    topic3 TEXT,
+    data TEXT NOT NULL,
+    event TEXT,
+    args TEXT,
+    PRIMARY KEY (block_number, log_index)
+);
+CREATE INDEX IF NOT EXISTS logs_topic0 ON logs (address, topic0, block_number);
+CREATE INDEX IF NOT EXISTS logs_topic1 ON logs (address, topic1, block_number);
+CREATE INDEX IF NOT EXISTS logs_topic2 ON logs (address, topic2, block_number);
+"""
+
+
+def index_file_path(chain_id: int) -> str:
+    """
+    Path of the database holding the log index of a chain.
+    """
+    return os.path.join(
+        state.get_state_directory(), LOGS_DIRECTORY_NAME, f"{chain_id}.db"
+    )
+
+
+class LogIndex:
+    """
+    The log index of the chain of `w3`.
+    """
+
+    def __init__(self, w3: "Web3"):
+        self._w3 = w3
+        file_path = index_file_path(cache.chain_id(w3))
+        os.makedirs(os.path.dirname(file_path), mode=0o700, exist_ok=True)
+        self._db = sqlite3.connect(file_path, timeout=60)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "LogIndex":
+        return self
+
+    def __exit__(self, *_args: Any) -> None:
+        self.close()
+
+    def synced_block(self, address: ChecksumAddress) -> Optional[int]:
+        """
+        The last block indexed for the contract at `address`, or None if it is
+        not indexed.
+        """
+        row = self._db.execute(
+            "SELECT synced_block FROM contracts WHERE address = ?", (address,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def sync(
+        self,
+        address: ChecksumAddress,
+        abi: ABI,
+        start: int,
+        end: int,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    ) -> int:
+        """
+        Index the logs of the contract at `address` up to block `end`,
+        decoded using the events in `abi`, returning the number of logs added.
+        A contract which is not yet indexed is indexed from block `start`;
+        otherwise, only the blocks after its last synced block are scanned.
+        The index is updated after each chunk of blocks, so an interrupted
+        sync continues from the last complete chunk.  If the chain was
+        reorganised during the sync, the replaced blocks are indexed again.
+        """
+
+        self.rollback_reorg()
+        num_logs = -self._num_logs(address)
+        decoder = LogDecoder(self._w3, abi)
+        for _ in range(SYNC_ATTEMPTS):
+            self._sync_logs(address, decoder, start, end, chunk_size, max_in_flight)
+            if self.rollback_reorg() is None:
+                return num_logs + self._num_logs(address)
+        raise ValueError(f"chain reorganised during {SYNC_ATTEMPTS} syncs in a row")
+
+    def rollback_reorg(self) -> Optional[int]:
+        """
+        Compare all stored hashes of synced blocks with those of the node, and
+        remove everything indexed after the newest block below the oldest
+        replaced block.  (Blocks may have been synced from different forks,
+        so a replaced block may be older than a block which still matches.)
+        Returns the block rolled back to, or None if the chain was not
+        reorganised.
+        """
+
+        # Imported here, since `user` imports most of web3.
+        from .user import get_block_headers
+
+        rows: List[Tuple[int, str]] = self._db.execute(
+            "SELECT block_number, block_hash FROM blocks ORDER BY block_number"
+        ).fetchall()
+        if not rows:
+            return None
+        headers = get_block_headers(self._w3, [row[0] for row in rows])
+        replaced = [
+            index
+            for index, ((_, block_hash), header) in enumerate(zip(rows, headers))
+            if _header_hash(header) != block_hash
+        ]
+        if not replaced:
+            return None
+
+        fork_block = rows[replaced[0] - 1][0] if replaced[0] > 0 else -1
+        log(f"chain reorganised, rolling back the log index to block {fork_block}")
+        with self._db:
+            self._db.execute("DELETE FROM logs WHERE block_number > ?", (fork_block,))
+            self._db.execute("DELETE FROM blocks WHERE block_number > ?", (fork_block,))
+            self._db.execute(
+                "UPDATE contracts SET synced_block = ? WHERE synced_block > ?",
+                (fork_block, fork_block),
+            )
+        return fork_block
+
+    def remove(self, address: ChecksumAddress) -> None:
+        """
+        Remove the contract at `address`, and its logs, from the index.
+        """
+        with self._db:
+            self._db.execute("DELETE FROM logs WHERE address = ?", (address,))
+            self._db.execute("DELETE FROM contracts WHERE address = ?", (address,))
+
+    def query(
+        self,
+        address: ChecksumAddress,
+        topics: Topics,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Generate the indexed logs of the contract at `address` which match
+        `topics` (as for eth_getLogs, except that each topic is a single
+        value or None) in the blocks `start` to `end`, in order.  Logs are
+        in the format of `LogDecoder.decode`.
+        """
+
+        conditions = ["address = ?", "block_number >= ?"]
+        params: List[Any] = [address, start]
+        if end is not None:
+            conditions.append("block_number <= ?")
+            params.append(end)
+        for position, topic in enumerate(topics):
+            if topic is not None:
+                if not isinstance(topic, str):
+                    raise ValueError("indexed logs only match single topic values")
+                conditions.append(f"topic{position} = ?")
+                params.append(topic.lower())
+
+        cursor = self._db.execute(
+            f"SELECT * FROM logs WHERE {' AND '.join(conditions)} "
+            "ORDER BY block_number, log_index",
+            params,
+        )
+        for row in cursor:
+            yield _decoded_log(row)
+
+    def _sync_logs(
+        self,
+        address: ChecksumAddress,
+        decoder: LogDecoder,
+        start: int,
+        end: int,
+        chunk_size: int,
+        max_in_flight: int,
+    ) -> None:
+        row = self._db.execute(
+            "SELECT start_block, synced_block FROM contracts WHERE address = ?",
+            (address,),
+        ).fetchone()
+        if row is None:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO contracts VALUES (?, ?, ?)",
+                    (address, start, start - 1),
+                )
+        elif start < row[0]:
+            raise ValueError(
+                f"{address} is indexed from block {row[0]} (rebuild the index to "
+                f"index from block {start})"
+            )
+        else:
+            start = max(row[0], row[1] + 1)
+
+        def get_chunk(chunk_start: int, chunk_end: int) -> Tuple[LogRange, str]:
+            return self._get_chunk(address, chunk_start, chunk_end)
+
+        for log_range, block_hash in map_chunks(
+            get_chunk,
+            start,
+            end,
+            chunk_size,
+            max_concurrent_requests(self._w3, max_in_flight),
+        ):
+            rows = [_log_row(log_entry, decoder) for log_entry in log_range.logs]
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO logs VALUES ({', '.join('?' * 13)})",
+                    rows,
+                )
+                self._db.execute(
+                    "UPDATE contracts SET synced_block = ? WHERE address = ?",
+                    (log_range.end, address),
+                )
+                self._record_block(log_range.end, block_hash)
+            log(f"indexed {len(rows)} logs of {address} up to {log_range.end}")
+
+    def _num_logs(self, address: ChecksumAddress) -> int:
+        return self._db.execute(
+            "SELECT COUNT(*) FROM logs WHERE address = ?", (address,)
+        ).fetchone()[0]
+
+    def _get_chunk(
+        self, address: ChecksumAddress, start: int, end: int
+    ) -> Tuple[LogRange, str]:
+        """
+        The logs of the contract at `address` in the blocks `start` to `end`,
+        and the hash of block `end` on the fork from which they were fetched.
+        """
+
+        for _ in range(SYNC_ATTEMPTS):
+            block_hash = self._block_hash(end)
+            log_range = get_logs(self._w3, address, [], start, end)
+            if self._block_hash(end) == block_hash and all(
+                log_entry["blockHash"].to_0x_hex() == block_hash
+                for log_entry in log_range.logs
+                if log_entry["blockNumber"] == end
+            ):
+                return log_range, block_hash
+            log(f"chain reorganised while fetching blocks {start}-{end}, retrying")
+        raise ValueError(
+            f"chain reorganised while fetching blocks {start}-{end} "
+            f"{SYNC_ATTEMPTS} times"
+        )
+
+    def _block_hash(self, block_number: int) -> str:
+        # Imported here, since `user` imports most of web3.
+        from .user import get_block_header
+
+        return _header_hash(get_block_header(self._w3, block_number))
+
+    def _record_block(self, block_number: int, block_hash: str) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO blocks VALUES (?, ?)", (block_number, block_hash)
+        )
+        self._db.execute(
+            "DELETE FROM blocks WHERE block_number NOT IN "
+            "(SELECT block_number FROM blocks ORDER BY block_number DESC LIMIT ?)",
+            (MAX_TRACKED_BLOCKS,),
+        )
+
+
+def _header_hash(header: BlockData) -> str:
+    block_hash = header.get("hash")
+    if block_hash is None:
+        raise ValueError(f"cannot determine hash of block {header.get('number')}")
+    return block_hash.to_0x_hex()
+
+
+def _log_row(log_entry: LogReceipt, decoder: LogDecoder) -> Tuple[Any, ...]:
+    # Imported here, since `utils` imports most of the CLI.
+    from .utils import JSONEncoder
+
+    decoded = decoder.decode(log_entry)
+    topics: List[Optional[str]] = [t.to_0x_hex() for t in log_entry["topics"]]
+    topics += [None] * (4 - len(topics))
+    event = decoded["event"]
+    return (
+        log_entry["address"],
+        log_entry["blockNumber"],
+        log_entry["logIndex"],
+        log_entry["blockHash"].to_0x_hex(),
+        log_entry["transactionHash"].to_0x_hex(),
+        log_entry["transactionIndex"],
+        *topics,
+        log_entry["data"].to_0x_hex(),
+        event,
+        None if event is None else json.dumps(decoded["args"], cls=JSONEncoder),
+    )
+
+
+def _decoded_log(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    (
+        address,
+        block_number,
+        log_index,
+        block_hash,
+        transaction_hash,
+        transaction_index,
+        *topics,
+        data,
+        event,
+        args,
+    ) = row
+    location = {
+        "address": address,
+        "blockHash": HexStr(block_hash),
+        "blockNumber": block_number,
+        "logIndex": log_index,
+        "transactionHash": HexStr(transaction_hash),
+        "transactionIndex": transaction_index,
+    }
+    if event is None:
+        return {
+            "event": None,
+            **location,
+            "data": data,
+            "topics": [topic for topic in topics if topic is not None],
+        }
+    return {"event": event, "args": json.loads(args), **location}
@@ -15,6 +15,14 @@ def enable_logging() -> None:
     logging_enabled = True
 
 
+def disable_logging() -> None:
+    """
+    Disable the log function (the default).
+    """
+    global logging_enabled
+    logging_enabled = False
+
+
 def log(msg: str, no_newline: bool = False) -> None:
     """
     Log a message.  Currently just goes to stderr.
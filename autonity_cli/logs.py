@@ -0,0 +1,251 @@
+"""
+Scanning of event logs (eth_getLogs) over large block ranges.
+
+The range is divided into chunks of blocks, several of which are requested
+concurrently, and logs are generated in block order.  Nodes limit the number
+of logs (or the size of the response) that one eth_getLogs request may
+return, so any range which the node rejects as too large is split in half,
+repeatedly if necessary, until each part can be served.
+"""
+
+import dataclasses
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from eth_typing import ABI, ABIEvent, ChecksumAddress, HexStr
+from eth_utils.abi import event_abi_to_log_topic
+from hexbytes import HexBytes
+from web3 import Web3
+from web3._utils.events import get_event_data
+from web3.exceptions import LogTopicError, MismatchedABI, Web3RPCError
+from web3.types import FilterParams, LogReceipt
+
+from .batch import max_concurrent_requests
+from .logging import log
+
+DEFAULT_CHUNK_SIZE = 10_000
+"""
+Default number of blocks requested by each eth_getLogs call.
+"""
+
+DEFAULT_MAX_IN_FLIGHT = 4
+"""
+Default number of eth_getLogs requests made concurrently.
+"""
+
+TOO_MANY_RESULTS_ERRORS = (
+    "query returned more than",
+    "too many results",
+    "response size exceeded",
+    "response size should not",
+    "maximum block range",
+    "block range is too large",
+    "block range too large",
+    "query timeout exceeded",
+)
+"""
+Fragments of the (lower-cased) error messages with which nodes and RPC
+providers reject an eth_getLogs request for returning too many logs.  These
+must not match rate-limit errors (e.g. "rate limit exceeded"), since splitting
+a throttled request only makes more requests.
+"""
+
+T = TypeVar("T")
+
+Topics = Sequence[Optional[Union[HexStr, Sequence[HexStr]]]]
+
+
+@dataclasses.dataclass(frozen=True)
+class LogRange:
+    """
+    The logs emitted in the blocks `start` to `end` (inclusive).
+    """
+
+    start: int
+    end: int
+    logs: List[LogReceipt]
+
+
+def scan_logs(
+    w3: Web3,
+    address: Optional[ChecksumAddress],
+    topics: Topics,
+    start: int,
+    end: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[LogRange]:
+    """
+    Generate the logs matching `address` and `topics` in the blocks `start`
+    to `end` (inclusive), as consecutive ranges of at most `chunk_size`
+    blocks, in order.  Up to `max_in_flight` chunks (limited by
+    `max_concurrent_requests`) are requested concurrently.
+    """
+
+    def get_chunk(chunk_start: int, chunk_end: int) -> LogRange:
+        return get_logs(w3, address, topics, chunk_start, chunk_end)
+
+    return map_chunks(
+        get_chunk, start, end, chunk_size, max_concurrent_requests(w3, max_in_flight)
+    )
+
+
+def map_chunks(
+    func: Callable[[int, int], T],
+    start: int,
+    end: int,
+    chunk_size: int,
+    max_in_flight: int,
+) -> Iterator[T]:
+    """
+    Generate the results of `func(chunk_start, chunk_end)` for consecutive
+    chunks of at most `chunk_size` blocks from `start` to `end` (inclusive),
+    in order, calling it for up to `max_in_flight` chunks concurrently.
+    """
+
+    chunks = (
+        (chunk_start, min(chunk_start + chunk_size - 1, end))
+        for chunk_start in range(start, end + 1, chunk_size)
+    )
+    with ThreadPoolExecutor(max_in_flight) as executor:
+        in_flight: Deque["Future[T]"] = deque()
+        for chunk_start, chunk_end in chunks:
+            in_flight.append(executor.submit(func, chunk_start, chunk_end))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def scan_decoded_logs(
+    w3: Web3,
+    address: ChecksumAddress,
+    abi: ABI,
+    topics: Topics,
+    start: int,
+    end: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate the logs of the contract at `address` matching `topics`, in
+    order, decoded using the events in `abi` (see `LogDecoder`).
+    """
+    decoder = LogDecoder(w3, abi)
+    for log_range in scan_logs(
+        w3, address, topics, start, end, chunk_size, max_in_flight
+    ):
+        for log_entry in log_range.logs:
+            yield decoder.decode(log_entry)
+
+
+def get_logs(
+    w3: Web3,
+    address: Optional[ChecksumAddress],
+    topics: Topics,
+    start: int,
+    end: int,
+) -> LogRange:
+    """
+    The logs matching `address` and `topics` in the blocks `start` to `end`
+    (inclusive).  If the node rejects the range for returning too many
+    results, it is split in half and each half is requested in turn.
+    """
+
+    filter_params: FilterParams = {
+        "fromBlock": start,
+        "toBlock": end,
+        "topics": list(topics),
+    }
+    if address is not None:
+        filter_params["address"] = address
+
+    try:
+        return LogRange(start, end, list(w3.eth.get_logs(filter_params)))
+    except Web3RPCError as exc:
+        if start == end or not is_too_many_results(exc):
+            raise
+        log(f"splitting blocks {start}-{end}: {exc}")
+
+    middle = (start + end) // 2
+    first = get_logs(w3, address, topics, start, middle)
+    second = get_logs(w3, address, topics, middle + 1, end)
+    return LogRange(start, end, first.logs + second.logs)
+
+
+def is_too_many_results(exc: Web3RPCError) -> bool:
+    """
+    Whether an eth_getLogs error indicates that the range should be split.
+    """
+    error = (exc.rpc_response or {}).get("error")
+    message = error.get("message", "") if isinstance(error, dict) else str(exc)
+    message = str(message).lower()
+    return any(fragment in message for fragment in TOO_MANY_RESULTS_ERRORS)
+
+
+def find_abi_event(abi: ABI, name: str) -> ABIEvent:
+    """
+    The event with the given name in `abi`.
+    """
+    for entry in abi:
+        if entry.get("type") == "event" and entry.get("name") == name:
+            return cast(ABIEvent, entry)
+    raise ValueError(f"event '{name}' not found in ABI")
+
+
+def event_topic(event_abi: ABIEvent) -> HexStr:
+    """
+    The topic (signature hash) identifying logs of the given event.
+    """
+    return HexStr(HexBytes(event_abi_to_log_topic(event_abi)).to_0x_hex())
+
+
+def address_topic(address: ChecksumAddress) -> HexStr:
+    """
+    The topic holding an indexed address parameter.
+    """
+    return HexStr("0x" + "00" * 12 + address[2:].lower())
+
+
+class LogDecoder:
+    """
+    Decodes logs using the events of a contract ABI.
+    """
+
+    def __init__(self, w3: Web3, abi: ABI):
+        self._codec = w3.codec
+        self._events: Dict[HexBytes, ABIEvent] = {}
+        for entry in abi:
+            if entry.get("type") == "event" and not entry.get("anonymous"):
+                event_abi = cast(ABIEvent, entry)
+                topic = HexBytes(event_abi_to_log_topic(event_abi))
+                self._events[topic] = event_abi
+
+    def decode(self, log_entry: LogReceipt) -> Dict[str, Any]:
+        """
+        The decoded event (name, arguments and location) of a log.  Logs which
+        do not match any event in the ABI are returned as they are, with an
+        event name of None.
+        """
+        topics = log_entry["topics"]
+        event_abi = self._events.get(HexBytes(topics[0])) if topics else None
+        if event_abi is not None:
+            try:
+                return dict(get_event_data(self._codec, event_abi, log_entry))
+            except (LogTopicError, MismatchedABI):
+                pass
+        return {"event": None, **log_entry}
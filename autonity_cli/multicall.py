@@ -0,0 +1,199 @@
+"""
+Aggregation of contract view calls into a single eth_call, via the Multicall3
+contract (see https://github.com/mds1/multicall).  Where Multicall3 is not
+deployed, calls are made as JSON-RPC batches instead.
+"""
+
+import typing
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+import eth_typing
+from eth_abi.exceptions import DecodingError
+from eth_typing import ChecksumAddress
+from eth_utils.abi import function_signature_to_4byte_selector, get_abi_output_types
+from web3 import Web3
+from web3.contract.contract import ContractFunction
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+from web3.types import BlockIdentifier
+
+from . import cache, erc20
+from .batch import DEFAULT_BATCH_SIZE, Request, batch_requests
+from .logging import log
+
+MULTICALL3_ADDRESS = Web3.to_checksum_address(
+    "0xca11bde05977b3631167028862be2a173976ca11"
+)
+"""
+Address of Multicall3, which is deployed at the same address on all chains
+that have it.
+"""
+
+MAX_CALLS_PER_MULTICALL = 200
+"""
+Maximum number of view calls packed into one eth_call, keeping each call well
+within the gas cap that nodes apply to eth_call.
+"""
+
+
+def multicall(
+    w3: Web3,
+    calls: Sequence[ContractFunction],
+    block_identifier: Optional[BlockIdentifier] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Any]:
+    """
+    Make the given contract view calls, as of the given block (default
+    'latest'), and return the results in order.  Calls are packed into
+    Multicall3 `aggregate3` calls, sent together as a JSON-RPC batch, so that
+    many lookups cost one round trip.  Where Multicall3 is not available (or
+    any call reverts or returns undecodable data, in which case the individual
+    calls report the error), the calls are made individually, in batches of at
+    most `batch_size`.
+    """
+
+    block = "latest" if block_identifier is None else block_identifier
+
+    if len(calls) > 1 and multicall_available(w3):
+        chunks = [
+            calls[start : start + MAX_CALLS_PER_MULTICALL]
+            for start in range(0, len(calls), MAX_CALLS_PER_MULTICALL)
+        ]
+        try:
+            return _aggregate(w3, chunks, block, batch_size)
+        except (BadFunctionCallOutput, ContractLogicError, DecodingError) as exc:
+            log(f"multicall failed ({exc}), falling back to individual calls")
+
+    return batch_requests(
+        w3, [_call_request(call, block) for call in calls], batch_size
+    )
+
+
+def call_with_decimals(
+    w3: Web3, token: ChecksumAddress, call: ContractFunction
+) -> Tuple[Any, int]:
+    """
+    Make a view call to the ERC20 token at `token`, returning its result and
+    the token's decimals.  The decimals are read from the cache (see
+    `cache.token_decimals`) or, on a cache miss, requested in the same
+    multicall as the view call.
+    """
+
+    results: List[Any] = []
+
+    def fetch_decimals() -> int:
+        decimals_call = w3.eth.contract(token, abi=erc20.ABI).functions.decimals()
+        results.extend(multicall(w3, [call, decimals_call]))
+        return results[1]
+
+    decimals = cache.token_decimals(w3, token, fetch_decimals)
+    if not results:
+        results.append(call.call())
+    return results[0], decimals
+
+
+@lru_cache(maxsize=None)
+def multicall_available(w3: Web3) -> bool:
+    """
+    True if Multicall3 is deployed on the chain that `w3` is connected to.
+    Checked once per Web3 object, and cached on disk (see `cache.cached`).
+    """
+    return cache.cached(
+        w3, "multicall3", lambda: len(w3.eth.get_code(MULTICALL3_ADDRESS)) > 0
+    )
+
+
+def _aggregate(
+    w3: Web3,
+    chunks: Sequence[Sequence[ContractFunction]],
+    block: BlockIdentifier,
+    batch_size: int,
+) -> List[Any]:
+    multicall3 = w3.eth.contract(MULTICALL3_ADDRESS, abi=ABI)
+    requests = [
+        _call_request(
+            multicall3.functions.aggregate3(
+                [(call.address, False, _encode_call(w3, call)) for call in chunk]
+            ),
+            block,
+        )
+        for chunk in chunks
+    ]
+
+    results: List[Any] = []
+    for chunk, chunk_results in zip(chunks, batch_requests(w3, requests, batch_size)):
+        for call, (_success, return_data) in zip(
+            chunk, typing.cast(List[Tuple[bool, bytes]], chunk_results)
+        ):
+            results.append(_decode_result(w3, call, return_data))
+
+    return results
+
+
+def _call_request(call: ContractFunction, block: BlockIdentifier) -> Request:
+    return lambda: call.call(block_identifier=block)
+
+
+def _encode_call(w3: Web3, call: ContractFunction) -> bytes:
+    selector = function_signature_to_4byte_selector(call.signature)
+    return selector + w3.codec.encode(list(call.argument_types), list(call.arguments))
+
+
+def _decode_result(w3: Web3, call: ContractFunction, return_data: bytes) -> Any:
+    """
+    Decode the output of a call, unwrapping single values as
+    `ContractFunction.call` does.  Calls to addresses without code succeed
+    with no data, which is reported as a failure.
+    """
+    output_types = get_abi_output_types(call.abi)
+    if output_types and not return_data:
+        raise BadFunctionCallOutput(f"call to {call.address} returned no data")
+    values = w3.codec.decode(output_types, return_data)
+    return values[0] if len(values) == 1 else list(values)
+
+
+ABI = typing.cast(
+    eth_typing.ABI,
+    [
+        {
+            "inputs": [
+                {
+                    "components": [
+                        {
+                            "internalType": "address",
+                            "name": "target",
+                            "type": "address",
+                        },
+                        {
+                            "internalType": "bool",
+                            "name": "allowFailure",
+                            "type": "bool",
+                        },
+                        {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                    ],
+                    "internalType": "struct Multicall3.Call3[]",
+                    "name": "calls",
+                    "type": "tuple[]",
+                }
+            ],
+            "name": "aggregate3",
+            "outputs": [
+                {
+                    "components": [
+                        {"internalType": "bool", "name": "success", "type": "bool"},
+                        {
+                            "internalType": "bytes",
+                            "name": "returnData",
+                            "type": "bytes",
+                        },
+                    ],
+                    "internalType": "struct Multicall3.Result[]",
+                    "name": "returnData",
+                    "type": "tuple[]",
+                }
+            ],
+            "stateMutability": "payable",
+            "type": "function",
+        },
+    ],
+)
@@ -0,0 +1,120 @@
+"""
+Local nonce manager, which hands out increasing nonces for an account so
+that concurrent commands (e.g. parallel jobs creating transactions for the
+same account) do not collide.
+
+The next nonce of each account is stored in
+`<state-dir>/nonces/<chain-id>/<address>`, and every reservation holds an
+`fcntl` lock on that file.  Nonces are state rather than cache (see `state`),
+since clearing them would hand out nonces which were reserved but not yet
+broadcast.  The first reservation for an account starts
+from its pending transaction count on the node, after which nonces are only
+reconciled with the node on demand (`aut nonce sync`), e.g. after
+transactions were created elsewhere or were never sent.
+"""
+
+import fcntl
+import os
+import os.path
+from contextlib import contextmanager
+from typing import IO, TYPE_CHECKING, Generator, Optional
+
+from eth_typing import ChecksumAddress
+from web3.types import Nonce
+
+from . import cache, state
+from .logging import log
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+NONCES_DIRECTORY_NAME = "nonces"
+
+
+def nonce_file_path(chain_id: int, address: ChecksumAddress) -> str:
+    """
+    Path of the file holding the next nonce of `address`.
+    """
+    return os.path.join(
+        state.get_state_directory(), NONCES_DIRECTORY_NAME, str(chain_id), address
+    )
+
+
+def reserve_nonce(w3: "Web3", address: ChecksumAddress) -> Nonce:
+    """
+    Reserve the next nonce of `address`, so that no other caller receives it.
+    """
+    with _locked_nonce_file(w3, address) as nonce_f:
+        nonce = _read_nonce(nonce_f)
+        if nonce is None:
+            nonce = _pending_nonce(w3, address)
+        _write_nonce(nonce_f, Nonce(nonce + 1))
+
+    log(f"reserved nonce {nonce} for {address}")
+    return nonce
+
+
+def sync_nonce(w3: "Web3", address: ChecksumAddress) -> Nonce:
+    """
+    Reset the next nonce of `address` to its pending transaction count on the
+    node, returning the new value.
+    """
+    with _locked_nonce_file(w3, address) as nonce_f:
+        nonce = _pending_nonce(w3, address)
+        _write_nonce(nonce_f, nonce)
+
+    return nonce
+
+
+def next_nonce(w3: "Web3", address: ChecksumAddress) -> Optional[Nonce]:
+    """
+    The nonce that will be reserved next for `address`, if the manager has
+    any record of it.
+    """
+    with _locked_nonce_file(w3, address) as nonce_f:
+        return _read_nonce(nonce_f)
+
+
+@contextmanager
+def _locked_nonce_file(
+    w3: "Web3", address: ChecksumAddress
+) -> Generator[IO[str], None, None]:
+    """
+    Open the nonce file of `address` (creating it if necessary), holding an
+    exclusive lock until the context exits.
+    """
+
+    file_path = nonce_file_path(cache.chain_id(w3), address)
+    os.makedirs(os.path.dirname(file_path), mode=0o700, exist_ok=True)
+    fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+    with os.fdopen(fd, "r+", encoding="utf8") as nonce_f:
+        fcntl.flock(nonce_f, fcntl.LOCK_EX)
+        try:
+            yield nonce_f
+        finally:
+            fcntl.flock(nonce_f, fcntl.LOCK_UN)
+
+
+def _read_nonce(nonce_f: IO[str]) -> Optional[Nonce]:
+    nonce_f.seek(0)
+    contents = nonce_f.read().strip()
+    if not contents:
+        return None
+    try:
+        return Nonce(int(contents))
+    except ValueError:
+        log(f"ignoring invalid nonce file {nonce_f.name}: {contents!r}")
+        return None
+
+
+def _write_nonce(nonce_f: IO[str], nonce: Nonce) -> None:
+    nonce_f.seek(0)
+    nonce_f.truncate()
+    nonce_f.write(f"{nonce}\n")
+    nonce_f.flush()
+
+
+def _pending_nonce(w3: "Web3", address: ChecksumAddress) -> Nonce:
+    nonce = w3.eth.get_transaction_count(address, "pending")
+    log(f"pending nonce of {address}: {nonce}")
+    return nonce
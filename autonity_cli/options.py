@@ -18,6 +18,12 @@ Decorator = Callable[[Func], Func]
 
 optgroup = _OptGroup()
 
+RESERVE_NONCE_ENV_VAR = "AUT_RESERVE_NONCE"
+GAS_CACHE_ENV_VAR = "AUT_GAS_CACHE"
+OUTPUT_ENV_VAR = "AUT_OUTPUT"
+NDJSON_OUTPUT = "ndjson"
+CONTEXT_FLAG_PREFIX = "autonity_cli."
+
 # ┌─────────────┐
 # │ Option Info │
 # └─────────────┘
@@ -107,19 +113,29 @@ def keyfile_option(output: bool = False) -> Decorator[Func]:
     return decorator
 
 
-def authentication_options() -> Decorator[Func]:
+def authentication_options(from_address: bool = False) -> Decorator[Func]:
     """
-    Options: --keyfile or --trezor, but not both.
+    Options: --keyfile or --trezor, but not both.  If `from_address` is True,
+    --from may be given instead, to use the keyfile for that address in the
+    keystore.
     """
 
     def decorator(fn: Func) -> Func:
-        for option in reversed(
-            [
-                optgroup.group("Authentication", cls=MutuallyExclusiveOptionGroup),
-                make_option(keyfile_option_info, cls=optgroup.option),
-                make_option(trezor_option_info, cls=optgroup.option),
-            ]
-        ):
+        options = [
+            optgroup.group("Authentication", cls=MutuallyExclusiveOptionGroup),
+            make_option(keyfile_option_info, cls=optgroup.option),
+            make_option(trezor_option_info, cls=optgroup.option),
+        ]
+        if from_address:
+            options.append(
+                optgroup.option(
+                    "--from",
+                    "from_str",
+                    metavar="ADDRESS",
+                    help="use the keyfile for ADDRESS in the keystore.",
+                )
+            )
+        for option in reversed(options):
             fn = option(fn)
         return fn
 
@@ -201,6 +217,8 @@ def tx_aux_options(fn: Func) -> Func:
       --fee-factor,
       --nonce
       --chain-id
+      --reserve-nonce
+      --gas-cache
     """
     for option in reversed(
         [
@@ -241,12 +259,112 @@ def tx_aux_options(fn: Func) -> Func:
                 type=int,
                 help="integer representing EIP155 chain ID.",
             ),
+            context_flag_option(
+                "--reserve-nonce",
+                envvar=RESERVE_NONCE_ENV_VAR,
+                help=(
+                    "if --nonce is not given, reserve the next nonce from the local "
+                    "nonce manager (see `aut nonce`), so that concurrent commands for "
+                    "the same account get distinct nonces."
+                ),
+            ),
+            gas_cache_option,
         ]
     ):
         fn = option(fn)
     return fn
 
 
+def gas_cache_option(fn: Func) -> Func:
+    """
+    Adds the --gas-cache flag, enabling the cache of gas estimates (see
+    `gas_estimates`).  Query with `gas_cache_requested`.
+    """
+    return context_flag_option(
+        "--gas-cache",
+        envvar=GAS_CACHE_ENV_VAR,
+        help=(
+            "if --gas is not given, use (and record) cached gas estimates for "
+            "similar transactions.  Gas used by transactions is recorded when "
+            "waiting for them."
+        ),
+    )(fn)
+
+
+def context_flag_option(name: str, envvar: str, help: str) -> Decorator[Func]:
+    """
+    A flag which is stored in the click context rather than passed to the
+    command function, so that it can be added to many commands without
+    changing their signatures.  Query with `context_flag`.
+    """
+    return click.option(
+        name,
+        is_flag=True,
+        expose_value=False,
+        envvar=envvar,
+        callback=_store_context_flag,
+        help=help,
+    )
+
+
+def context_flag(param_name: str) -> bool:
+    """
+    Whether the flag added by `context_flag_option` (given as the parameter
+    name, e.g. 'gas_cache' for --gas-cache) is set for the current command.
+    """
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and bool(ctx.meta.get(CONTEXT_FLAG_PREFIX + param_name))
+
+
+def output_option(fn: Func) -> Func:
+    """
+    Adds the --output option (for the top-level group), stored in the click
+    context.  Query with `ndjson_output_requested`.
+    """
+    return click.option(
+        "--output",
+        type=click.Choice(["default", NDJSON_OUTPUT]),
+        default="default",
+        show_default=True,
+        envvar=OUTPUT_ENV_VAR,
+        expose_value=False,
+        callback=_store_context_flag,
+        help=(
+            "output format of commands which print lists.  'ndjson' prints one "
+            "JSON value per line, as each item is produced."
+        ),
+    )(fn)
+
+
+def ndjson_output_requested() -> bool:
+    """
+    Whether `--output ndjson` was given to the top-level group.
+    """
+    ctx = click.get_current_context(silent=True)
+    output = None if ctx is None else ctx.meta.get(CONTEXT_FLAG_PREFIX + "output")
+    return output == NDJSON_OUTPUT
+
+
+def reserve_nonce_requested() -> bool:
+    """
+    Whether --reserve-nonce was given to the current command.
+    """
+    return context_flag("reserve_nonce")
+
+
+def gas_cache_requested() -> bool:
+    """
+    Whether --gas-cache was given to the current command.
+    """
+    return context_flag("gas_cache")
+
+
+def _store_context_flag(
+    ctx: click.Context, param: click.Parameter, value: object
+) -> None:
+    ctx.meta[CONTEXT_FLAG_PREFIX + str(param.name)] = value
+
+
 def validator_option(fn: Func) -> Func:
     """
     Add the --validator <address> option to specify a validator.  Uses
@@ -282,3 +400,48 @@ def contract_options(fn: Func) -> Func:
     ):
         fn = option(fn)
     return fn
+
+
+def log_scan_options(fn: Func) -> Func:
+    """
+    Options for scanning event logs: --from-block, --to-block, --chunk-size
+    and --max-in-flight.
+    """
+    # Imported here, so that only command groups which scan logs import web3
+    # via this module.
+    from .logs import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_IN_FLIGHT
+
+    for option in reversed(
+        [
+            click.option(
+                "--from-block",
+                type=click.IntRange(min=0),
+                default=0,
+                show_default=True,
+                help="first block to scan.",
+            ),
+            click.option(
+                "--to-block",
+                default="latest",
+                show_default=True,
+                help="last block to scan (a block number, or 'latest').",
+            ),
+            click.option(
+                "--chunk-size",
+                type=click.IntRange(min=1),
+                default=DEFAULT_CHUNK_SIZE,
+                show_default=True,
+                help="number of blocks requested by each eth_getLogs call.",
+            ),
+            click.option(
+                "--max-in-flight",
+                "-m",
+                type=click.IntRange(min=1),
+                default=DEFAULT_MAX_IN_FLIGHT,
+                show_default=True,
+                help="maximum number of eth_getLogs calls made concurrently (1 over WebSocket).",
+            ),
+        ]
+    ):
+        fn = option(fn)
+    return fn
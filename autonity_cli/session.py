@@ -0,0 +1,107 @@
+"""
+Support for running many commands within one long-lived process (see the
+`serve` and `shell` commands).  Commands are executed in-process, sharing
+anything cached at module level (imported modules, Web3 connections, the
+config file, etc).
+"""
+
+import getpass
+import os
+import sys
+import traceback
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Union
+
+from click import ClickException
+
+from . import logging
+
+if TYPE_CHECKING:
+    from eth_account.signers.local import LocalAccount
+
+interactive = True
+"""
+False if commands must not prompt the user (e.g. when run on behalf of a
+client of `aut serve`, which has no terminal).
+"""
+
+decrypted_accounts: Optional[Dict[str, "LocalAccount"]] = None
+"""
+If not None, accounts decrypted from keyfiles, by keyfile path, which are
+kept for the lifetime of the process (see `keep_decrypted_accounts`).
+"""
+
+
+def keep_decrypted_accounts() -> None:
+    """
+    Keep accounts decrypted from keyfiles in memory, so that each keyfile is
+    only decrypted (and its password requested) once per process.  Intended
+    only for interactive sessions.
+    """
+    global decrypted_accounts
+    if decrypted_accounts is None:
+        decrypted_accounts = {}
+
+
+def get_decrypted_account(keyfile: str) -> Optional["LocalAccount"]:
+    """
+    A previously decrypted account for the keyfile, if available.
+    """
+    if decrypted_accounts is None:
+        return None
+    return decrypted_accounts.get(os.path.realpath(keyfile))
+
+
+def add_decrypted_account(keyfile: str, account: "LocalAccount") -> None:
+    """
+    Record the account decrypted from a keyfile, if accounts are being kept.
+    """
+    if decrypted_accounts is not None:
+        decrypted_accounts[os.path.realpath(keyfile)] = account
+
+
+def prompt_secret(prompt: str) -> str:
+    """
+    Prompt the user for a password or other secret, without echoing.
+    """
+    if not interactive:
+        raise ClickException(
+            "Cannot prompt for a password in this mode.  Use the KEYFILEPWD env var."
+        )
+    return getpass.getpass(prompt)
+
+
+def run_command(args: Sequence[str]) -> int:
+    """
+    Execute an `aut` command line (excluding the program name) in this
+    process, and return the exit status.  Output is written to the current
+    sys.stdout and sys.stderr.
+    """
+
+    # Import here to avoid a circular import.
+    from .__main__ import aut
+
+    logging.disable_logging()
+    try:
+        aut.main(args=list(args), prog_name="aut")
+    except SystemExit as exc:
+        return _exit_status(exc.code)
+    except Exception as exc:
+        if logging.logging_enabled:
+            traceback.print_exc()
+        else:
+            sys.stderr.write("".join(traceback.format_exception_only(exc)))
+        return 1
+
+    return 0
+
+
+def _exit_status(code: Union[str, int, None]) -> int:
+    """
+    Convert the argument of `sys.exit` to an exit status.
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    sys.stderr.write(f"{code}\n")
+    return 1
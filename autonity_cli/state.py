@@ -0,0 +1,22 @@
+"""
+Persistent local state, such as the nonces reserved by the nonce manager and
+the log index.  Unlike the cache (see `cache`), this cannot be cheaply (or at
+all) fetched again from a node, so it is kept in a separate directory, which
+`aut cache clear` leaves alone.
+"""
+
+import os
+import os.path
+
+DEFAULT_STATE_DIRECTORY = "~/.local/state/aut"
+STATE_DIRECTORY_ENV_VAR = "AUT_STATE_DIR"
+
+
+def get_state_directory() -> str:
+    """
+    Directory holding local state, from the env var, falling back to the
+    default.
+    """
+    return os.path.expanduser(
+        os.getenv(STATE_DIRECTORY_ENV_VAR, DEFAULT_STATE_DIRECTORY)
+    )
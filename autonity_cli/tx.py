@@ -2,21 +2,60 @@
 Transaction utility functions
 """
 
-from typing import Callable, Optional
+import json
+import time
+from contextlib import closing
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    cast,
+)
 
 from eth_account.account import Account, SignedTransaction  # type: ignore
 from eth_typing import ChecksumAddress
 from hexbytes import HexBytes
-from web3 import Web3
+from web3 import LegacyWebSocketProvider, Web3
+from web3._utils.method_formatters import receipt_formatter  # type: ignore
 from web3._utils.transactions import fill_transaction_defaults
 from web3.contract.contract import ContractFunction
-from web3.types import Nonce, TxParams, TxReceipt, Wei
+from web3.exceptions import MethodUnavailable, TimeExhausted, Web3RPCError
+from web3.providers import JSONBaseProvider
+from web3.types import BlockReceipts, Nonce, RPCEndpoint, TxParams, TxReceipt, Wei
+from websockets.sync.client import connect
 
+from . import cache, gas_estimates, nonces
+from .batch import DEFAULT_BATCH_SIZE, batch_requests
 from .keyfile import (
     EncryptedKeyData,
     PrivateKey,
     decrypt_keyfile,
 )
+from .logging import log
+
+DEFAULT_POLL_INTERVAL = 1.0
+"""
+Default interval, in seconds, between checks for new blocks.
+"""
+
+DEFAULT_WAIT_TIMEOUT = 120.0
+"""
+Default timeout, in seconds, when waiting for a single transaction (as used
+by Web3.eth.wait_for_transaction_receipt).
+"""
+
+GAS_PLACEHOLDER = 1
+"""
+Gas limit used while building contract transactions whose gas limit is
+filled in later.
+"""
+
+_format_receipt = cast(Callable[[Any], TxReceipt], receipt_formatter)
 
 
 def create_transaction(
@@ -87,16 +126,26 @@ def create_contract_function_transaction(
     max_priority_fee_per_gas: Optional[Wei] = None,
     nonce: Optional[Nonce] = None,
     chain_id: Optional[int] = None,
+    estimate_gas: bool = True,
 ) -> TxParams:
     """
     Given a contract call and other parameters, create an unsigned
     transaction (Web3 TxParams object).  Any fields not passed in will
-    be filled out by querying the attached node, if available.
+    be filled out by querying the attached node, if available.  If
+    `estimate_gas` is False, a missing gas limit is left for
+    finalize_transaction to fill in.
     """
+    if chain_id is None:
+        chain_id = cache.chain_id(function.w3)
+
+    # Web3 estimates the gas of contract transactions without a gas limit,
+    # so build the transaction with a placeholder which is then removed.
+    leave_gas = gas is None and not estimate_gas
+
     tx = create_transaction(
         from_addr=from_addr,
         value=value,
-        gas=gas,
+        gas=GAS_PLACEHOLDER if leave_gas else gas,
         gas_price=gas_price,
         max_fee_per_gas=max_fee_per_gas,
         max_priority_fee_per_gas=max_priority_fee_per_gas,
@@ -104,17 +153,26 @@ def create_contract_function_transaction(
         chain_id=chain_id,
     )
 
-    return function.build_transaction(tx)
+    tx = function.build_transaction(tx)
+    if leave_gas:
+        del tx["gas"]
+    return tx
 
 
 def finalize_transaction(
     create_w3: Callable[[], Web3],
     tx: TxParams,
     from_addr: Optional[ChecksumAddress],
+    reserve_nonce: bool = False,
+    gas_cache: bool = False,
 ) -> TxParams:
     """
     Fill in any values not already set.  If necessary, a Web3 object
-    will be created via the create_w3 callback.
+    will be created via the create_w3 callback.  If `reserve_nonce` is
+    set, a missing nonce is reserved from the local nonce manager (see
+    `nonces.reserve_nonce`) rather than queried from the node.  If
+    `gas_cache` is set, a missing gas limit is taken from the cache of gas
+    estimates where possible (see `gas_estimates.estimate_gas`).
     """
 
     w3: Optional[Web3] = None
@@ -127,21 +185,30 @@ def finalize_transaction(
 
     if "gas" not in tx:
         w3 = get_web3()
-        tx["gas"] = w3.eth.estimate_gas(tx)
+        if gas_cache:
+            tx["gas"] = gas_estimates.estimate_gas(w3, tx)
+        else:
+            tx["gas"] = w3.eth.estimate_gas(tx)
 
-    if "nonce" not in tx:
+    if "nonce" not in tx and not reserve_nonce:
         if not from_addr:
             raise ValueError("neither nonce or from-address given")
         w3 = get_web3()
         tx["nonce"] = w3.eth.get_transaction_count(from_addr)
 
     if "chainId" not in tx:
-        w3 = get_web3()
-        tx["chainId"] = w3.eth.chain_id
+        tx["chainId"] = cache.chain_id(get_web3())
 
     if "gasPrice" not in tx and "maxFeePerGas" not in tx:
         tx = fill_transaction_defaults(get_web3(), tx)
 
+    # Reserved last, so that no nonce is lost if any of the above fails.
+
+    if "nonce" not in tx:
+        if not from_addr:
+            raise ValueError("neither nonce or from-address given")
+        tx["nonce"] = nonces.reserve_nonce(get_web3(), from_addr)
+
     # The code above to fill defaults introduces an (unserializable)
     # empty bytes() in the "data" field.
 
@@ -155,6 +222,20 @@ def finalize_transaction(
     return tx
 
 
+def fee_defaults(w3: Web3) -> TxParams:
+    """
+    The fee parameters (`maxFeePerGas` and `maxPriorityFeePerGas`, or
+    `gasPrice` if a gas price strategy is set) which `finalize_transaction`
+    would currently fill in for a transaction which does not specify them.
+    """
+
+    # Every field other than the fees is given, so only the fees are queried.
+    placeholder: TxParams = {"chainId": 0, "gas": 0, "value": Wei(0), "data": b""}
+    defaults = fill_transaction_defaults(w3, placeholder)
+    fee_keys = ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas")
+    return cast(TxParams, {k: v for k, v in defaults.items() if k in fee_keys})
+
+
 def sign_tx_with_private_key(
     tx: TxParams, private_key: PrivateKey
 ) -> SignedTransaction:
@@ -192,9 +273,197 @@ def wait_for_tx(w3: Web3, tx_hash: HexBytes, timeout: Optional[float]) -> TxRece
     Wait for a specific transaction.  Returns the receipts.
 
     This simply wraps Web3.eth.wait_for_transaction_receipt, but uses
-    stricter types (accepts only a HexBytes object).
+    stricter types (accepts only a HexBytes object).  For WebSocket
+    endpoints, the receipt is only requested when a new block arrives (see
+    `wait_for_txs`), rather than being polled.
     """
+    if isinstance(w3.provider, LegacyWebSocketProvider):
+        if timeout is None:
+            timeout = DEFAULT_WAIT_TIMEOUT
+        with closing(wait_for_txs(w3, [tx_hash], timeout)) as receipts:
+            for tx_receipt in receipts:
+                return tx_receipt
+        raise TimeExhausted(
+            f"Transaction {tx_hash.to_0x_hex()} is not in the chain after "
+            f"{timeout} seconds"
+        )
+
     if timeout is None:
         return w3.eth.wait_for_transaction_receipt(tx_hash)
 
     return w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+
+
+def get_tx_receipts(
+    w3: Web3, tx_hashes: Sequence[HexBytes], batch_size: int = DEFAULT_BATCH_SIZE
+) -> List[Optional[TxReceipt]]:
+    """
+    The receipts of the given transactions (None for transactions not yet in
+    a block), requested in batches of at most `batch_size`.
+
+    The requests are made directly via the provider since, in a
+    `w3.batch_requests` batch, a single missing receipt fails the whole
+    batch.
+    """
+
+    provider = cast(JSONBaseProvider, w3.provider)
+    receipts: List[Optional[TxReceipt]] = []
+    for start in range(0, len(tx_hashes), batch_size):
+        responses = provider.make_batch_request(
+            [
+                (RPCEndpoint("eth_getTransactionReceipt"), [tx_hash.to_0x_hex()])
+                for tx_hash in tx_hashes[start : start + batch_size]
+            ]
+        )
+        if not isinstance(responses, list):
+            raise Web3RPCError(f"batch request failed: {responses.get('error')}")
+        for response in responses:
+            if "error" in response:
+                raise Web3RPCError(str(response["error"]), rpc_response=response)
+            result = response.get("result")
+            receipts.append(None if result is None else _format_receipt(result))
+
+    return receipts
+
+
+def wait_for_txs(
+    w3: Web3,
+    tx_hashes: Sequence[HexBytes],
+    timeout: Optional[float],
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+) -> Generator[TxReceipt, None, None]:
+    """
+    Wait for many transactions at once, yielding their receipts as they are
+    included in blocks.  Stops after `timeout` seconds (if given), so callers
+    must check for transactions without receipts.
+
+    The receipts of each new block are requested with eth_getBlockReceipts,
+    falling back to requesting the receipts of the pending transactions once
+    per new block if the node does not support it.
+    """
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    pending: Dict[HexBytes, None] = dict.fromkeys(tx_hashes)
+    last_block = w3.eth.block_number
+
+    def included(receipts: Sequence[Optional[TxReceipt]]) -> Iterator[TxReceipt]:
+        for receipt in receipts:
+            if receipt is not None and receipt["transactionHash"] in pending:
+                del pending[receipt["transactionHash"]]
+                yield receipt
+
+    yield from included(get_tx_receipts(w3, list(pending)))
+    if not pending:
+        return
+
+    use_block_receipts = True
+    for head in _new_heads(w3, last_block, deadline, poll_interval):
+        receipts: Sequence[Optional[TxReceipt]] = []
+        if use_block_receipts:
+            try:
+                blocks: List[BlockReceipts] = batch_requests(
+                    w3,
+                    [
+                        lambda n=n: w3.eth.get_block_receipts(n)
+                        for n in range(last_block + 1, head + 1)
+                    ],
+                )
+                receipts = [receipt for block in blocks for receipt in block]
+            except (MethodUnavailable, Web3RPCError) as exc:
+                log(f"eth_getBlockReceipts failed ({exc}), requesting each receipt")
+                use_block_receipts = False
+
+        if not use_block_receipts:
+            receipts = get_tx_receipts(w3, list(pending))
+
+        last_block = head
+        yield from included(receipts)
+        if not pending:
+            return
+
+
+def _new_heads(
+    w3: Web3, last_block: int, deadline: Optional[float], poll_interval: float
+) -> Iterator[int]:
+    """
+    Yield the number of the latest block whenever it advances past
+    `last_block`, until `deadline` (if given).  For WebSocket endpoints, new
+    blocks are received via a `newHeads` subscription.  Otherwise, the block
+    number is polled.
+    """
+
+    if isinstance(w3.provider, LegacyWebSocketProvider):
+        endpoint = str(w3.provider.endpoint_uri)
+        heads = _subscribed_heads(w3, endpoint, deadline, poll_interval)
+    else:
+        heads = _polled_heads(w3, deadline, poll_interval)
+
+    for head in heads:
+        if head > last_block:
+            last_block = head
+            yield head
+
+
+def _polled_heads(
+    w3: Web3, deadline: Optional[float], poll_interval: float
+) -> Iterator[int]:
+    while True:
+        remaining = _remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            return
+        time.sleep(
+            poll_interval if remaining is None else min(poll_interval, remaining)
+        )
+        yield w3.eth.block_number
+
+
+def _subscribed_heads(
+    w3: Web3, endpoint: str, deadline: Optional[float], poll_interval: float
+) -> Iterator[int]:
+    """
+    The numbers of new blocks, from a `newHeads` subscription on a dedicated
+    connection.  Falls back to polling if the node rejects the subscription.
+    """
+
+    # The connection is closed explicitly, rather than by a `with` block, since
+    # that would close it as an error when the consumer stops iterating.
+    conn = connect(endpoint)
+    try:
+        conn.send(
+            json.dumps(
+                {
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "eth_subscribe",
+                    "params": ["newHeads"],
+                }
+            )
+        )
+        try:
+            response = json.loads(conn.recv(timeout=_remaining(deadline)))
+        except TimeoutError:
+            return
+        if "error" in response:
+            log(f"newHeads subscription failed ({response['error']}), polling")
+            yield from _polled_heads(w3, deadline, poll_interval)
+            return
+
+        # Blocks may have been added before the subscription was created.
+        yield w3.eth.block_number
+
+        while True:
+            remaining = _remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                return
+            try:
+                message = json.loads(conn.recv(timeout=remaining))
+            except TimeoutError:
+                return
+            if message.get("method") == "eth_subscription":
+                yield int(message["params"]["result"]["number"], 16)
+    finally:
+        conn.close()
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
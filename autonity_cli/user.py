@@ -8,17 +8,61 @@ If aut implements an ipyothon 'console mode', perhaps these are the
 functions meant to be called in that.
 """
 
-from typing import List, Optional, TypedDict
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypedDict,
+    cast,
+)
 
-from autonity import Autonity
+from autonity.constants import AUTONITY_CONTRACT_ADDRESS
 from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
 from web3 import Web3
-from web3.types import BlockData, BlockIdentifier
+from web3._utils.method_formatters import block_result_formatter  # type: ignore
+from web3.exceptions import BlockNotFound, Web3RPCError
+from web3.providers import JSONBaseProvider
+from web3.types import BlockData, BlockIdentifier, RPCEndpoint
 
+from . import erc20
+from .batch import (
+    DEFAULT_BATCH_SIZE,
+    Request,
+    batch_requests,
+    max_concurrent_requests,
+)
 from .denominations import (
     format_auton_quantity,
     format_newton_quantity,
 )
+from .multicall import multicall
+
+DEFAULT_MAX_IN_FLIGHT = 4
+"""
+Default number of batches of blocks requested concurrently by
+`get_block_range`.
+"""
+
+BODY_FIELDS = ("transactions", "uncles", "withdrawals")
+"""
+Fields of a block which are not part of its header.
+"""
+
+_METHOD_NOT_FOUND = -32601
+
+ACCOUNT_STATS_CHUNK_SIZE = 1000
+"""
+Number of accounts for which `iter_account_stats` requests stats at a time.
+"""
+
+_format_block = cast(Callable[[Any], BlockData], block_result_formatter)
 
 
 class AccountStats(TypedDict):
@@ -33,37 +77,106 @@ class AccountStats(TypedDict):
 
 
 def get_account_stats(
-    w3: Web3, accounts: List[ChecksumAddress], tag: Optional[BlockIdentifier] = None
+    w3: Web3,
+    accounts: List[ChecksumAddress],
+    tag: Optional[BlockIdentifier] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
 ) -> List[AccountStats]:
     """
     For a list of accounts, return a dictionary with accounts as keys
     and list of transaction count and balance (in that order) as
     values. Tag is one of None, 'latest', 'earliest', 'pending' or a
     block number, and the values are as of block described by the
-    tag. The underlying RPC methods are eth_getBalance and
-    eth_getTransactionCount.
+    tag. The tag is resolved to a block number once (see
+    `pin_block_identifier`), so that all values are read from the same
+    block. The underlying RPC methods are eth_getBalance and
+    eth_getTransactionCount, sent as JSON-RPC batches of at most
+    `batch_size` requests (see `batch.batch_requests`), and eth_call
+    for the NTN balances (see `multicall.multicall`).
     """
+    return list(iter_account_stats(w3, accounts, tag, batch_size))
+
+
+def iter_account_stats(
+    w3: Web3,
+    accounts: Sequence[ChecksumAddress],
+    tag: Optional[BlockIdentifier] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    chunk_size: int = ACCOUNT_STATS_CHUNK_SIZE,
+) -> Iterator[AccountStats]:
+    """
+    Generate the stats of each account, as for `get_account_stats`, but
+    requested for `chunk_size` accounts at a time, so that the stats of the
+    first accounts are available before those of later ones are requested.
+    """
+
+    block = pin_block_identifier(w3, tag)
+    for start in range(0, len(accounts), chunk_size):
+        yield from _account_stats(
+            w3, accounts[start : start + chunk_size], block, batch_size
+        )
+
+
+def _account_stats(
+    w3: Web3,
+    accounts: Sequence[ChecksumAddress],
+    block: BlockIdentifier,
+    batch_size: int,
+) -> List[AccountStats]:
+    def account_requests(acct: ChecksumAddress) -> List[Request]:
+        return [
+            lambda: w3.eth.get_transaction_count(acct, block),
+            lambda: w3.eth.get_balance(acct, block),
+        ]
+
+    requests = [request for acct in accounts for request in account_requests(acct)]
+    results = batch_requests(w3, requests, batch_size)
+
+    # The NTN balances are read via the ERC20 interface of the Autonity
+    # contract, aggregated into as few eth_calls as possible.
+    newton = w3.eth.contract(AUTONITY_CONTRACT_ADDRESS, abi=erc20.ABI)
+    ntn_balances = multicall(
+        w3,
+        [newton.functions.balanceOf(acct) for acct in accounts],
+        block,
+        batch_size,
+    )
+
     stats: List[AccountStats] = []
-    autonity = Autonity(w3)
-    for acct in accounts:
-        txcount = w3.eth.get_transaction_count(acct)
-        if tag is None:
-            balance = w3.eth.get_balance(acct)
-        else:
-            balance = w3.eth.get_balance(acct, tag)
-        ntn_balance = autonity.balance_of(acct)
+    for i, acct in enumerate(accounts):
+        txcount, balance = results[2 * i : 2 * i + 2]
         stats.append(
             {
                 "account": acct,
                 "tx_count": txcount,
                 "balance": format_auton_quantity(balance),
-                "ntn_balance": format_newton_quantity(ntn_balance),
+                "ntn_balance": format_newton_quantity(ntn_balances[i]),
             }
         )
 
     return stats
 
 
+def pin_block_identifier(w3: Web3, tag: Optional[BlockIdentifier]) -> BlockIdentifier:
+    """
+    Resolve a block tag or hash (None meaning 'latest') to a block
+    number, so that a sequence of queries all refer to the same
+    block. 'pending' does not refer to a sealed block, and is returned
+    unchanged.
+    """
+
+    if tag is None or tag == "latest":
+        return w3.eth.block_number
+    if tag == "earliest":
+        return 0
+    if tag == "pending" or isinstance(tag, int):
+        return tag
+    block_number = get_block_header(w3, tag).get("number")
+    if block_number is None:
+        raise ValueError(f"cannot determine number of block {tag!r}")
+    return block_number
+
+
 # TODO: Properly typed object.
 # TODO: Move to autonity.py
 def get_block(w3: Web3, identifier: BlockIdentifier) -> BlockData:
@@ -74,3 +187,134 @@ def get_block(w3: Web3, identifier: BlockIdentifier) -> BlockData:
     """
     block_data = w3.eth.get_block(identifier)
     return block_data
+
+
+def get_block_header(w3: Web3, identifier: BlockIdentifier) -> BlockData:
+    """
+    The header of a block (identified as for `get_block`), without the
+    transactions, uncles or withdrawals of the block.
+
+    The header is requested with eth_getHeaderByNumber or eth_getHeaderByHash,
+    so that the block body is never transferred.  Nodes which do not support
+    these methods are asked for the block with transaction hashes only, and
+    the body fields are removed.
+    """
+
+    if isinstance(identifier, int):
+        method, param = "eth_getHeaderByNumber", hex(identifier)
+    elif identifier in ("latest", "earliest", "pending", "safe", "finalized"):
+        method, param = "eth_getHeaderByNumber", identifier
+    else:
+        method, param = "eth_getHeaderByHash", HexBytes(identifier).to_0x_hex()
+
+    try:
+        result = w3.manager.request_blocking(RPCEndpoint(method), [param])
+    except Web3RPCError as exc:
+        error = (exc.rpc_response or {}).get("error")
+        if not isinstance(error, dict) or error.get("code") != _METHOD_NOT_FOUND:
+            raise
+        block = w3.eth.get_block(identifier, full_transactions=False)
+        return cast(BlockData, {k: v for k, v in block.items() if k not in BODY_FIELDS})
+
+    if result is None:
+        raise BlockNotFound(f"block {identifier!r} not found")
+    return _format_block(dict(result))
+
+
+def get_block_headers(w3: Web3, block_numbers: Sequence[int]) -> List[BlockData]:
+    """
+    The headers of the blocks with the given numbers (as for
+    `get_block_header`), requested in a single JSON-RPC batch.
+    """
+
+    provider = cast(JSONBaseProvider, w3.provider)
+    responses = provider.make_batch_request(
+        [
+            (RPCEndpoint("eth_getHeaderByNumber"), [hex(number)])
+            for number in block_numbers
+        ]
+    )
+    if not isinstance(responses, list):
+        raise Web3RPCError(f"batch request failed: {responses.get('error')}")
+
+    headers: List[BlockData] = []
+    for number, response in zip(block_numbers, responses):
+        error = response.get("error")
+        if isinstance(error, dict) and error.get("code") == _METHOD_NOT_FOUND:
+            return [
+                cast(
+                    BlockData, {k: v for k, v in block.items() if k not in BODY_FIELDS}
+                )
+                for block in get_blocks(w3, block_numbers)
+            ]
+        if error is not None:
+            raise Web3RPCError(str(error), rpc_response=response)
+        result = response.get("result")
+        if result is None:
+            raise BlockNotFound(f"block {number} not found")
+        headers.append(_format_block(dict(result)))
+    return headers
+
+
+def get_blocks(
+    w3: Web3, block_numbers: Sequence[int], full_transactions: bool = False
+) -> List[BlockData]:
+    """
+    The blocks with the given numbers, requested in a single JSON-RPC batch.
+
+    The requests are made directly via the provider (as for
+    `tx.get_tx_receipts`), so that batches can be requested from several
+    threads at once.
+    """
+
+    provider = cast(JSONBaseProvider, w3.provider)
+    responses = provider.make_batch_request(
+        [
+            (RPCEndpoint("eth_getBlockByNumber"), [hex(number), full_transactions])
+            for number in block_numbers
+        ]
+    )
+    if not isinstance(responses, list):
+        raise Web3RPCError(f"batch request failed: {responses.get('error')}")
+
+    blocks: List[BlockData] = []
+    for number, response in zip(block_numbers, responses):
+        if "error" in response:
+            raise Web3RPCError(str(response["error"]), rpc_response=response)
+        result = response.get("result")
+        if result is None:
+            raise BlockNotFound(f"block {number} not found")
+        blocks.append(_format_block(result))
+    return blocks
+
+
+def get_block_range(
+    w3: Web3,
+    start: int,
+    end: int,
+    full_transactions: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[List[BlockData]]:
+    """
+    Generate the blocks `start` to `end` (inclusive), in order, in batches of
+    at most `batch_size` blocks.  Up to `max_in_flight` batches (limited by
+    `max_concurrent_requests`) are requested concurrently, so that later
+    batches are being fetched while earlier ones are consumed.
+    """
+
+    max_in_flight = max_concurrent_requests(w3, max_in_flight)
+
+    batches = (
+        range(batch_start, min(batch_start + batch_size, end + 1))
+        for batch_start in range(start, end + 1, batch_size)
+    )
+    with ThreadPoolExecutor(max_in_flight) as executor:
+        in_flight: Deque["Future[List[BlockData]]"] = deque()
+        for batch in batches:
+            in_flight.append(executor.submit(get_blocks, w3, batch, full_transactions))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -9,8 +9,20 @@ import sys
 from dataclasses import asdict, is_dataclass
 from datetime import datetime, timezone
 from decimal import Decimal
-from getpass import getpass
-from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, TypeVar, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from autonity import Autonity
 from autonity.constants import AUTONITY_CONTRACT_ADDRESS
@@ -25,14 +37,20 @@ from web3.providers import BaseProvider
 from web3.types import (
     BlockIdentifier,
     Nonce,
+    RPCEndpoint,
     TxParams,
     Wei,
 )
 
-from . import config
+from . import config, fees, keystore_index
 from .constants import COMMISSION_RATE_PRECISION, AutonDenoms
 from .denominations import NEWTON_DECIMALS
-from .keyfile import load_keyfile
+from .options import (
+    gas_cache_requested,
+    ndjson_output_requested,
+    reserve_nonce_requested,
+)
+from .session import prompt_secret
 from .tx import (
     create_contract_function_transaction,
     create_transaction,
@@ -42,6 +60,11 @@ from .tx import (
 # Intended to represent "value" types
 V = TypeVar("V")
 
+# Web3 objects created by `web3_from_endpoint_arg`, by endpoint.  A process
+# which runs many commands (see `aut serve`) reuses the providers, and hence
+# their open connections.
+_web3_by_endpoint: Dict[str, Web3] = {}
+
 
 class JSONEncoder(Web3JsonEncoder):
     def default(self, obj: Any) -> Any:
@@ -68,7 +91,13 @@ def web3_from_endpoint_arg(w3: Optional[Web3], endpoint_arg: Optional[str]) -> W
     """
 
     if w3 is None:
-        return Web3(web3_provider_for_endpoint(config.get_rpc_endpoint(endpoint_arg)))
+        endpoint = config.get_rpc_endpoint(endpoint_arg)
+        # IPC endpoints may be relative to the current directory.
+        cache_key = endpoint if "://" in endpoint else os.path.abspath(endpoint)
+        w3 = _web3_by_endpoint.get(cache_key)
+        if w3 is None:
+            w3 = Web3(web3_provider_for_endpoint(endpoint))
+            _web3_by_endpoint[cache_key] = w3
     return w3
 
 
@@ -77,18 +106,26 @@ def web3_provider_for_endpoint(endpoint: str) -> BaseProvider:
     Given an rpc endpoint, return an appropriate provider (https, ws,
     or IPC). If identifier isn't a valid format of one of these three
     types, throws an exception.
+
+    Providers cache the result of eth_chainId, which web3 would otherwise
+    request again to validate each transaction and call.
     """
+    cache_args: Dict[str, Any] = {
+        "cache_allowed_requests": True,
+        "cacheable_requests": {RPCEndpoint("eth_chainId")},
+    }
+
     regex_http = re.compile(r"^(?:http)s?://")
     if re.match(regex_http, endpoint) is not None:
-        return HTTPProvider(endpoint)
+        return HTTPProvider(endpoint, **cache_args)
 
     regex_ws = re.compile(r"^(?:ws)s?://")
     if re.match(regex_ws, endpoint) is not None:
-        return LegacyWebSocketProvider(endpoint)
+        return LegacyWebSocketProvider(endpoint, **cache_args)
 
     regex_ipc = re.compile("([^ !$`&*()+]|(\\[ !$`&*()+]))+\\.ipc")
     if re.match(regex_ipc, endpoint) is not None:
-        return IPCProvider(endpoint)
+        return IPCProvider(endpoint, **cache_args)
 
     raise ValueError(f"cannot determine provider for: {endpoint}")
 
@@ -124,10 +161,7 @@ def create_tx_from_args(
 
     if fee_factor:
         w3 = web3_from_endpoint_arg(w3, rpc_endpoint)
-        block_number = w3.eth.block_number
-        block_data = w3.eth.get_block(block_number)
-        if base_fee_per_gas := block_data.get("baseFeePerGas"):
-            max_fee_per_gas = str(Wei(int(float(base_fee_per_gas) * fee_factor)))
+        max_fee_per_gas = _fee_factor_max_fee(w3, fee_factor, max_fee_per_gas)
 
     try:
         return (
@@ -171,7 +205,13 @@ def finalize_tx_from_args(
     def create_w3() -> Web3:
         return web3_from_endpoint_arg(w3, rpc_endpoint)
 
-    return finalize_transaction(create_w3, tx, from_addr)
+    return finalize_transaction(
+        create_w3,
+        tx,
+        from_addr,
+        reserve_nonce=reserve_nonce_requested(),
+        gas_cache=gas_cache_requested(),
+    )
 
 
 def create_contract_tx_from_args(
@@ -192,18 +232,8 @@ def create_contract_tx_from_args(
     `finalize_tx_from_args` on the result of this function.
     """
 
-    # TODO: abstract this calculation out
-
     if fee_factor:
-        w3 = function.w3
-        block_number = w3.eth.block_number
-        block_data = w3.eth.get_block(block_number)
-        # Note, keep this in units of whole Auton.  It will be
-        # converted to Wei below.
-        if base_fee_per_gas := block_data.get("baseFeePerGas"):
-            max_fee_per_gas = str(
-                Decimal(base_fee_per_gas) * Decimal(fee_factor) / Decimal(pow(10, 18))
-            )
+        max_fee_per_gas = _fee_factor_max_fee(function.w3, fee_factor, max_fee_per_gas)
 
     try:
         tx = create_contract_function_transaction(
@@ -222,13 +252,32 @@ def create_contract_tx_from_args(
             ),
             nonce=Nonce(nonce) if (nonce is not None) else None,
             chain_id=chain_id,
+            estimate_gas=not gas_cache_requested(),
+        )
+        return finalize_transaction(
+            lambda: function.w3,
+            tx,
+            from_addr,
+            reserve_nonce=reserve_nonce_requested(),
+            gas_cache=gas_cache_requested(),
         )
-        return finalize_transaction(lambda: function.w3, tx, from_addr)
 
     except ValueError as err:
         raise ClickException(err.args[0]) from err
 
 
+def _fee_factor_max_fee(
+    w3: Web3, fee_factor: float, max_fee_per_gas: Optional[str]
+) -> Optional[str]:
+    """
+    The --max-fee-per-gas argument implied by --fee-factor (in the format
+    accepted by `parse_wei_representation`), keeping `max_fee_per_gas` if the
+    latest block has no base fee.
+    """
+    max_fee = fees.max_fee_per_gas(w3, fee_factor)
+    return max_fee_per_gas if max_fee is None else f"{max_fee}wei"
+
+
 def parse_wei_representation(wei_str: str) -> Wei:
     """
     Take a text representation of an integer with an optional
@@ -285,25 +334,16 @@ def parse_newton_value_representation(newton_value_str: str) -> int:
     return parse_token_value_representation(newton_value_str, NEWTON_DECIMALS)
 
 
-def address_keyfile_dict(keystore_dir: str) -> Dict[ChecksumAddress, str]:
+def address_keyfile_dict(
+    keystore_dir: str, rebuild_index: bool = False
+) -> Dict[ChecksumAddress, str]:
     """
     For directory 'keystore' that contains one or more keyfiles,
     return a dictionary with EIP55 checksum addresses as keys and
-    keyfile path as value. If 'degenerate_addr', keys are addresses
-    are all lower case and without the '0x' prefix.
+    keyfile path as value.  Keyfiles are found via the keystore index
+    (see `keystore_index`), which is rebuilt if 'rebuild_index' is set.
     """
-    addr_keyfile_dict: Dict[ChecksumAddress, str] = {}
-    keyfile_list = os.listdir(keystore_dir)
-    for fn in keyfile_list:
-        keyfile_path = keystore_dir + "/" + fn
-        try:
-            keyfile = load_keyfile(keyfile_path)
-        except json.JSONDecodeError:
-            continue
-        addr_lower = keyfile["address"]
-        addr_keyfile_dict[Web3.to_checksum_address("0x" + addr_lower)] = keyfile_path
-
-    return addr_keyfile_dict
+    return keystore_index.keystore_accounts(keystore_dir, rebuild=rebuild_index)
 
 
 def to_checksum_address(address: str) -> ChecksumAddress:
@@ -327,6 +367,27 @@ def to_json(data: Union[Mapping[str, V], Sequence[V]], pretty: bool = False) ->
     )
 
 
+def print_list(items: Iterable[V], format_list: Callable[[List[V]], str]) -> None:
+    """
+    Print the items of a list-producing command.  With `--output ndjson`, each
+    item is printed as a line of JSON (see `print_ndjson`) as it is produced.
+    Otherwise, the items are collected and printed using `format_list`.
+    """
+    if ndjson_output_requested():
+        for item in items:
+            print_ndjson(item)
+    else:
+        print(format_list(list(items)))
+
+
+def print_ndjson(item: Any) -> None:
+    """
+    Print an item as a single line of JSON, encoded as by `to_json`, and flush
+    it so that consumers receive each item as it is produced.
+    """
+    print(json.dumps(item, cls=JSONEncoder), flush=True)
+
+
 def string_is_32byte_hash(hash_str: str) -> bool:
     """
     Test if string is valid, 0x-prefixed representation of a
@@ -376,6 +437,19 @@ def validate_block_identifier(block_id: Union[str, int]) -> BlockIdentifier:
     return HexBytes(block_id)
 
 
+def block_number_from_arg(w3: Web3, block_arg: str) -> int:
+    """
+    Resolve a block number argument, which is either a number or "latest".
+    """
+
+    if block_arg == "latest":
+        return w3.eth.block_number
+    try:
+        return int(block_arg)
+    except ValueError as exc:
+        raise ClickException(f"invalid block number '{block_arg}'") from exc
+
+
 def load_from_file_or_stdin(filename: str) -> str:
     """
     Open a file and return the stream, where '-' represents stdin.
@@ -446,8 +520,8 @@ def prompt_for_new_password() -> str:
     """
     prompt = "Password for new account: "
     prompt_2 = "Confirm account password: "
-    password = getpass(prompt)
-    password_2 = getpass(prompt_2)
+    password = prompt_secret(prompt)
+    password_2 = prompt_secret(prompt_2)
 
     if password != password_2:
         raise ClickException("passwords do not match")
@@ -0,0 +1,39 @@
+"""
+Benchmark `get_account_stats` (used by `aut account info`) against a local
+mock node with simulated network latency, with and without batching.
+
+Run with `python -m tests.bench_account_info`.
+"""
+
+import time
+
+from web3 import Web3
+
+from autonity_cli.user import get_account_stats
+from tests.mock_node import MockNode
+from tests.test_user import account_handlers
+
+NUM_ACCOUNTS = 500
+LATENCY = 0.002
+
+
+def main() -> None:
+    accounts = [
+        Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, NUM_ACCOUNTS + 1)
+    ]
+    with MockNode(account_handlers(), latency=LATENCY) as node:
+        w3 = Web3(Web3.HTTPProvider(node.endpoint))
+        print(f"{NUM_ACCOUNTS} accounts, {LATENCY * 1000:.0f} ms latency per request")
+        for batch_size in [0, 10, 100, 1000]:
+            node.reset_counters()
+            start = time.perf_counter()
+            get_account_stats(w3, accounts, batch_size=batch_size)
+            elapsed = time.perf_counter() - start
+            print(
+                f"batch size {batch_size:5}: {elapsed * 1000:8.1f} ms "
+                f"({node.http_requests} HTTP requests)"
+            )
+
+
+if __name__ == "__main__":
+    main()
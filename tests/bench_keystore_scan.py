@@ -0,0 +1,77 @@
+"""
+Benchmark listing the accounts of a synthetic keystore of 100k keyfiles:
+reading every keyfile sequentially (as `account list` did before the
+keystore index), scanning with different numbers of workers, and refreshing
+an up-to-date index.
+
+Run with `python -m tests.bench_keystore_scan`.
+"""
+
+import json
+import os
+import time
+from tempfile import TemporaryDirectory
+from typing import Dict
+
+from web3 import Web3
+
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.keyfile import load_keyfile
+from autonity_cli.keystore_index import scan_keystore
+
+NUM_KEYFILES = 100_000
+KEYFILE = "tests/data/alice.key"
+
+
+def make_keystore(keystore_dir: str) -> None:
+    with open(KEYFILE, encoding="utf8") as keyfile_f:
+        keyfile = json.load(keyfile_f)
+    for i in range(NUM_KEYFILES):
+        keyfile["address"] = f"{i:040x}"
+        with open(os.path.join(keystore_dir, f"{i}.key"), "w") as key_f:
+            json.dump(keyfile, key_f)
+    # Make modification times old enough to be trusted by the index.
+    mtime = time.time() - 60
+    for file_name in [*os.listdir(keystore_dir), "."]:
+        os.utime(os.path.join(keystore_dir, file_name), (mtime, mtime))
+
+
+def read_sequentially(keystore_dir: str) -> int:
+    accounts: Dict[str, str] = {}
+    for file_name in os.listdir(keystore_dir):
+        keyfile_path = keystore_dir + "/" + file_name
+        address = load_keyfile(keyfile_path)["address"]
+        accounts[Web3.to_checksum_address("0x" + address)] = keyfile_path
+    return len(accounts)
+
+
+def main() -> None:
+    with TemporaryDirectory() as cache_dir, TemporaryDirectory() as keystore_dir:
+        os.environ[CACHE_DIRECTORY_ENV_VAR] = cache_dir
+        make_keystore(keystore_dir)
+        print(f"{NUM_KEYFILES} keyfiles")
+
+        start = time.perf_counter()
+        assert read_sequentially(keystore_dir) == NUM_KEYFILES
+        print(f"sequential read:          {time.perf_counter() - start:7.2f} s")
+
+        for workers in [1, 4, 8, 16]:
+            start = time.perf_counter()
+            scanned = scan_keystore(keystore_dir, rebuild=True, workers=workers)
+            first = time.perf_counter()
+            next(scanned)
+            first = time.perf_counter() - first
+            assert sum(1 for _ in scanned) == NUM_KEYFILES - 1
+            print(
+                f"scan, {workers:2} worker(s):      "
+                f"{time.perf_counter() - start:7.2f} s "
+                f"(first account after {first * 1000:.1f} ms)"
+            )
+
+        start = time.perf_counter()
+        assert sum(1 for _ in scan_keystore(keystore_dir)) == NUM_KEYFILES
+        print(f"scan, up-to-date index:   {time.perf_counter() - start:7.2f} s")
+
+
+if __name__ == "__main__":
+    main()
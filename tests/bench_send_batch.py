@@ -0,0 +1,65 @@
+"""
+Benchmark `aut tx send-batch` against a node with 20ms latency, with
+different numbers of transactions in flight.
+
+Run with `python -m tests.bench_send_batch`.
+"""
+
+import json
+import os
+import time
+from typing import Any, List
+
+from click.testing import CliRunner
+from web3 import Web3
+
+from autonity_cli.__main__ import aut
+from tests.mock_node import MockNode
+
+KEYFILE = "tests/data/alice.key"
+NUM_TXS = 200
+LATENCY = 0.02
+
+
+def sign_txs(runner: CliRunner, num_txs: int) -> str:
+    txs = [
+        json.dumps(
+            {
+                "to": "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF",
+                "value": 1,
+                "gas": 21000,
+                "gasPrice": 1,
+                "nonce": nonce,
+                "chainId": 65000000,
+            }
+        )
+        for nonce in range(num_txs)
+    ]
+    result = runner.invoke(
+        aut, ["tx", "sign-batch", "--keyfile", KEYFILE, "-"], input="\n".join(txs)
+    )
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def send_raw_transaction(params: List[Any]) -> str:
+    return Web3.to_hex(Web3.keccak(hexstr=params[0]))
+
+
+def main() -> None:
+    os.environ["KEYFILEPWD"] = "alice"
+    runner = CliRunner()
+    signed = sign_txs(runner, NUM_TXS)
+
+    with MockNode({"eth_sendRawTransaction": send_raw_transaction}, LATENCY) as node:
+        for max_in_flight in [1, 4, 16, 64]:
+            args = ["tx", "send-batch", "-r", node.endpoint, "-m", str(max_in_flight)]
+            start = time.perf_counter()
+            result = runner.invoke(aut, [*args, "-"], input=signed)
+            assert result.exit_code == 0, result.output
+            per_tx = (time.perf_counter() - start) / NUM_TXS
+            print(f"--max-in-flight {max_in_flight:2}: {per_tx * 1000:7.2f} ms per tx")
+
+
+if __name__ == "__main__":
+    main()
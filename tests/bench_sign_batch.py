@@ -0,0 +1,60 @@
+"""
+Benchmark `aut tx sign-batch` against signing each transaction with `aut tx
+sign` (which decrypts the keyfile every time).
+
+Run with `python -m tests.bench_sign_batch`.
+"""
+
+import json
+import os
+import time
+from typing import List
+
+from click.testing import CliRunner
+
+from autonity_cli.__main__ import aut
+
+KEYFILE = "tests/data/alice.key"
+NUM_TXS = 5000
+NUM_SINGLE_TXS = 20
+
+
+def make_txs(num_txs: int) -> List[str]:
+    return [
+        json.dumps(
+            {
+                "to": "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF",
+                "value": 1,
+                "gas": 21000,
+                "maxFeePerGas": 2000,
+                "maxPriorityFeePerGas": 1,
+                "nonce": nonce,
+                "chainId": 65000000,
+            }
+        )
+        for nonce in range(num_txs)
+    ]
+
+
+def main() -> None:
+    os.environ["KEYFILEPWD"] = "alice"
+    runner = CliRunner()
+
+    start = time.perf_counter()
+    for tx in make_txs(NUM_SINGLE_TXS):
+        runner.invoke(aut, ["tx", "sign", "--keyfile", KEYFILE, "-"], input=tx)
+    per_tx = (time.perf_counter() - start) / NUM_SINGLE_TXS
+    print(f"tx sign:                  {per_tx * 1000:7.2f} ms per tx")
+
+    txs = "\n".join(make_txs(NUM_TXS))
+    for jobs in [1, 2, 4]:
+        args = ["tx", "sign-batch", "--keyfile", KEYFILE, "--jobs", str(jobs), "-"]
+        start = time.perf_counter()
+        result = runner.invoke(aut, args, input=txs)
+        assert result.exit_code == 0, result.output
+        per_tx = (time.perf_counter() - start) / NUM_TXS
+        print(f"tx sign-batch --jobs {jobs}:  {per_tx * 1000:7.2f} ms per tx")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmark the start-up time of the `aut` command.
+
+Run with `python -m tests.bench_startup`.
+"""
+
+import subprocess
+import sys
+import time
+from typing import List
+
+from tests.mock_node import MockNode
+
+RUNS = 10
+
+# Equivalent of the previous entry point, which imported every command module.
+EAGER_IMPORTS = "; ".join(
+    f"import autonity_cli.commands.{module}"
+    for module in [
+        "account",
+        "block",
+        "contract",
+        "governance",
+        "node",
+        "protocol",
+        "token",
+        "tx",
+        "validator",
+    ]
+)
+
+
+def time_command(cmd: List[str]) -> float:
+    """
+    Mean wall-clock time (in seconds) of running `cmd` in a new process.
+    """
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        subprocess.run(cmd, check=True, capture_output=True)
+    return (time.perf_counter() - start) / RUNS
+
+
+def main() -> None:
+    aut = [sys.executable, "-c", "from autonity_cli.__main__ import aut; aut()"]
+    with MockNode() as node:
+        cases = {
+            "import all commands (eager)": [sys.executable, "-c", EAGER_IMPORTS],
+            "aut --help": [*aut, "--help"],
+            "aut block height": [*aut, "block", "height", "-r", node.endpoint],
+        }
+        for name, cmd in cases.items():
+            print(f"{name:32} {time_command(cmd) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Minimal JSON-RPC node, served over HTTP on a local port, for use in tests and
+benchmarks.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Any, Callable, Dict, List, Optional, Set, Type, cast
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import ServerConnection, serve
+
+Handler = Callable[[List[Any]], Any]
+
+
+class MockNode:
+    """
+    Serves JSON-RPC requests (single or batched) using `handlers`, a map from
+    method name to a function of the request params.  Each HTTP request is
+    delayed by `latency` seconds, to simulate a remote node.
+    """
+
+    def __init__(
+        self, handlers: Optional[Dict[str, Handler]] = None, latency: float = 0.0
+    ):
+        self.handlers: Dict[str, Handler] = {
+            "eth_chainId": lambda _: hex(65000000),
+            "eth_blockNumber": lambda _: hex(1000),
+            "eth_getCode": lambda _: "0x",
+        }
+        self.handlers.update(handlers or {})
+        self.latency = latency
+        self.http_requests = 0
+        self.rpc_calls: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "MockNode":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.http_requests = 0
+            self.rpc_calls.clear()
+
+    def __enter__(self) -> "MockNode":
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+    def record_http_request(self) -> None:
+        with self._lock:
+            self.http_requests += 1
+
+    def respond(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = request["method"]
+        with self._lock:
+            self.rpc_calls[method] += 1
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        handler = self.handlers.get(method)
+        if handler is None:
+            response["error"] = {"code": -32601, "message": f"no method {method}"}
+            return response
+        try:
+            response["result"] = handler(request.get("params", []))
+        except Exception as exc:
+            response["error"] = {"code": -32000, "message": str(exc)}
+        return response
+
+    def _handler_class(self) -> Type[BaseHTTPRequestHandler]:
+        node = self
+
+        class _RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                node.record_http_request()
+                if node.latency:
+                    time.sleep(node.latency)
+                length = int(self.headers["Content-Length"])
+                request = json.loads(self.rfile.read(length))
+                if isinstance(request, list):
+                    requests = cast(List[Dict[str, Any]], request)
+                    result: Any = [node.respond(r) for r in requests]
+                else:
+                    result = node.respond(request)
+                body = json.dumps(result).encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return _RequestHandler
+
+
+class MockWebSocketNode(MockNode):
+    """
+    MockNode served over WebSocket, which supports `newHeads` subscriptions.
+    Once the first subscription is made, a new block is produced every
+    `block_time` seconds (starting from block 1000).  Subscriptions are
+    confirmed after `subscribe_latency` seconds.  The close code of each
+    connection is recorded in `close_codes`.
+    """
+
+    def __init__(
+        self, handlers: Optional[Dict[str, Handler]] = None, block_time: float = 0.05
+    ):
+        super().__init__(handlers)
+        self.head = 1000
+        self.block_time = block_time
+        self.subscribe_latency = 0.0
+        self.handlers["eth_blockNumber"] = lambda _: hex(self.head)
+        self.close_codes: List[Optional[int]] = []
+        self._subscribers: Set[ServerConnection] = set()
+        self._subscribed = threading.Event()
+        self._closed = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._ws_server = serve(self._serve_connection, "127.0.0.1", 0)
+        self._ws_thread = threading.Thread(
+            target=self._ws_server.serve_forever, daemon=True
+        )
+        self._block_thread = threading.Thread(target=self._produce_blocks, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"ws://127.0.0.1:{self._ws_server.socket.getsockname()[1]}"
+
+    def start(self) -> "MockWebSocketNode":
+        self._ws_thread.start()
+        self._block_thread.start()
+        return self
+
+    def __enter__(self) -> "MockWebSocketNode":
+        return self.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._subscribed.set()
+        self._ws_server.shutdown()
+        self._server.server_close()
+
+    def wait_closed(self, count: int, timeout: float = 5.0) -> List[Optional[int]]:
+        """
+        Wait until `count` connections have been closed, returning the close
+        codes.
+        """
+        with self._closed:
+            self._closed.wait_for(lambda: len(self.close_codes) >= count, timeout)
+            return list(self.close_codes)
+
+    def _serve_connection(self, conn: ServerConnection) -> None:
+        try:
+            for message in conn:
+                self.record_http_request()
+                request = json.loads(message)
+                if isinstance(request, list):
+                    requests = cast(List[Dict[str, Any]], request)
+                    response: Any = [self.respond(r) for r in requests]
+                elif request["method"] == "eth_subscribe":
+                    time.sleep(self.subscribe_latency)
+                    with self._lock:
+                        self.rpc_calls["eth_subscribe"] += 1
+                        self._subscribers.add(conn)
+                    self._subscribed.set()
+                    response = {"jsonrpc": "2.0", "id": request["id"], "result": "0x1"}
+                else:
+                    response = self.respond(request)
+                conn.send(json.dumps(response))
+        except ConnectionClosed:
+            pass
+        finally:
+            with self._lock:
+                self._subscribers.discard(conn)
+                self.close_codes.append(conn.close_code)
+                self._closed.notify_all()
+
+    def _produce_blocks(self) -> None:
+        self._subscribed.wait()
+        while not self._stopped.wait(self.block_time):
+            with self._lock:
+                self.head += 1
+                subscribers = list(self._subscribers)
+            notification = {
+                "jsonrpc": "2.0",
+                "method": "eth_subscription",
+                "params": {"subscription": "0x1", "result": {"number": hex(self.head)}},
+            }
+            for conn in subscribers:
+                try:
+                    conn.send(json.dumps(notification))
+                except ConnectionClosed:
+                    pass
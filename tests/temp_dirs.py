@@ -0,0 +1,35 @@
+"""
+Temporary local directories (cache, state, keystore, etc), for tests which
+must not touch those of the user.
+"""
+
+import os
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from autonity_cli import cache
+
+
+def use_temp_directories(test: TestCase, *env_vars: str) -> List[str]:
+    """
+    Point each of `env_vars` (e.g. CACHE_DIRECTORY_ENV_VAR) at a new temporary
+    directory until the end of `test`, returning the directories.  The genesis
+    hashes recorded in memory by `cache` are also cleared, so that endpoints
+    of earlier tests are checked again.
+    """
+
+    directories: List[str] = []
+    for _ in env_vars:
+        directory = TemporaryDirectory()
+        test.addCleanup(directory.cleanup)
+        directories.append(directory.name)
+
+    env = patch.dict(os.environ, dict(zip(env_vars, directories)))
+    env.start()
+    test.addCleanup(env.stop)
+    genesis_hashes = patch.dict(cache.genesis_hashes, clear=True)
+    genesis_hashes.start()
+    test.addCleanup(genesis_hashes.stop)
+    return directories
@@ -0,0 +1,120 @@
+"""
+Test signing via `aut agent`
+"""
+
+import json
+import os
+import threading
+import time
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from eth_account import Account
+
+from autonity_cli import agent
+from autonity_cli.__main__ import aut
+
+KEYFILE = "tests/data/alice.key"
+ALICE = "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf"  # tests/data/alice.key
+TX = {
+    "from": ALICE,
+    "to": "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF",
+    "value": 1,
+    "gas": 21000,
+    "maxFeePerGas": 2000,
+    "maxPriorityFeePerGas": 1,
+    "nonce": 0,
+    "chainId": 65000000,
+}
+TTL = 0.5
+
+
+class TestAgent(TestCase):
+    """
+    Test the agent client and server
+    """
+
+    def setUp(self) -> None:
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.socket_path = os.path.join(tmp_dir.name, "agent.sock")
+        self.server = agent.create_server(self.socket_path, TTL)
+        thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.shutdown)
+
+    def _aut(self, args: List[str], stdin: str, password: str = "alice") -> str:
+        env = {"KEYFILEPWD": password, agent.AGENT_SOCKET_ENV_VAR: self.socket_path}
+        with patch.dict(os.environ, env):
+            result = CliRunner(mix_stderr=False).invoke(aut, args, input=stdin)
+        self.assertEqual(0, result.exit_code, result.stderr)
+        return result.stdout
+
+    def test_socket_permissions(self) -> None:
+        """
+        Only the current user can connect to the agent.
+        """
+        self.assertEqual(0o600, os.stat(self.socket_path).st_mode & 0o777)
+
+    def test_sign(self) -> None:
+        """
+        The keyfile is decrypted once, and then the agent signs (without the
+        password) until the key expires.
+        """
+
+        sign_tx = ["tx", "sign", "--keyfile", KEYFILE, "-"]
+        sign_message = ["account", "sign-message", "--keyfile", KEYFILE, "hello"]
+        with patch.object(Account, "decrypt", wraps=Account.decrypt) as decrypt:
+            signed_tx = self._aut(sign_tx, json.dumps(TX))
+            signature = self._aut(sign_message, "")
+            self.assertEqual(1, decrypt.call_count)
+            self.assertEqual([ALICE], list(self.server.keys))
+
+            self.assertEqual(signed_tx, self._aut(sign_tx, json.dumps(TX), "wrong"))
+            self.assertEqual(signature, self._aut(sign_message, "", "wrong"))
+            self.assertEqual(1, decrypt.call_count)
+
+            # The key expires
+            time.sleep(TTL + 0.1)
+            self.assertEqual({}, self.server.keys)
+            self.assertEqual(signed_tx, self._aut(sign_tx, json.dumps(TX)))
+            self.assertEqual(2, decrypt.call_count)
+
+        # Identical to signing without the agent
+        with patch.dict(os.environ, {"KEYFILEPWD": "alice"}):
+            result = CliRunner().invoke(aut, sign_tx, input=json.dumps(TX))
+        self.assertEqual(signed_tx, result.output)
+
+    def test_other_user(self) -> None:
+        """
+        Requests from processes of other users are rejected, and signing
+        falls back to decrypting the keyfile.
+        """
+
+        with patch.object(agent.os, "getuid", return_value=os.getuid() + 1):
+            with self.assertRaisesRegex(agent.AgentError, "permission denied"):
+                agent.request(self.socket_path, {"op": "list"})
+
+            with patch.object(Account, "decrypt", wraps=Account.decrypt) as decrypt:
+                self._aut(["tx", "sign", "--keyfile", KEYFILE, "-"], json.dumps(TX))
+                self._aut(["tx", "sign", "--keyfile", KEYFILE, "-"], json.dumps(TX))
+                self.assertEqual(2, decrypt.call_count)
+
+        self.assertEqual({}, self.server.keys)
+
+    def test_no_peer_credentials(self) -> None:
+        """
+        The agent does not start where the user of connecting processes
+        cannot be checked.
+        """
+
+        with patch.object(agent, "peer_credentials_supported", return_value=False):
+            with self.assertRaisesRegex(agent.AgentError, "cannot check the user"):
+                agent.create_server(self.socket_path + ".other", TTL)
@@ -0,0 +1,118 @@
+"""
+Test exporting ranges of blocks
+"""
+
+import json
+import os
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_TTL_ENV_VAR
+from tests.mock_node import MockNode, MockWebSocketNode
+
+
+def block(number: int) -> Dict[str, Any]:
+    return {
+        "number": hex(number),
+        "hash": "0x" + f"{number:064x}",
+        "parentHash": "0x" + f"{max(number - 1, 0):064x}",
+        "timestamp": hex(1700000000 + number),
+        "gasUsed": "0x0",
+        "transactions": [],
+    }
+
+
+class TestBlockRange(TestCase):
+    """
+    Test `aut block range`
+    """
+
+    def setUp(self) -> None:
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.failing_block = -1
+        self.node = MockNode({"eth_getBlockByNumber": self._get_block}).start()
+        self.addCleanup(self.node.stop)
+
+    def _get_block(self, params: List[Any]) -> Dict[str, Any]:
+        number = int(params[0], 16)
+        if number == self.failing_block:
+            self.failing_block = -1
+            raise ValueError("node unavailable")
+        return block(number)
+
+    def _range(self, *args: str, exit_code: int = 0) -> List[Dict[str, Any]]:
+        result = CliRunner(mix_stderr=False).invoke(
+            aut, ["block", "range", "-r", self.node.endpoint, *args]
+        )
+        self.assertEqual(exit_code, result.exit_code, result.stderr)
+        return [json.loads(line) for line in result.stdout.splitlines()]
+
+    def test_range(self) -> None:
+        """
+        Blocks are output in order, requested in batches, and projected onto
+        the given fields.
+        """
+
+        blocks = self._range("--batch-size", "3", "10", "19")
+        self.assertEqual(list(range(10, 20)), [b["number"] for b in blocks])
+        self.assertEqual(4, self.node.http_requests)
+        self.assertEqual(10, self.node.rpc_calls["eth_getBlockByNumber"])
+
+        blocks = self._range("--fields", "timestamp,number", "998")
+        self.assertEqual(
+            [
+                {"timestamp": 1700000000 + number, "number": number}
+                for number in range(998, 1001)
+            ],
+            blocks,
+        )
+        self.assertEqual(["timestamp", "number"], list(blocks[0]))
+
+        result = CliRunner(mix_stderr=False).invoke(
+            aut, ["block", "range", "-r", self.node.endpoint, "5", "nonsense"]
+        )
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("invalid block number", result.stderr)
+
+    def test_checkpoint(self) -> None:
+        """
+        An interrupted export resumes after the last batch that was output.
+        """
+
+        with TemporaryDirectory() as tmp_dir:
+            checkpoint = os.path.join(tmp_dir, "checkpoint")
+            args = ["--batch-size", "4", "--checkpoint", checkpoint, "0", "20"]
+
+            self.failing_block = 13
+            first = self._range(*args, exit_code=1)
+            self.assertEqual(list(range(12)), [b["number"] for b in first])
+            with open(checkpoint, encoding="utf8") as checkpoint_f:
+                self.assertEqual("11\n", checkpoint_f.read())
+
+            second = self._range(*args)
+            self.assertEqual(list(range(12, 21)), [b["number"] for b in second])
+            self.assertEqual([], self._range(*args))
+
+    def test_websocket(self) -> None:
+        """
+        Over a WebSocket endpoint, whose connection cannot be shared between
+        threads, batches are requested one at a time.
+        """
+
+        with MockWebSocketNode({"eth_getBlockByNumber": self._get_block}) as node:
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["block", "range", "-r", node.endpoint, "--batch-size", "2", "0", "39"],
+            )
+        self.assertEqual(0, result.exit_code, result.stderr)
+        self.assertEqual(
+            list(range(40)),
+            [json.loads(line)["number"] for line in result.stdout.splitlines()],
+        )
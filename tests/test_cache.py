@@ -0,0 +1,172 @@
+"""
+Test the on-disk cache of chain metadata
+"""
+
+import os
+import time
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from web3 import Web3
+
+from autonity_cli import cache
+from autonity_cli.__main__ import aut
+from tests.mock_node import Handler, MockNode
+from tests.temp_dirs import use_temp_directories
+from tests.test_tx_batch import FROM, RECIPIENTS, tx_handlers
+
+GENESIS_HASH = "0x" + "11" * 32
+TO = RECIPIENTS[0]
+
+
+def genesis_handlers(
+    genesis_hash: str = GENESIS_HASH, chain_id: int = 65000000
+) -> Dict[str, Handler]:
+    """
+    Handlers for a node which only knows the genesis block.
+    """
+
+    def get_block_by_number(params: List[Any]) -> Dict[str, Any]:
+        assert params[0] == "0x0"
+        return {"number": "0x0", "hash": genesis_hash}
+
+    return {
+        "eth_getBlockByNumber": get_block_by_number,
+        "eth_chainId": lambda _: hex(chain_id),
+    }
+
+
+class TestCache(TestCase):
+    """
+    Test the on-disk cache of chain metadata
+    """
+
+    def setUp(self) -> None:
+        (self.cache_dir,) = use_temp_directories(self, cache.CACHE_DIRECTORY_ENV_VAR)
+
+    def test_chain_id(self) -> None:
+        """
+        The chain ID is only requested once, and is shared by endpoints of the
+        same chain.
+        """
+
+        with MockNode(genesis_handlers()) as node:
+            self.assertEqual(
+                65000000, cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+            )
+            self.assertEqual(
+                65000000, cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+            )
+            self.assertEqual(1, node.rpc_calls["eth_chainId"])
+            self.assertEqual(1, node.rpc_calls["eth_getBlockByNumber"])
+
+        with MockNode(genesis_handlers()) as other_node:
+            w3 = Web3(Web3.HTTPProvider(other_node.endpoint))
+            self.assertEqual(65000000, cache.chain_id(w3))
+            self.assertEqual(0, other_node.rpc_calls["eth_chainId"])
+            self.assertEqual(1, other_node.rpc_calls["eth_getBlockByNumber"])
+
+    def test_expiry(self) -> None:
+        """
+        Entries are requested again once they expire.
+        """
+
+        with MockNode(genesis_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            cache.chain_id(w3)
+
+            expired = time.time() + cache.DEFAULT_CACHE_TTL + 1
+            with patch.object(cache.time, "time", return_value=expired):
+                cache.chain_id(w3)
+
+            self.assertEqual(2, node.rpc_calls["eth_chainId"])
+            self.assertEqual(1, node.rpc_calls["eth_getBlockByNumber"])
+
+    def test_chain_reset(self) -> None:
+        """
+        The genesis hash of an endpoint is only cached briefly, so entries of a
+        chain which has been replaced behind the same endpoint are soon no
+        longer used.
+        """
+
+        with MockNode(genesis_handlers()) as node:
+            self.assertEqual(
+                65000000, cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+            )
+            node.handlers.update(genesis_handlers("0x" + "22" * 32, 1234))
+
+            # A new process, soon after the chain behind the endpoint was
+            # replaced
+            cache.genesis_hashes.clear()
+            self.assertEqual(
+                65000000, cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+            )
+
+            # A new process, once the genesis hash has expired
+            cache.genesis_hashes.clear()
+            expired = time.time() + cache.GENESIS_HASH_TTL + 1
+            with patch.object(cache.time, "time", return_value=expired):
+                self.assertEqual(
+                    1234, cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+                )
+
+    def test_one_shot_commands(self) -> None:
+        """
+        A command run in a new process with a warm cache makes fewer requests
+        than without the cache.
+        """
+
+        with MockNode(tx_handlers()) as node:
+            make = [
+                "tx",
+                "make",
+                "-r",
+                node.endpoint,
+                "--from",
+                FROM,
+                "--to",
+                TO,
+                "-v",
+                "1",
+            ]
+            with patch.dict(os.environ, {cache.CACHE_TTL_ENV_VAR: "0"}):
+                self.assertEqual(0, CliRunner().invoke(aut, make).exit_code)
+            uncached = sum(node.rpc_calls.values())
+
+            self.assertEqual(0, CliRunner().invoke(aut, make).exit_code)
+            cache.genesis_hashes.clear()
+            node.reset_counters()
+            self.assertEqual(0, CliRunner().invoke(aut, make).exit_code)
+            self.assertEqual(0, node.rpc_calls["eth_chainId"])
+            self.assertLess(sum(node.rpc_calls.values()), uncached)
+
+    def test_disabled(self) -> None:
+        """
+        A TTL of 0 disables the cache.
+        """
+
+        with MockNode(genesis_handlers()) as node:
+            with patch.dict(os.environ, {cache.CACHE_TTL_ENV_VAR: "0"}):
+                cache.chain_id(Web3(Web3.HTTPProvider(node.endpoint)))
+            self.assertEqual(0, node.rpc_calls["eth_getBlockByNumber"])
+
+        self.assertEqual([], os.listdir(self.cache_dir))
+
+    def test_clear(self) -> None:
+        """
+        `aut cache clear` removes all entries.
+        """
+
+        with MockNode(genesis_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            cache.chain_id(w3)
+            self.assertNotEqual([], os.listdir(self.cache_dir))
+
+            result = CliRunner().invoke(aut, ["cache", "clear"])
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertFalse(os.path.exists(self.cache_dir))
+
+            cache.chain_id(w3)
+            self.assertEqual(2, node.rpc_calls["eth_chainId"])
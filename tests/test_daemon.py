@@ -0,0 +1,168 @@
+"""
+Test running commands via `aut serve`
+"""
+
+import io
+import json
+import os
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from autonity_cli import daemon
+from tests.mock_node import MockNode
+from tests.test_block_range import block
+
+
+class _WriteRecorder(io.StringIO):
+    """
+    Records each write, to check that output arrives in chunks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes: List[str] = []
+
+    def write(self, s: str) -> int:
+        self.writes.append(s)
+        return super().write(s)
+
+
+def _stdin(text: str = "") -> io.TextIOWrapper:
+    """
+    Standard input holding `text`.
+    """
+    return io.TextIOWrapper(io.BytesIO(text.encode()), encoding="utf8")
+
+
+class TestDaemon(TestCase):
+    """
+    Test the daemon client and server
+    """
+
+    def setUp(self) -> None:
+        self.tmp_dir = TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp_dir.name, "aut.sock")
+        self.server = daemon.create_server(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def forward(
+        self, args: List[str], stdin: Optional[TextIO] = None
+    ) -> Tuple[int, str, str]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            with patch("sys.stdin", stdin or _stdin()):
+                exit_code = daemon.forward(self.socket_path, args)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_socket_permissions(self) -> None:
+        """
+        Only the current user can connect to the server.
+        """
+        self.assertEqual(0o600, os.stat(self.socket_path).st_mode & 0o777)
+
+    def test_forward(self) -> None:
+        """
+        Commands run in the server, reusing the connection to the node.
+        """
+        with MockNode() as node:
+            for _ in range(2):
+                exit_code, stdout, _ = self.forward(
+                    ["block", "height", "-r", node.endpoint]
+                )
+                self.assertEqual(0, exit_code)
+                self.assertEqual("1000\n", stdout)
+
+            self.assertEqual(2, node.rpc_calls["eth_blockNumber"])
+
+    def test_forward_error(self) -> None:
+        """
+        Errors are reported to the client, with a non-zero exit status.
+        """
+        exit_code, stdout, stderr = self.forward(["tx", "wait", "0x1234"])
+        self.assertEqual(1, exit_code)
+        self.assertEqual("", stdout)
+        self.assertIn("0x1234 is not a 32-byte hash", stderr)
+
+        exit_code, _, stderr = self.forward(["block", "no-such-command"])
+        self.assertEqual(2, exit_code)
+        self.assertIn("No such command", stderr)
+
+    def test_stream(self) -> None:
+        """
+        Output is streamed to the client a line at a time.
+        """
+
+        def get_block(params: List[Any]) -> Dict[str, Any]:
+            return block(int(params[0], 16))
+
+        with MockNode({"eth_getBlockByNumber": get_block}) as node:
+            stdout = _WriteRecorder()
+            with redirect_stdout(stdout), patch("sys.stdin", _stdin()):
+                exit_code = daemon.forward(
+                    self.socket_path,
+                    [
+                        "block",
+                        "range",
+                        "-r",
+                        node.endpoint,
+                        "--batch-size",
+                        "1",
+                        "0",
+                        "2",
+                    ],
+                )
+
+        self.assertEqual(0, exit_code)
+        self.assertEqual(3, len(stdout.writes))
+        self.assertEqual(
+            [0, 1, 2], [int(json.loads(w)["number"]) for w in stdout.writes]
+        )
+
+    def test_stdin(self) -> None:
+        """
+        Standard input is forwarded, even if the command reads it by default
+        rather than being given "-".
+        """
+        exit_code, _, stderr = self.forward(
+            ["tx", "wait-batch"], stdin=_stdin("0x1234\n")
+        )
+        self.assertEqual(1, exit_code)
+        self.assertIn("0x1234 is not a 32-byte hash", stderr)
+
+    def test_stdin_not_read(self) -> None:
+        """
+        Standard input is only read if the command reads it, so it is left for
+        later commands (as in a `while read` loop), and an open pipe does not
+        block commands which do not read it.
+        """
+
+        with MockNode() as node:
+            height = ["block", "height", "-r", node.endpoint]
+            stdin = _stdin("line 1\nline 2\n")
+            self.assertEqual(0, self.forward(height, stdin)[0])
+            self.assertEqual("line 1\nline 2\n", stdin.read())
+
+            read_fd, write_fd = os.pipe()
+            self.addCleanup(os.close, write_fd)
+            with open(read_fd, "r", encoding="utf8") as pipe:
+                self.assertEqual((0, "1000\n", ""), self.forward(height, pipe))
+
+    def test_no_server(self) -> None:
+        """
+        A missing server is reported as a DaemonError.
+        """
+        with self.assertRaises(daemon.DaemonError):
+            with patch("sys.stdin", _stdin()):
+                daemon.forward(self.socket_path + ".missing", ["block", "height"])
@@ -0,0 +1,127 @@
+"""
+Test Trezor account enumeration
+"""
+
+import hashlib
+import hmac
+from types import SimpleNamespace
+from typing import Any, List, Tuple
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import trezorlib.ethereum as trezor_eth
+from eth_account import Account
+from eth_account.hdaccount.deterministic import HardNode, SoftNode, derive_child_key
+from eth_keys.main import KeyAPI
+from trezorlib.exceptions import TrezorFailure
+from trezorlib.messages import Failure, FailureType
+
+from autonity_cli import device
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from tests.temp_dirs import use_temp_directories
+
+SEED = bytes(range(32))
+
+
+def account_node() -> Tuple[bytes, bytes]:
+    """
+    The private key and chain code of m/44h/60h/0h/0 for SEED.
+    """
+    main_node = hmac.digest(b"Bitcoin seed", SEED, hashlib.sha512)
+    key, chain_code = main_node[:32], main_node[32:]
+    for node in [HardNode(44), HardNode(60), HardNode(0), SoftNode(0)]:
+        key, chain_code = derive_child_key(key, chain_code, node)
+    return key, chain_code
+
+
+def public_key(key: bytes) -> bytes:
+    return KeyAPI.PrivateKey(key).public_key.to_compressed_bytes()
+
+
+def account_address(index: int) -> str:
+    key, chain_code = account_node()
+    return Account.from_key(
+        derive_child_key(key, chain_code, SoftNode(index))[0]
+    ).address
+
+
+class TestDevice(TestCase):
+    """
+    Test Trezor account enumeration
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR)
+
+    def test_derive_address(self) -> None:
+        """
+        Addresses derived from the public key of the account node match those
+        of the private keys derived from the seed.
+        """
+
+        key, chain_code = account_node()
+        for index in range(5):
+            self.assertEqual(
+                account_address(index),
+                device.derive_address(public_key(key), chain_code, index),
+            )
+
+    def test_enumerate_accounts(self) -> None:
+        """
+        Accounts are derived from a single public key request, and cached per
+        device unless the device is protected by a passphrase.
+        """
+
+        key, chain_code = account_node()
+        public_node = SimpleNamespace(
+            node=SimpleNamespace(public_key=public_key(key), chain_code=chain_code)
+        )
+        features = SimpleNamespace(device_id="D3V1C3", passphrase_protection=False)
+
+        def get_address(_client: Any, n: List[int]) -> str:
+            return account_address(n[-1])
+
+        def enumerate_accounts(start: int, n: int) -> List[Tuple[str, str]]:
+            client = SimpleNamespace(features=features)
+            with patch.object(device, "get_client", return_value=client):
+                return [
+                    (str(address), path)
+                    for address, path in device.enumerate_accounts(
+                        device.TREZOR_DEFAULT_PREFIX, start, n
+                    )
+                ]
+
+        get_public_node = MagicMock(return_value=public_node)
+        get_address_mock = MagicMock(side_effect=get_address)
+        with (
+            patch.object(trezor_eth, "get_public_node", get_public_node),
+            patch.object(trezor_eth, "get_address", get_address_mock),
+        ):
+            accounts = enumerate_accounts(0, 10)
+            self.assertEqual(
+                [(account_address(i), f"m/44h/60h/0h/0/{i}") for i in range(10)],
+                accounts,
+            )
+            self.assertEqual(1, get_public_node.call_count)
+            self.assertEqual(0, get_address_mock.call_count)
+
+            # Cached, including the public key for further indices
+            self.assertEqual(accounts[5:], enumerate_accounts(5, 5))
+            self.assertEqual(account_address(12), enumerate_accounts(12, 1)[0][0])
+            self.assertEqual(1, get_public_node.call_count)
+
+            # Not cached with a passphrase
+            features.passphrase_protection = True
+            self.assertEqual(accounts[:2], enumerate_accounts(0, 2))
+            self.assertEqual(2, get_public_node.call_count)
+
+            # Falls back to requesting each address
+            get_public_node.side_effect = device_failure()
+            self.assertEqual(accounts[:2], enumerate_accounts(0, 2))
+            self.assertEqual(2, get_address_mock.call_count)
+
+
+def device_failure() -> Exception:
+    return TrezorFailure(
+        Failure(code=FailureType.DataError, message="Forbidden key path")
+    )
@@ -0,0 +1,115 @@
+"""
+Test the fee oracle
+"""
+
+import os
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from web3 import Web3
+
+from autonity_cli import fees
+from autonity_cli.cache import CACHE_TTL_ENV_VAR
+from autonity_cli.erc20 import ERC20
+from autonity_cli.utils import (
+    create_contract_tx_from_args,
+    create_tx_from_args,
+    finalize_tx_from_args,
+)
+from tests.mock_node import Handler, MockNode
+
+FROM = Web3.to_checksum_address("0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF")
+TO = Web3.to_checksum_address("0x" + "01" * 20)
+TOKEN = Web3.to_checksum_address("0x" + "ab" * 20)
+BASE_FEE = 1000000007
+
+
+def fee_handlers() -> Dict[str, Handler]:
+    """
+    Handlers for a node whose latest block is 1000, where the base fee of
+    block N is BASE_FEE + N - 1000.
+    """
+
+    def fee_history(params: List[Any]) -> Dict[str, Any]:
+        newest = 1000 if params[1] == "latest" else int(params[1], 16)
+        return {
+            "oldestBlock": hex(newest),
+            "baseFeePerGas": [hex(BASE_FEE + newest - 1000), hex(BASE_FEE)],
+            "gasUsedRatio": [0.5],
+        }
+
+    return {
+        "eth_feeHistory": fee_history,
+        "eth_getTransactionCount": lambda _: "0x7",
+        "eth_estimateGas": lambda _: hex(21000),
+    }
+
+
+class TestFees(TestCase):
+    """
+    Test the fee oracle
+    """
+
+    def setUp(self) -> None:
+        # Disable the on-disk cache, so that all lookups reach the node.
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        fees._base_fees.clear()  # pyright: ignore[reportPrivateUsage]
+
+    def test_fee_factor(self) -> None:
+        """
+        Transactions and contract transactions get identical maxFeePerGas for
+        the same --fee-factor, from a single eth_feeHistory request.
+        """
+
+        with MockNode(fee_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            for fee_factor in [1.0, 1.5, 2.0, 2.7]:
+                node.reset_counters()
+                tx, _ = create_tx_from_args(
+                    w3,
+                    None,
+                    from_addr=FROM,
+                    to_addr=TO,
+                    value="1",
+                    fee_factor=fee_factor,
+                )
+                tx = finalize_tx_from_args(w3, None, tx, FROM)
+                self.assertEqual(1, node.rpc_calls["eth_feeHistory"])
+
+                contract_tx = create_contract_tx_from_args(
+                    ERC20(w3, TOKEN).transfer(TO, 1),
+                    from_addr=FROM,
+                    fee_factor=fee_factor,
+                )
+
+                self.assertEqual(0, node.rpc_calls["eth_getBlockByNumber"])
+                expected = int(BASE_FEE * fee_factor)
+                self.assertEqual(expected, tx.get("maxFeePerGas"), fee_factor)
+                self.assertEqual(expected, contract_tx.get("maxFeePerGas"), fee_factor)
+
+    def test_cache(self) -> None:
+        """
+        Base fees are cached per block number, and the latest base fee is
+        always requested.
+        """
+
+        with MockNode(fee_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            self.assertEqual(BASE_FEE, fees.base_fee_per_gas(w3))
+            self.assertEqual(BASE_FEE, fees.base_fee_per_gas(w3, 1000))
+            self.assertEqual(1, node.rpc_calls["eth_feeHistory"])
+
+            self.assertEqual(BASE_FEE + 2, fees.base_fee_per_gas(w3, 1002))
+            self.assertEqual(BASE_FEE + 2, fees.base_fee_per_gas(w3, 1002))
+            self.assertEqual(BASE_FEE, fees.base_fee_per_gas(w3))
+            self.assertEqual(3, node.rpc_calls["eth_feeHistory"])
+
+            # Shared by other Web3 objects for the same endpoint
+            other_w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            self.assertEqual(
+                int(BASE_FEE * 2.5), fees.max_fee_per_gas(other_w3, 2.5, 1000)
+            )
+            self.assertEqual(3, node.rpc_calls["eth_feeHistory"])
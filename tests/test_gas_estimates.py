@@ -0,0 +1,148 @@
+"""
+Test the cache of gas estimates
+"""
+
+import json
+from typing import Any, Dict, List, cast
+from unittest import TestCase
+
+from click.testing import CliRunner
+from web3 import Web3
+from web3.types import TxData, TxParams, TxReceipt
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.gas_estimates import estimate_gas, gas_report, record_gas_used
+from tests.mock_node import Handler, MockNode
+from tests.temp_dirs import use_temp_directories
+
+FROM = "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF"
+TO = "0x" + "01" * 20
+TOKEN = "0x" + "ab" * 20
+TX_HASH = "0x" + "22" * 32
+
+
+def gas_handlers(sent_tx: Dict[str, Any]) -> Dict[str, Handler]:
+    """
+    Handlers for a node where transactions are estimated to use 50000 gas,
+    and the transaction `sent_tx` (with hash TX_HASH) used 40000 gas.
+    """
+
+    def get_transaction_by_hash(_: List[Any]) -> Dict[str, Any]:
+        return {
+            "hash": TX_HASH,
+            "to": sent_tx["to"],
+            "input": sent_tx["data"],
+            "gas": hex(sent_tx["gas"]),
+        }
+
+    return {
+        "eth_getBlockByNumber": lambda _: {"number": "0x0", "hash": "0x" + "11" * 32},
+        "eth_getTransactionCount": lambda _: "0x7",
+        "eth_estimateGas": lambda _: hex(50000),
+        "eth_call": lambda _: "0x" + f"{18:064x}",
+        "eth_getTransactionByHash": get_transaction_by_hash,
+        "eth_getTransactionReceipt": lambda _: {
+            "transactionHash": TX_HASH,
+            "blockNumber": hex(1000),
+            "status": "0x1",
+            "gasUsed": hex(40000),
+        },
+    }
+
+
+class TestGasEstimates(TestCase):
+    """
+    Test the cache of gas estimates
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR)
+
+    def _aut(self, args: List[str]) -> Any:
+        result = CliRunner().invoke(aut, args)
+        self.assertEqual(0, result.exit_code, result.output)
+        return json.loads(result.output)
+
+    def test_gas_cache(self) -> None:
+        """
+        With --gas-cache, the gas of similar transactions is only estimated
+        once, and the gas used is recorded when waiting for them.
+        """
+
+        sent_tx: Dict[str, Any] = {}
+        with MockNode(gas_handlers(sent_tx)) as node:
+            rpc = ["--rpc-endpoint", node.endpoint]
+            make = ["tx", "make", *rpc, "--from", FROM, "-F", "2gwei", "-P", "1gwei"]
+            transfer = [*make, "--token", TOKEN, "--to", TO]
+
+            tx = self._aut([*transfer, "--value", "1", "--gas-cache"])
+            self.assertEqual(50000, tx["gas"])
+            self.assertEqual(1, node.rpc_calls["eth_estimateGas"])
+
+            # The same function, with the same calldata length
+            sent_tx.update(self._aut([*transfer, "--value", "2", "--gas-cache"]))
+            self.assertEqual(60000, sent_tx["gas"])
+            self.assertEqual(1, node.rpc_calls["eth_estimateGas"])
+
+            # A different recipient, and the cache disabled
+            self._aut([*make, "--to", TO, "--value", "1", "--gas-cache"])
+            self._aut([*transfer, "--value", "2"])
+            self.assertEqual(3, node.rpc_calls["eth_estimateGas"])
+
+            receipt = self._aut(["tx", "wait", *rpc, "--gas-cache", TX_HASH])
+            self.assertEqual(40000, receipt["gasUsed"])
+            report = self._aut(["cache", "gas-report", *rpc])
+
+        self.assertEqual(2, len(report))
+        token_entry = next(e for e in report if e["to"] == TOKEN)
+        self.assertEqual("0xa9059cbb", token_entry["selector"])  # transfer
+        self.assertEqual(
+            {
+                "estimates": 1,
+                "max_estimate": 50000,
+                "receipts": 1,
+                "min_gas_used": 40000,
+                "max_gas_used": 40000,
+                "hits": 1,
+                "out_of_gas": 0,
+                "max_out_of_gas": 0,
+                "gas_limit": 60000,
+                "headroom": 0.5,
+            },
+            {
+                k: v
+                for k, v in token_entry.items()
+                if k not in ("to", "selector", "calldata_words")
+            },
+        )
+
+    def test_failed_transactions(self) -> None:
+        """
+        Reverted transactions are not recorded, and a transaction which ran
+        out of gas raises the gas limit above its own.
+        """
+
+        with MockNode(gas_handlers({})) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            tx = cast(TxParams, {"to": TO, "data": "0xa9059cbb"})
+            self.assertEqual(50000, estimate_gas(w3, tx))
+
+            def record(status: int, gas: int, gas_used: int) -> None:
+                record_gas_used(
+                    w3,
+                    cast(TxData, {**tx, "gas": gas}),
+                    cast(TxReceipt, {"status": status, "gasUsed": gas_used}),
+                )
+
+            record(0, 60000, 20000)  # reverted
+            self.assertEqual(60000, estimate_gas(w3, tx))
+
+            record(0, 60000, 60000)  # out of gas
+            self.assertEqual(72000, estimate_gas(w3, tx))
+
+            (entry,) = gas_report(w3)
+
+        self.assertEqual(0, entry["receipts"])
+        self.assertEqual(1, entry["out_of_gas"])
+        self.assertEqual(60000, entry["max_out_of_gas"])
@@ -0,0 +1,149 @@
+"""
+Test the keystore index
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from web3 import Web3
+
+from autonity_cli import keystore_index
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.config import KEYFILE_DIRECTORY_ENV_VAR
+from tests.temp_dirs import use_temp_directories
+
+ALICE = "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf"  # tests/data/alice.key
+BOB = "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF"  # tests/data/bob.key
+
+
+class TestKeystoreIndex(TestCase):
+    """
+    Test the keystore index
+    """
+
+    def setUp(self) -> None:
+        _, self.keystore = use_temp_directories(
+            self, CACHE_DIRECTORY_ENV_VAR, KEYFILE_DIRECTORY_ENV_VAR
+        )
+        self.mtime_ns = time.time_ns() - 60_000_000_000
+
+    def _settle(self, *file_names: str) -> None:
+        """
+        Give the keystore and the given files distinct modification times,
+        old enough to be trusted by the index.
+        """
+        for path in [self.keystore, *file_names]:
+            self.mtime_ns += 1_000_000
+            os.utime(
+                os.path.join(self.keystore, path), ns=(self.mtime_ns, self.mtime_ns)
+            )
+
+    def _accounts(self, rebuild: bool = False) -> List[str]:
+        """
+        Addresses in the keystore, and the files read to find them.
+        """
+        with patch.object(
+            keystore_index, "load_keyfile", wraps=keystore_index.load_keyfile
+        ) as load_keyfile:
+            accounts = keystore_index.keystore_accounts(self.keystore, rebuild)
+        self.files_read = sorted(
+            os.path.basename(call.args[0]) for call in load_keyfile.call_args_list
+        )
+        return sorted(accounts)
+
+    def test_incremental_refresh(self) -> None:
+        """
+        Only keyfiles which were added or modified since the index was written
+        are read, and removed keyfiles are dropped from the index.
+        """
+
+        shutil.copy("tests/data/alice.key", self.keystore)
+        with open(os.path.join(self.keystore, "notes.txt"), "w") as notes_f:
+            notes_f.write("not a keyfile")
+        self._settle("alice.key", "notes.txt")
+        self.assertEqual([ALICE], self._accounts())
+        self.assertEqual(["alice.key", "notes.txt"], self.files_read)
+
+        self.assertEqual([ALICE], self._accounts())
+        self.assertEqual([], self.files_read)
+
+        shutil.copy("tests/data/bob.key", self.keystore)
+        self._settle("bob.key")
+        self.assertEqual([BOB, ALICE], self._accounts())
+        self.assertEqual(["bob.key"], self.files_read)
+
+        alice_key = os.path.join(self.keystore, "alice.key")
+        with open(alice_key, "a") as alice_f:
+            alice_f.write("\n")
+        self._settle("alice.key")
+        self.assertEqual([BOB, ALICE], self._accounts())
+        self.assertEqual(["alice.key"], self.files_read)
+
+        os.remove(alice_key)
+        self._settle()
+        self.assertEqual([BOB], self._accounts())
+        self.assertEqual([], self.files_read)
+
+        self.assertEqual([BOB], self._accounts(rebuild=True))
+        self.assertEqual(["bob.key", "notes.txt"], self.files_read)
+
+    def test_scan_many(self) -> None:
+        """
+        Scanning more keyfiles than may be queued for the workers generates
+        every account once, and indexes all of them.
+        """
+
+        addresses = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(300)]
+        for i, address in enumerate(addresses):
+            with open(os.path.join(self.keystore, f"{i}.key"), "w") as key_f:
+                json.dump({"address": address[2:].lower()}, key_f)
+        self._settle(*(f"{i}.key" for i in range(len(addresses))))
+
+        scanned = list(keystore_index.scan_keystore(self.keystore, workers=2))
+        self.assertEqual(sorted(addresses), sorted(addr for addr, _ in scanned))
+        self.assertEqual(len(addresses), len(scanned))
+        self.assertEqual(sorted(addresses), self._accounts())
+        self.assertEqual([], self.files_read)
+
+    def test_sign_from(self) -> None:
+        """
+        `account list` lists the keystore via the index, and `tx sign --from`
+        signs with the keyfile for the address in the keystore.
+        """
+
+        shutil.copy("tests/data/alice.key", self.keystore)
+        shutil.copy("tests/data/bob.key", self.keystore)
+        runner = CliRunner(mix_stderr=False)
+
+        result = runner.invoke(aut, ["account", "list", "--rebuild-index"])
+        self.assertEqual(0, result.exit_code, result.stderr)
+        self.assertEqual(
+            [
+                f"{BOB} {os.path.join(self.keystore, 'bob.key')}",
+                f"{ALICE} {os.path.join(self.keystore, 'alice.key')}",
+            ],
+            sorted(result.stdout.splitlines()),
+        )
+
+        tx = {"from": ALICE, "to": BOB, "gas": 21000, "gasPrice": 1, "nonce": 0}
+        tx_json = json.dumps({**tx, "chainId": 65000000})
+        with patch.dict(os.environ, {"KEYFILEPWD": "alice"}):
+            signed = runner.invoke(aut, ["tx", "sign", "--from", ALICE, "-"], tx_json)
+            self.assertEqual(0, signed.exit_code, signed.stderr)
+            expected = runner.invoke(
+                aut, ["tx", "sign", "--keyfile", "tests/data/alice.key", "-"], tx_json
+            )
+            self.assertEqual(expected.stdout, signed.stdout)
+
+            result = runner.invoke(
+                aut, ["tx", "sign", "--from", "0x" + "01" * 20, "-"], input="{}"
+            )
+            self.assertEqual(1, result.exit_code)
+            self.assertIn("No keyfile for", result.stderr)
@@ -0,0 +1,104 @@
+"""
+Test that commands only import the modules they need
+"""
+
+import json
+import os
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Tuple
+from unittest import TestCase
+
+from tests.mock_node import MockNode
+
+# Run `aut` with the given arguments in a fresh interpreter, and print the
+# names of all modules imported in the process.
+RUN_AUT_AND_LIST_MODULES = """
+import json, sys
+from autonity_cli.__main__ import aut
+try:
+    aut(sys.argv[1:], prog_name="aut")
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def run_aut(
+    args: List[str], env: Optional[Dict[str, str]] = None
+) -> Tuple[str, List[str]]:
+    """
+    Run `aut <args>` in a new process, and return the command output and the
+    list of imported modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", RUN_AUT_AND_LIST_MODULES, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+    )
+    output, _, modules = result.stdout.rstrip("\n").rpartition("\n")
+    return output, json.loads(modules)
+
+
+class TestLazyImports(TestCase):
+    """
+    Test lazy loading of command groups
+    """
+
+    def assertNotImported(self, modules: List[str], prefix: str) -> None:
+        imported = [m for m in modules if m == prefix or m.startswith(prefix + ".")]
+        self.assertEqual([], imported, f"{prefix} should not be imported")
+
+    def test_help(self) -> None:
+        """
+        `aut --help` does not import any command modules or their dependencies.
+        """
+        _, modules = run_aut(["--help"])
+        self.assertNotImported(modules, "autonity_cli.commands.governance")
+        self.assertNotImported(modules, "autonity_cli.commands.block")
+        self.assertNotImported(modules, "trezorlib")
+        self.assertNotImported(modules, "web3")
+
+    def test_block_height(self) -> None:
+        """
+        `aut block height` only imports the block commands.
+        """
+        with MockNode() as node:
+            output, modules = run_aut(["block", "height", "-r", node.endpoint])
+            self.assertEqual(1, node.rpc_calls["eth_blockNumber"])
+
+        self.assertEqual("1000", output)
+
+        self.assertIn("autonity_cli.commands.block", modules)
+        self.assertNotImported(modules, "autonity_cli.commands.governance")
+        self.assertNotImported(modules, "autonity_cli.commands.validator")
+        self.assertNotImported(modules, "trezorlib")
+
+    def test_keyfile_signing(self) -> None:
+        """
+        Signing with a keyfile does not import trezorlib.
+        """
+        tx = {
+            "from": "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf",
+            "to": "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF",
+            "value": 1,
+            "gas": 21000,
+            "gasPrice": 1000000000,
+            "nonce": 0,
+            "chainId": 65000000,
+        }
+        with TemporaryDirectory() as tmp_dir:
+            tx_file = os.path.join(tmp_dir, "tx.json")
+            with open(tx_file, "w", encoding="utf8") as tx_f:
+                json.dump(tx, tx_f)
+
+            output, modules = run_aut(
+                ["tx", "sign", "--keyfile", "tests/data/alice.key", tx_file],
+                env={"KEYFILEPWD": "alice"},
+            )
+
+        self.assertIn("raw_transaction", json.loads(output))
+        self.assertNotImported(modules, "trezorlib")
@@ -0,0 +1,186 @@
+"""
+Test the local log index
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.state import STATE_DIRECTORY_ENV_VAR
+from tests.mock_node import MockNode
+from tests.temp_dirs import use_temp_directories
+from tests.test_logs import ACCOUNTS, TOKEN, get_logs_handler
+
+
+class TestLogIndex(TestCase):
+    """
+    Test `aut index`
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR, STATE_DIRECTORY_ENV_VAR)
+
+        # Blocks from `fork_block` onwards have different hashes, and
+        # transfer 1000 more tokens.
+        self.fork_block: Optional[int] = None
+        # The chain forks at block `fork_during_scan[1]` while the logs from
+        # block `fork_during_scan[0]` are being fetched.
+        self.fork_during_scan: Optional[Tuple[int, int]] = None
+        self.scanned: List[int] = []
+        self.node = MockNode(
+            {
+                "eth_getLogs": self._get_logs,
+                "eth_getHeaderByNumber": self._get_header,
+            }
+        ).start()
+        self.addCleanup(self.node.stop)
+
+    def _forked(self, block_number: int) -> bool:
+        return self.fork_block is not None and block_number >= self.fork_block
+
+    def _block_hash(self, block_number: int) -> str:
+        return (
+            "0x" + f"{block_number + (10**6 if self._forked(block_number) else 0):064x}"
+        )
+
+    def _get_header(self, params: List[Any]) -> Dict[str, Any]:
+        block_number = int(params[0], 16)
+        return {"number": params[0], "hash": self._block_hash(block_number)}
+
+    def _get_logs(self, params: List[Any]) -> List[Dict[str, Any]]:
+        from_block = int(params[0]["fromBlock"], 16)
+        self.scanned.extend(range(from_block, int(params[0]["toBlock"], 16) + 1))
+        if self.fork_during_scan and from_block == self.fork_during_scan[0]:
+            self.fork_block = self.fork_during_scan[1]
+            self.fork_during_scan = None
+        logs = get_logs_handler(params)
+        for log in logs:
+            block_number = int(log["blockNumber"], 16)
+            log["blockHash"] = self._block_hash(block_number)
+            if self._forked(block_number):
+                log["data"] = "0x" + f"{block_number + 1000:064x}"
+        return logs
+
+    def _aut(self, *args: str) -> List[Any]:
+        result = CliRunner(mix_stderr=False).invoke(
+            aut, [*args, "-r", self.node.endpoint]
+        )
+        self.assertEqual(0, result.exit_code, result.stderr)
+        return [json.loads(line) for line in result.stdout.splitlines()]
+
+    def test_sync_and_query(self) -> None:
+        """
+        Logs are indexed incrementally, and queries are answered from the
+        index, as by `token transfers`.
+        """
+
+        sync = ["index", "sync", "--token", TOKEN, "--chunk-size", "20"]
+        self.assertEqual([100], self._aut(*sync, "--to-block", "99"))
+        self.assertEqual(list(range(100)), sorted(self.scanned))
+
+        self.scanned.clear()
+        self.assertEqual([50], self._aut(*sync, "--to-block", "149"))
+        self.assertEqual(list(range(100, 150)), sorted(self.scanned))
+
+        self.scanned.clear()
+        self.node.reset_counters()
+        transfers = ["--token", TOKEN, "--recipient", ACCOUNTS[0]]
+        indexed = self._aut("index", "transfers", *transfers, "--from-block", "10")
+        self.assertEqual(0, self.node.rpc_calls["eth_getLogs"])
+        self.assertEqual(list(range(11, 150, 3)), [t["blockNumber"] for t in indexed])
+        scanned = self._aut(
+            "token", "transfers", *transfers, "--from-block", "10", "--to-block", "149"
+        )
+        self.assertEqual(scanned, indexed)
+
+        # The index is not part of the cache.
+        self.assertEqual(0, CliRunner().invoke(aut, ["cache", "clear"]).exit_code)
+        self.scanned.clear()
+        self.assertEqual([0], self._aut(*sync, "--to-block", "149"))
+        self.assertEqual([], self.scanned)
+
+        result = CliRunner(mix_stderr=False).invoke(
+            aut, ["index", "transfers", "--ntn", "-r", self.node.endpoint]
+        )
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("is not indexed", result.stderr)
+
+    def test_reorg(self) -> None:
+        """
+        Logs of blocks replaced by a reorganisation are removed and indexed
+        again.
+        """
+
+        sync = ["index", "sync", "--token", TOKEN, "--chunk-size", "10"]
+        self._aut(*sync, "--to-block", "99")
+
+        self.fork_block = 95
+        self.scanned.clear()
+        self.assertEqual([31], self._aut(*sync, "--to-block", "120"))
+        # Rolled back to block 89, the last synced block which was not replaced
+        self.assertEqual(list(range(90, 121)), sorted(self.scanned))
+
+        indexed = self._aut("index", "transfers", "--token", TOKEN)
+        self.assertEqual(list(range(121)), [t["blockNumber"] for t in indexed])
+        self.assertEqual(94, indexed[94]["args"]["value"])
+        self.assertEqual(1095, indexed[95]["args"]["value"])
+        self.assertEqual(self._block_hash(95), indexed[95]["blockHash"])
+
+        self.assertEqual([121], self._aut(*sync, "--to-block", "120", "--rebuild"))
+
+    def test_reorg_during_sync(self) -> None:
+        """
+        If the chain is reorganised while the logs of a chunk are fetched, the
+        chunk is fetched again, rather than its logs being recorded under the
+        hash of the new fork.
+        """
+
+        self.fork_during_scan = (40, 45)
+        sync = ["index", "sync", "--token", TOKEN, "--chunk-size", "10", "-m", "1"]
+        self.assertEqual([100], self._aut(*sync, "--to-block", "99"))
+        self.assertEqual(2, self.scanned.count(40))
+
+        indexed = self._aut("index", "transfers", "--token", TOKEN)
+        self.assertEqual(44, indexed[44]["args"]["value"])
+        self.assertEqual(1049, indexed[49]["args"]["value"])
+        self.assertEqual(self._block_hash(49), indexed[49]["blockHash"])
+
+        # Nothing is rolled back by the next sync.
+        self.scanned.clear()
+        self.assertEqual([10], self._aut(*sync, "--to-block", "109"))
+        self.assertEqual(list(range(100, 110)), self.scanned)
+
+    def test_reorg_of_synced_chunk(self) -> None:
+        """
+        If the chain is reorganised below a chunk which has already been
+        synced, while a later chunk is fetched, the replaced blocks are indexed
+        again before the sync completes, even though the hash of the newest
+        synced block matches.
+        """
+
+        self.fork_during_scan = (50, 45)
+        sync = ["index", "sync", "--token", TOKEN, "--chunk-size", "10", "-m", "1"]
+        self.assertEqual([100], self._aut(*sync, "--to-block", "99"))
+        # Rolled back to block 39, the last synced block which was not replaced
+        self.assertEqual(2, self.scanned.count(40))
+        self.assertEqual(1, self.scanned.count(39))
+
+        indexed = self._aut("index", "transfers", "--token", TOKEN)
+        self.assertEqual(list(range(100)), [t["blockNumber"] for t in indexed])
+        self.assertEqual(44, indexed[44]["args"]["value"])
+        self.assertEqual(1045, indexed[45]["args"]["value"])
+        self.assertEqual(self._block_hash(45), indexed[45]["blockHash"])
+
+    def test_confirmations(self) -> None:
+        """
+        With --confirmations, syncing to the latest block stops that many
+        blocks before it.
+        """
+
+        sync = ["index", "sync", "--token", TOKEN, "--chunk-size", "20"]
+        self.assertEqual([100], self._aut(*sync, "--confirmations", "901"))
+        self.assertEqual(list(range(100)), sorted(self.scanned))
@@ -0,0 +1,228 @@
+"""
+Test event log scanning
+"""
+
+import json
+import os
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from web3 import LegacyWebSocketProvider, Web3
+
+from autonity_cli import erc20
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_TTL_ENV_VAR
+from autonity_cli.logs import (
+    address_topic,
+    event_topic,
+    find_abi_event,
+    get_logs,
+    scan_logs,
+)
+from tests.mock_node import MockNode, MockWebSocketNode
+
+TOKEN = Web3.to_checksum_address("0x" + "70" * 20)
+ACCOUNTS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, 4)]
+TRANSFER_TOPIC = event_topic(find_abi_event(erc20.ABI, "Transfer"))
+MAX_RESULTS = 25
+
+
+def transfer_log(block_number: int) -> Dict[str, Any]:
+    """
+    Block n holds a transfer of n tokens from ACCOUNTS[n % 3] to
+    ACCOUNTS[(n + 1) % 3].
+    """
+    sender = ACCOUNTS[block_number % 3]
+    recipient = ACCOUNTS[(block_number + 1) % 3]
+    return {
+        "address": TOKEN,
+        "topics": [TRANSFER_TOPIC, address_topic(sender), address_topic(recipient)],
+        "data": "0x" + f"{block_number:064x}",
+        "blockNumber": hex(block_number),
+        "blockHash": "0x" + f"{block_number:064x}",
+        "transactionHash": "0x" + f"{block_number:064x}",
+        "transactionIndex": "0x0",
+        "logIndex": "0x0",
+        "removed": False,
+    }
+
+
+def get_logs_handler(params: List[Any]) -> List[Dict[str, Any]]:
+    """
+    eth_getLogs for a chain with one transfer per block, which returns at most
+    MAX_RESULTS logs per request.
+    """
+    filter_params = params[0]
+    start = int(filter_params["fromBlock"], 16)
+    end = int(filter_params["toBlock"], 16)
+    topics: List[Optional[str]] = filter_params.get("topics") or []
+    logs = [
+        log
+        for log in map(transfer_log, range(start, end + 1))
+        if all(
+            topic in (None, log_topic)
+            for topic, log_topic in zip(topics, log["topics"])
+        )
+    ]
+    if len(logs) > MAX_RESULTS:
+        raise ValueError(f"query returned more than {MAX_RESULTS} results")
+    return logs
+
+
+class TestLogs(TestCase):
+    """
+    Test event log scanning
+    """
+
+    def setUp(self) -> None:
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.node = MockNode({"eth_getLogs": get_logs_handler}).start()
+        self.addCleanup(self.node.stop)
+        self.w3 = Web3(Web3.HTTPProvider(self.node.endpoint))
+
+    def _aut(self, args: List[str]) -> List[Dict[str, Any]]:
+        result = CliRunner(mix_stderr=False).invoke(
+            aut, [*args, "-r", self.node.endpoint]
+        )
+        self.assertEqual(0, result.exit_code, result.stderr)
+        return [json.loads(line) for line in result.stdout.splitlines()]
+
+    def test_split(self) -> None:
+        """
+        Ranges with too many results are split until each part can be served,
+        and chunks are generated in order.
+        """
+
+        log_ranges = list(scan_logs(self.w3, TOKEN, [], 0, 299, chunk_size=100))
+        self.assertEqual(
+            [(0, 99), (100, 199), (200, 299)],
+            [(r.start, r.end) for r in log_ranges],
+        )
+        block_numbers = [log["blockNumber"] for r in log_ranges for log in r.logs]
+        self.assertEqual(list(range(300)), block_numbers)
+        # Each chunk of 100 is split into 4 ranges of 25 (after 3 failures)
+        self.assertEqual(21, self.node.rpc_calls["eth_getLogs"])
+
+        # Ranges which can be served are not split
+        self.node.reset_counters()
+        transfers_to = [TRANSFER_TOPIC, None, address_topic(ACCOUNTS[0])]
+        log_range = get_logs(self.w3, TOKEN, transfers_to, 0, 74)
+        self.assertEqual(
+            list(range(2, 75, 3)), [log["blockNumber"] for log in log_range.logs]
+        )
+        self.assertEqual(1, self.node.rpc_calls["eth_getLogs"])
+
+        # Single blocks are not split
+        with patch.object(self.node, "handlers", {"eth_getLogs": _too_many}):
+            with self.assertRaisesRegex(Exception, "query returned more than"):
+                get_logs(self.w3, TOKEN, [], 5, 5)
+
+    def test_rate_limited(self) -> None:
+        """
+        Rate-limit errors are raised, rather than the range being split.
+        """
+
+        for message in ["rate limit exceeded", "daily request limit exceeded"]:
+
+            def rate_limited(_params: List[Any], message: str = message) -> None:
+                raise ValueError(message)
+
+            self.node.reset_counters()
+            with patch.object(self.node, "handlers", {"eth_getLogs": rate_limited}):
+                with self.assertRaisesRegex(Exception, message):
+                    get_logs(self.w3, TOKEN, [], 0, 99)
+            self.assertEqual(1, self.node.rpc_calls["eth_getLogs"])
+
+    def test_websocket(self) -> None:
+        """
+        Over a WebSocket endpoint, whose connection cannot be shared between
+        threads, chunks are requested one at a time.
+        """
+
+        with MockWebSocketNode({"eth_getLogs": get_logs_handler}) as node:
+            w3 = Web3(LegacyWebSocketProvider(node.endpoint))
+            log_ranges = list(scan_logs(w3, TOKEN, [], 0, 299, chunk_size=10))
+        block_numbers = [log["blockNumber"] for r in log_ranges for log in r.logs]
+        self.assertEqual(list(range(300)), block_numbers)
+
+    def test_token_transfers(self) -> None:
+        """
+        `token transfers` decodes Transfer events, filtered by sender or
+        recipient.
+        """
+
+        transfers = self._aut(
+            ["token", "transfers", "--token", TOKEN, "--to-block", "99"]
+        )
+        self.assertEqual(100, len(transfers))
+        self.assertEqual(
+            {
+                "event": "Transfer",
+                "args": {"from": ACCOUNTS[1], "to": ACCOUNTS[2], "value": 7},
+                "address": TOKEN,
+                "blockNumber": 7,
+                "blockHash": "0x" + f"{7:064x}",
+                "transactionHash": "0x" + f"{7:064x}",
+                "transactionIndex": 0,
+                "logIndex": 0,
+            },
+            transfers[7],
+        )
+
+        transfers = self._aut(
+            [
+                "token",
+                "transfers",
+                "--token",
+                TOKEN,
+                "--sender",
+                ACCOUNTS[1],
+                "--from-block",
+                "10",
+                "--to-block",
+                "39",
+            ]
+        )
+        self.assertEqual(list(range(10, 40, 3)), [t["blockNumber"] for t in transfers])
+        self.assertEqual({ACCOUNTS[1]}, {t["args"]["from"] for t in transfers})
+
+    def test_contract_logs(self) -> None:
+        """
+        `contract logs` decodes logs using the given ABI, and prints logs which
+        are not in the ABI undecoded.
+        """
+
+        with TemporaryDirectory() as tmp_dir:
+            abi_path = os.path.join(tmp_dir, "token.abi")
+            with open(abi_path, "w", encoding="utf8") as abi_f:
+                json.dump(erc20.ABI, abi_f)
+            no_events_path = os.path.join(tmp_dir, "no_events.abi")
+            with open(no_events_path, "w", encoding="utf8") as abi_f:
+                json.dump([e for e in erc20.ABI if e["type"] != "event"], abi_f)
+
+            args = ["contract", "logs", "--address", TOKEN, "--to-block", "49"]
+            decoded = self._aut([*args, "--abi", abi_path, "--event", "Transfer"])
+            undecoded = self._aut([*args, "--abi", no_events_path])
+
+            result = CliRunner(mix_stderr=False).invoke(
+                aut, [*args, "--abi", abi_path, "--event", "Mint"]
+            )
+            self.assertEqual(1, result.exit_code)
+            self.assertIn("event 'Mint' not found", result.stderr)
+
+        self.assertEqual(50, len(decoded))
+        self.assertEqual(
+            {"from": ACCOUNTS[0], "to": ACCOUNTS[1], "value": 3}, decoded[3]["args"]
+        )
+        self.assertEqual(50, len(undecoded))
+        self.assertIsNone(undecoded[3]["event"])
+        self.assertEqual(transfer_log(3)["topics"], undecoded[3]["topics"])
+
+
+def _too_many(_params: List[Any]) -> List[Dict[str, Any]]:
+    raise ValueError("query returned more than 10000 results")
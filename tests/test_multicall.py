@@ -0,0 +1,169 @@
+"""
+Test multicall aggregation
+"""
+
+import os
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from eth_abi.abi import decode, encode
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput
+
+from autonity_cli import erc20
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR, CACHE_TTL_ENV_VAR
+from autonity_cli.multicall import MULTICALL3_ADDRESS, call_with_decimals, multicall
+from tests.mock_node import Handler, MockNode
+from tests.test_cache import genesis_handlers
+
+TOKEN = Web3.to_checksum_address("0x" + "ab" * 20)
+EOA = Web3.to_checksum_address("0x" + "cd" * 20)
+HOLDERS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, 6)]
+
+# selector of aggregate3((address,bool,bytes)[])
+AGGREGATE3_SELECTOR = "82ad56cb"
+
+
+def token_call(data: str) -> bytes:
+    """
+    Result of a call to the token: 18 decimals, and i tokens held by
+    address i.
+    """
+    selector, args = data[2:10], bytes.fromhex(data[10:])
+    if selector == "313ce567":  # decimals()
+        return encode(["uint8"], [18])
+    if selector == "70a08231":  # balanceOf(address)
+        (holder,) = decode(["address"], args)
+        return encode(["uint256"], [int(holder, 16) * 10**18])
+    raise ValueError(f"unexpected call {data}")
+
+
+def multicall_handlers(deployed: bool) -> Dict[str, Handler]:
+    """
+    Handlers for a node with the token, and optionally Multicall3.
+    """
+
+    def eth_call(params: List[Any]) -> str:
+        to = Web3.to_checksum_address(params[0]["to"])
+        data = params[0].get("data") or params[0]["input"]
+        if to == TOKEN:
+            return "0x" + token_call(data).hex()
+        if to == EOA:
+            return "0x"
+
+        assert deployed and to == MULTICALL3_ADDRESS
+        assert data[2:10] == AGGREGATE3_SELECTOR
+        calls: List[Tuple[str, bool, bytes]]
+        (calls,) = decode(["(address,bool,bytes)[]"], bytes.fromhex(data[10:]))
+        results = [
+            (
+                True,
+                token_call("0x" + call_data.hex()) if target == TOKEN.lower() else b"",
+            )
+            for target, _, call_data in calls
+        ]
+        return "0x" + encode(["(bool,bytes)[]"], [results]).hex()
+
+    return {
+        "eth_call": eth_call,
+        "eth_getCode": lambda _: "0x6000" if deployed else "0x",
+    }
+
+
+class TestMulticall(TestCase):
+    """
+    Test multicall aggregation
+    """
+
+    def setUp(self) -> None:
+        # Disable the on-disk cache, so that all lookups reach the node.
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def _calls(self, w3: Web3) -> List[Any]:
+        token = w3.eth.contract(TOKEN, abi=erc20.ABI)
+        calls = [token.functions.decimals()]
+        calls += [token.functions.balanceOf(holder) for holder in HOLDERS]
+        return multicall(w3, calls, batch_size=10)
+
+    def test_multicall(self) -> None:
+        """
+        Calls are aggregated into a single eth_call, where Multicall3 is
+        deployed.
+        """
+
+        with MockNode(multicall_handlers(deployed=True)) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            results = self._calls(w3)
+            self.assertEqual(1, node.rpc_calls["eth_call"])
+
+            # Deployment is only checked once
+            node.reset_counters()
+            self.assertEqual(results, self._calls(w3))
+            self.assertEqual(1, node.http_requests)
+
+        self.assertEqual([18] + [i * 10**18 for i in range(1, 6)], results)
+
+    def test_fallback(self) -> None:
+        """
+        Calls are made individually, in a single batch, where Multicall3 is not
+        deployed.
+        """
+
+        with MockNode(multicall_handlers(deployed=False)) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            results = self._calls(w3)
+            self.assertEqual(6, node.rpc_calls["eth_call"])
+            self.assertEqual(2, node.http_requests)  # eth_getCode, then the batch
+
+        self.assertEqual([18] + [i * 10**18 for i in range(1, 6)], results)
+
+    def test_no_data(self) -> None:
+        """
+        A call to an address without code makes the multicall fall back to
+        individual calls, which report the error.
+        """
+
+        with MockNode(multicall_handlers(deployed=True)) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            calls = [
+                w3.eth.contract(address, abi=erc20.ABI).functions.decimals()
+                for address in (TOKEN, EOA)
+            ]
+            with self.assertRaises(BadFunctionCallOutput):
+                multicall(w3, calls)
+            self.assertEqual(3, node.rpc_calls["eth_call"])
+
+    def test_call_with_decimals(self) -> None:
+        """
+        Token decimals are requested in the same multicall as a view call,
+        until they are cached.
+        """
+
+        with (
+            TemporaryDirectory() as cache_dir,
+            patch.dict(
+                os.environ,
+                {CACHE_DIRECTORY_ENV_VAR: cache_dir, CACHE_TTL_ENV_VAR: "60"},
+            ),
+        ):
+            handlers = {**multicall_handlers(deployed=True), **genesis_handlers()}
+            with MockNode(handlers) as node:
+                w3 = Web3(Web3.HTTPProvider(node.endpoint))
+                balance_of = w3.eth.contract(TOKEN, abi=erc20.ABI).functions.balanceOf
+                self.assertEqual(
+                    (2 * 10**18, 18),
+                    call_with_decimals(w3, TOKEN, balance_of(HOLDERS[1])),
+                )
+                self.assertEqual(1, node.rpc_calls["eth_call"])
+
+                node.reset_counters()
+                self.assertEqual(
+                    (3 * 10**18, 18),
+                    call_with_decimals(w3, TOKEN, balance_of(HOLDERS[2])),
+                )
+                self.assertEqual(1, node.rpc_calls["eth_call"])
+                self.assertEqual(0, node.rpc_calls["eth_getCode"])
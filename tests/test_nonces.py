@@ -0,0 +1,99 @@
+"""
+Test the local nonce manager
+"""
+
+import json
+import multiprocessing
+import os
+from typing import Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from web3 import Web3
+
+from autonity_cli import nonces
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.state import STATE_DIRECTORY_ENV_VAR
+from tests.mock_node import Handler, MockNode
+from tests.temp_dirs import use_temp_directories
+
+FROM = Web3.to_checksum_address("0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF")
+TO = "0x" + "01" * 20
+NUM_PROCESSES = 4
+NONCES_PER_PROCESS = 25
+
+
+def nonce_handlers(pending: List[str]) -> Dict[str, Handler]:
+    """
+    Handlers for a node where the account has pending nonce `pending[0]`.
+    """
+    return {
+        "eth_getTransactionCount": lambda _: pending[0],
+        "eth_getBlockByNumber": lambda _: {"number": "0x0", "hash": "0x" + "11" * 32},
+    }
+
+
+def reserve_nonces(endpoint: str) -> List[int]:
+    w3 = Web3(Web3.HTTPProvider(endpoint))
+    return [nonces.reserve_nonce(w3, FROM) for _ in range(NONCES_PER_PROCESS)]
+
+
+class TestNonces(TestCase):
+    """
+    Test the local nonce manager
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR, STATE_DIRECTORY_ENV_VAR)
+
+    def test_concurrent_reservations(self) -> None:
+        """
+        Processes reserving nonces for the same account concurrently receive
+        distinct, consecutive nonces, starting from the pending nonce.
+        """
+
+        with MockNode(nonce_handlers(["0x5"])) as node:
+            with multiprocessing.get_context("fork").Pool(NUM_PROCESSES) as pool:
+                reserved = pool.map(reserve_nonces, [node.endpoint] * NUM_PROCESSES)
+            self.assertEqual(1, node.rpc_calls["eth_getTransactionCount"])
+
+        all_reserved = sorted(n for process in reserved for n in process)
+        num_reserved = NUM_PROCESSES * NONCES_PER_PROCESS
+        self.assertEqual(list(range(5, 5 + num_reserved)), all_reserved)
+
+    def test_reserve_and_sync(self) -> None:
+        """
+        `tx make --reserve-nonce` takes consecutive nonces from the manager,
+        and `nonce sync` resets it to the pending nonce.
+        """
+
+        pending = ["0x7"]
+        with MockNode(nonce_handlers(pending)) as node:
+            rpc = ["--rpc-endpoint", node.endpoint]
+            make = ["tx", "make", *rpc, "--from", FROM, "--to", TO, "-v", "1"]
+            make += ["--gas", "21000", "-F", "2gwei", "-P", "1gwei"]
+
+            def aut_output(args: List[str]) -> str:
+                result = CliRunner().invoke(aut, args)
+                self.assertEqual(0, result.exit_code, result.output)
+                return result.output.strip()
+
+            reserved = [
+                json.loads(aut_output([*make, "--reserve-nonce"]))["nonce"]
+                for _ in range(2)
+            ]
+            self.assertEqual([7, 8], reserved)
+            self.assertEqual(7, json.loads(aut_output(make))["nonce"])
+            self.assertEqual("9", aut_output(["nonce", "show", *rpc, FROM]))
+
+            # Reservations survive clearing the cache.
+            aut_output(["cache", "clear"])
+            self.assertEqual("9", aut_output(["nonce", "show", *rpc, FROM]))
+
+            pending[0] = "0x8"
+            self.assertEqual("8", aut_output(["nonce", "sync", *rpc, FROM]))
+            with patch.dict(os.environ, {"AUT_RESERVE_NONCE": "1"}):
+                self.assertEqual(8, json.loads(aut_output(make))["nonce"])
+            self.assertEqual("9", aut_output(["nonce", "show", *rpc, FROM]))
@@ -0,0 +1,81 @@
+"""
+Test the --output option
+"""
+
+import json
+import os
+import shutil
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from web3 import Web3
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR, CACHE_TTL_ENV_VAR
+from autonity_cli.config import KEYFILE_DIRECTORY_ENV_VAR
+from autonity_cli.options import OUTPUT_ENV_VAR
+from autonity_cli.user import get_account_stats, iter_account_stats
+from tests.mock_node import MockNode
+from tests.test_user import ACCOUNTS, account_handlers
+
+ALICE = "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf"  # tests/data/alice.key
+
+
+class TestOutput(TestCase):
+    """
+    Test the --output option
+    """
+
+    def setUp(self) -> None:
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def _aut(self, args: List[str]) -> str:
+        result = CliRunner(mix_stderr=False).invoke(aut, args)
+        self.assertEqual(0, result.exit_code, result.stderr)
+        return result.stdout
+
+    def test_account_info(self) -> None:
+        """
+        With --output ndjson (or AUT_OUTPUT=ndjson), `account info` prints the
+        stats of each account on its own line, requested a chunk of accounts at
+        a time.
+        """
+
+        with MockNode(account_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            stats = get_account_stats(w3, ACCOUNTS)
+            self.assertEqual(
+                stats, list(iter_account_stats(w3, ACCOUNTS, chunk_size=3))
+            )
+
+            info = ["account", "info", "-r", node.endpoint, *ACCOUNTS]
+            self.assertEqual(stats, json.loads(self._aut(info)))
+
+            ndjson = self._aut(["--output", "ndjson", *info])
+            self.assertEqual(stats, [json.loads(line) for line in ndjson.splitlines()])
+            with patch.dict(os.environ, {OUTPUT_ENV_VAR: "ndjson"}):
+                self.assertEqual(ndjson, self._aut(info))
+
+    def test_account_list(self) -> None:
+        """
+        With --output ndjson, `account list` prints an object per account.
+        """
+
+        with TemporaryDirectory() as cache_dir, TemporaryDirectory() as keystore:
+            shutil.copy("tests/data/alice.key", keystore)
+            env = {
+                CACHE_DIRECTORY_ENV_VAR: cache_dir,
+                KEYFILE_DIRECTORY_ENV_VAR: keystore,
+            }
+            with patch.dict(os.environ, env):
+                ndjson = self._aut(["--output", "ndjson", "account", "list"])
+                text = self._aut(["account", "list"])
+
+        path = os.path.join(keystore, "alice.key")
+        self.assertEqual([{"address": ALICE, "path": path}], [json.loads(ndjson)])
+        self.assertEqual(f"{ALICE} {path}\n", text)
@@ -0,0 +1,67 @@
+"""
+Test the interactive shell
+"""
+
+import json
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from eth_account import Account
+
+from autonity_cli import session
+from autonity_cli.__main__ import aut
+from tests.mock_node import MockNode
+
+
+class TestShell(TestCase):
+    """
+    Test `aut shell`
+    """
+
+    def tearDown(self) -> None:
+        session.decrypted_accounts = None
+
+    def test_commands(self) -> None:
+        """
+        Each line is run as a command, until `exit`.
+        """
+        with MockNode() as node:
+            lines = [f"block height -r {node.endpoint}"] * 2 + ["exit", "block height"]
+            result = CliRunner().invoke(aut, ["shell"], input="\n".join(lines))
+
+            self.assertEqual(0, result.exit_code)
+            self.assertEqual(2, result.output.count("1000\n"))
+            self.assertEqual(2, node.rpc_calls["eth_blockNumber"])
+
+    def test_keyfile_decrypted_once(self) -> None:
+        """
+        Keyfiles are only decrypted the first time they are used.
+        """
+        tx = {
+            "to": "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF",
+            "value": 1,
+            "gas": 21000,
+            "gasPrice": 1000000000,
+            "nonce": 0,
+            "chainId": 65000000,
+        }
+        with TemporaryDirectory() as tmp_dir:
+            tx_file = os.path.join(tmp_dir, "tx.json")
+            with open(tx_file, "w", encoding="utf8") as tx_f:
+                json.dump(tx, tx_f)
+
+            sign = f"tx sign --keyfile tests/data/alice.key {tx_file}"
+            with patch.object(Account, "decrypt", wraps=Account.decrypt) as decrypt:
+                result = CliRunner().invoke(
+                    aut,
+                    ["shell"],
+                    input=f"{sign}\n{sign}\n",
+                    env={"KEYFILEPWD": "alice"},
+                )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertEqual(1, decrypt.call_count)
+        self.assertEqual(2, result.output.count("raw_transaction"))
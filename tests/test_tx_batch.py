@@ -0,0 +1,434 @@
+"""
+Test the batch transaction commands
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+from click.testing import CliRunner
+from eth_account import Account
+from hexbytes import HexBytes
+from web3 import Web3
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from autonity_cli.commands.tx import SEND_ATTEMPTS
+from autonity_cli.tx import send_tx
+from tests.mock_node import Handler, MockNode, MockWebSocketNode
+from tests.temp_dirs import use_temp_directories
+
+FROM = "0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF"
+RECIPIENTS = [f"0x{i:040x}" for i in range(1, 4)]
+TOKEN = "0x" + "ab" * 20
+ALICE = "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf"  # tests/data/alice.key
+
+
+def tx_handlers() -> Dict[str, Handler]:
+    """
+    Handlers for a node with enough state to create transactions.  The token
+    has 18 decimals.
+    """
+
+    def get_block_by_number(params: List[Any]) -> Dict[str, Any]:
+        number = "0x0" if params[0] == "0x0" else hex(1000)
+        return {"number": number, "hash": "0x" + "11" * 32, "baseFeePerGas": "0x3e8"}
+
+    return {
+        "eth_getTransactionCount": lambda _: "0x7",
+        "eth_estimateGas": lambda _: hex(21000),
+        "eth_maxPriorityFeePerGas": lambda _: "0x1",
+        "eth_getBlockByNumber": get_block_by_number,
+        "eth_call": lambda _: "0x" + f"{18:064x}",
+    }
+
+
+def send_handlers(
+    errors: Dict[str, str], mined: List[str], max_active: List[int]
+) -> Dict[str, Handler]:
+    """
+    Handlers for a node which rejects the raw transactions in `errors`, and
+    has included the transactions with hashes in `mined`.  The maximum number
+    of concurrent sends is recorded in `max_active[0]`.
+    """
+
+    lock = threading.Lock()
+    active = [0]
+
+    def send_raw_transaction(params: List[Any]) -> str:
+        with lock:
+            active[0] += 1
+            max_active[0] = max(max_active[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        if params[0] in errors:
+            raise ValueError(errors[params[0]])
+        return Web3.to_hex(Web3.keccak(hexstr=params[0]))
+
+    def get_transaction_by_hash(params: List[Any]) -> Optional[Dict[str, Any]]:
+        return {"hash": params[0]} if params[0] in mined else None
+
+    return {
+        "eth_sendRawTransaction": send_raw_transaction,
+        "eth_getTransactionByHash": get_transaction_by_hash,
+    }
+
+
+def wait_handlers(
+    blocks: Dict[str, int], statuses: Dict[str, int], block_receipts: bool
+) -> Dict[str, Handler]:
+    """
+    Handlers for a node whose head advances by one block each time it is
+    requested (starting at 1000), and which includes each transaction in
+    `blocks` at the given block number.
+    """
+
+    head = [999]
+
+    def block_number(_: List[Any]) -> str:
+        head[0] += 1
+        return hex(head[0])
+
+    def receipt(tx_hash: str) -> Dict[str, Any]:
+        return {
+            "transactionHash": tx_hash,
+            "blockNumber": hex(blocks[tx_hash]),
+            "status": hex(statuses.get(tx_hash, 1)),
+        }
+
+    def get_transaction_receipt(params: List[Any]) -> Optional[Dict[str, Any]]:
+        tx_hash = params[0]
+        if blocks.get(tx_hash, head[0] + 1) > head[0]:
+            return None
+        return receipt(tx_hash)
+
+    def get_block_receipts(params: List[Any]) -> List[Dict[str, Any]]:
+        number = int(params[0], 16)
+        return [receipt(h) for h, block in blocks.items() if block == number]
+
+    handlers: Dict[str, Handler] = {
+        "eth_blockNumber": block_number,
+        "eth_getTransactionReceipt": get_transaction_receipt,
+    }
+    if block_receipts:
+        handlers["eth_getBlockReceipts"] = get_block_receipts
+    return handlers
+
+
+class TestTxBatch(TestCase):
+    """
+    Test the batch transaction commands
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR)
+
+    def _aut(self, args: List[str], stdin: str = "") -> List[Dict[str, Any]]:
+        result = CliRunner().invoke(aut, args, input=stdin)
+        self.assertEqual(0, result.exit_code, result.output)
+        return [json.loads(line) for line in result.output.splitlines()]
+
+    def test_make_batch(self) -> None:
+        """
+        Transactions from CSV and NDJSON rows match those from `tx make`, with
+        consecutive nonces, and the nonce and fees are only fetched once.
+        """
+
+        csv_rows = ["to,value,token", f"{RECIPIENTS[0]},1,", f"{RECIPIENTS[1]},2,ntn"]
+        csv_rows.append(f"{RECIPIENTS[2]},0.5,{TOKEN}")
+        ndjson_rows = [
+            json.dumps({"to": RECIPIENTS[0], "value": "1"}),
+            json.dumps({"to": RECIPIENTS[1], "value": 2, "token": "ntn"}),
+            json.dumps({"to": RECIPIENTS[2], "value": "0.5", "token": TOKEN}),
+        ]
+
+        with MockNode(tx_handlers()) as node:
+            rpc = ["--rpc-endpoint", node.endpoint]
+            make_batch = ["tx", "make-batch", *rpc, "--from", FROM, "-"]
+            from_csv = self._aut(make_batch, "\n".join(csv_rows))
+            self.assertEqual(1, node.rpc_calls["eth_getTransactionCount"])
+            self.assertEqual(1, node.rpc_calls["eth_maxPriorityFeePerGas"])
+            from_ndjson = self._aut(make_batch, "\n".join(ndjson_rows))
+
+            expected: List[Dict[str, Any]] = []
+            make = ["tx", "make", *rpc, "--from", FROM]
+            for nonce, args in enumerate(
+                [
+                    ["--to", RECIPIENTS[0], "--value", "1"],
+                    ["--to", RECIPIENTS[1], "--value", "2", "--ntn"],
+                    ["--to", RECIPIENTS[2], "--value", "0.5", "--token", TOKEN],
+                ],
+                start=7,
+            ):
+                expected += self._aut([*make, "--nonce", str(nonce), *args])
+
+        self.maxDiff = None
+        self.assertEqual(expected, from_csv)
+        self.assertEqual(expected, from_ndjson)
+        self.assertEqual([7, 8, 9], [tx["nonce"] for tx in from_csv])
+
+    def test_make_batch_errors(self) -> None:
+        """
+        Invalid rows are reported with their row number.
+        """
+
+        with MockNode(tx_handlers()) as node:
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["tx", "make-batch", "-r", node.endpoint, "--from", FROM, "-"],
+                input=f"to,value\n{RECIPIENTS[0]},1\n{RECIPIENTS[1]},\n",
+            )
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(1, len(result.stdout.splitlines()))
+        self.assertIn("row 2: Empty transaction", result.stderr)
+
+    def test_sign_batch(self) -> None:
+        """
+        Signed transactions match those from `tx sign`, with or without
+        signing processes, and the keyfile is only decrypted once.
+        """
+
+        txs = [
+            {
+                "from": ALICE,
+                "to": RECIPIENTS[i % 3],
+                "value": i,
+                "gas": 21000,
+                "maxFeePerGas": 2001,
+                "maxPriorityFeePerGas": 1,
+                "nonce": i,
+                "chainId": 65000000,
+            }
+            for i in range(20)
+        ]
+        txs_ndjson = "\n".join(json.dumps(tx) for tx in txs) + "\n"
+        keyfile = ["--keyfile", "tests/data/alice.key"]
+
+        with patch.dict(os.environ, {"KEYFILEPWD": "alice"}):
+            with patch.object(Account, "decrypt", wraps=Account.decrypt) as decrypt:
+                signed = self._aut(["tx", "sign-batch", *keyfile, "-"], txs_ndjson)
+                self.assertEqual(1, decrypt.call_count)
+
+            signed_in_processes = self._aut(
+                ["tx", "sign-batch", *keyfile, "--jobs", "2", "-"], txs_ndjson
+            )
+            expected = self._aut(["tx", "sign", *keyfile, "-"], json.dumps(txs[7]))
+
+        self.assertEqual(20, len(signed))
+        self.assertEqual(signed, signed_in_processes)
+        self.assertEqual(expected[0], signed[7])
+
+    def test_sign_batch_errors(self) -> None:
+        """
+        Transactions from other accounts are reported with their line number.
+        """
+
+        tx = {"to": RECIPIENTS[0], "gas": 21000, "gasPrice": 1, "chainId": 65000000}
+        txs = [{**tx, "from": ALICE, "nonce": 0}, {**tx, "from": RECIPIENTS[0]}]
+        with patch.dict(os.environ, {"KEYFILEPWD": "alice"}):
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["tx", "sign-batch", "--keyfile", "tests/data/alice.key", "-"],
+                input="\n".join(json.dumps(tx) for tx in txs),
+            )
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("line 2: TX from-address", result.stderr)
+
+    def _signed_txs(self, num_txs: int) -> List[Dict[str, Any]]:
+        txs = [
+            {
+                "from": ALICE,
+                "to": RECIPIENTS[0],
+                "value": 1,
+                "gas": 21000,
+                "gasPrice": 1,
+                "nonce": nonce,
+                "chainId": 65000000,
+            }
+            for nonce in range(num_txs)
+        ]
+        with patch.dict(os.environ, {"KEYFILEPWD": "alice"}):
+            return self._aut(
+                ["tx", "sign-batch", "--keyfile", "tests/data/alice.key", "-"],
+                "\n".join(json.dumps(tx) for tx in txs),
+            )
+
+    def test_send_batch(self) -> None:
+        """
+        Transactions are sent concurrently, up to --max-in-flight at a time,
+        and the results are output in input order.
+        """
+
+        signed = self._signed_txs(6)
+        max_active = [0]
+        with MockNode(send_handlers({}, [], max_active)) as node:
+            results = self._aut(
+                ["tx", "send-batch", "-r", node.endpoint, "-m", "2", "-"],
+                "\n".join(json.dumps(tx) for tx in signed),
+            )
+
+        self.assertEqual(2, max_active[0])
+        self.assertEqual(
+            [{"hash": tx["hash"], "status": "sent", "error": None} for tx in signed],
+            results,
+        )
+
+    def test_send_batch_websocket(self) -> None:
+        """
+        Over a WebSocket endpoint, whose connection cannot be shared between
+        threads, transactions are sent one at a time.
+        """
+
+        signed = self._signed_txs(6)
+        with MockWebSocketNode(send_handlers({}, [], [0])) as node:
+            results = self._aut(
+                ["tx", "send-batch", "-r", node.endpoint, "-m", "4", "-"],
+                "\n".join(json.dumps(tx) for tx in signed),
+            )
+
+        self.assertEqual([tx["hash"] for tx in signed], [r["hash"] for r in results])
+        self.assertEqual({"sent"}, {r["status"] for r in results})
+
+    def test_send_batch_retry(self) -> None:
+        """
+        Sends which fail in transport are retried, and reported per
+        transaction if they keep failing.  A retry of a send which reached
+        the node is reported as sent.
+        """
+
+        signed = self._signed_txs(4)
+        errors: Dict[str, str] = {}
+        attempts: Dict[str, int] = {}
+
+        def flaky_send_tx(w3: Web3, signed_tx: Any) -> HexBytes:
+            raw_tx = HexBytes(signed_tx.raw_transaction).to_0x_hex()
+            attempts[raw_tx] = attempts.get(raw_tx, 0) + 1
+            if raw_tx == signed[1]["raw_transaction"] and attempts[raw_tx] == 1:
+                raise requests.ConnectionError("connection reset")
+            if raw_tx == signed[2]["raw_transaction"]:
+                raise requests.Timeout("read timed out")
+            if raw_tx == signed[3]["raw_transaction"] and attempts[raw_tx] == 1:
+                # Reaches the node, but the response is lost.
+                send_tx(w3, signed_tx)
+                errors[raw_tx] = "already known"
+                raise requests.Timeout("read timed out")
+            return send_tx(w3, signed_tx)
+
+        with (
+            MockNode(send_handlers(errors, [], [0])) as node,
+            patch("autonity_cli.commands.tx.send_tx", flaky_send_tx),
+            patch("autonity_cli.commands.tx.SEND_RETRY_DELAY", 0.0),
+        ):
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["tx", "send-batch", "-r", node.endpoint, "-"],
+                input="\n".join(json.dumps(tx) for tx in signed),
+            )
+
+        self.assertEqual(1, result.exit_code)
+        results = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual([tx["hash"] for tx in signed], [r["hash"] for r in results])
+        self.assertEqual(
+            ["sent", "sent", "error", "sent"], [r["status"] for r in results]
+        )
+        self.assertEqual("read timed out", results[2]["error"])
+        self.assertEqual(SEND_ATTEMPTS, attempts[signed[2]["raw_transaction"]])
+
+    def test_send_batch_idempotent(self) -> None:
+        """
+        With --idempotent, transactions which the node already has are reported
+        as known, and other failures as errors.
+        """
+
+        signed = self._signed_txs(4)
+        errors = {
+            signed[1]["raw_transaction"]: "already known",
+            signed[2]["raw_transaction"]: "nonce too low",
+            signed[3]["raw_transaction"]: "nonce too low",
+        }
+        stdin = "\n".join(json.dumps(tx) for tx in signed)
+        with MockNode(send_handlers(errors, [signed[2]["hash"]], [0])) as node:
+            send_batch = ["tx", "send-batch", "-r", node.endpoint, "-"]
+            runner = CliRunner(mix_stderr=False)
+            plain = runner.invoke(aut, send_batch, input=stdin)
+            idempotent = runner.invoke(aut, [*send_batch, "--idempotent"], input=stdin)
+
+        self.assertEqual(1, plain.exit_code)
+        self.assertIn("3 transaction(s) could not be sent", plain.stderr)
+        self.assertEqual(
+            ["sent", "error", "error", "error"],
+            [json.loads(line)["status"] for line in plain.stdout.splitlines()],
+        )
+
+        self.assertEqual(1, idempotent.exit_code)
+        results = [json.loads(line) for line in idempotent.stdout.splitlines()]
+        self.assertEqual(
+            ["sent", "known", "known", "error"], [r["status"] for r in results]
+        )
+        self.assertEqual("nonce too low", results[3]["error"])
+        self.assertEqual([tx["hash"] for tx in signed], [r["hash"] for r in results])
+
+    def test_wait_batch(self) -> None:
+        """
+        Receipts are output as the transactions are included, using the
+        receipts of each new block, and failures are reflected in the exit
+        code.
+        """
+
+        hashes = ["0x" + f"{i:02x}" * 32 for i in range(1, 4)]
+        blocks = {hashes[0]: 1000, hashes[1]: 1001, hashes[2]: 1003}
+        handlers = wait_handlers(blocks, {hashes[1]: 0}, block_receipts=True)
+        with MockNode(handlers) as node:
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["tx", "wait-batch", "-r", node.endpoint, "--poll-interval", "0.01"]
+                + list(reversed(hashes)),
+            )
+            self.assertEqual(3, node.rpc_calls["eth_getTransactionReceipt"])
+            self.assertEqual(3, node.rpc_calls["eth_getBlockReceipts"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("1 transaction(s) failed, 0 timed out", result.stderr)
+        receipts = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(hashes, [r["transactionHash"] for r in receipts])
+        self.assertEqual([1, 0, 1], [r["status"] for r in receipts])
+
+    def test_wait_batch_fallback(self) -> None:
+        """
+        Without eth_getBlockReceipts, the receipts of pending transactions are
+        requested.  `send-batch` output is accepted, and transactions which
+        are not included in time are reported.
+        """
+
+        hashes = ["0x" + f"{i:02x}" * 32 for i in range(1, 4)]
+        handlers = wait_handlers({hashes[0]: 1002}, {}, block_receipts=False)
+        stdin = "\n".join(
+            [
+                json.dumps({"hash": hashes[0], "status": "sent", "error": None}),
+                json.dumps({"hash": hashes[1], "status": "known", "error": None}),
+                json.dumps({"hash": hashes[2], "status": "error", "error": "x"}),
+            ]
+        )
+        with MockNode(handlers) as node:
+            result = CliRunner(mix_stderr=False).invoke(
+                aut,
+                ["tx", "wait-batch", "-r", node.endpoint, "--poll-interval", "0.01"]
+                + ["--timeout", "0.5"],
+                input=stdin,
+            )
+            self.assertEqual(
+                1, node.rpc_calls["eth_getBlockReceipts"]
+            )  # only tried once
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("0 transaction(s) failed, 1 timed out", result.stderr)
+        receipts = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual([hashes[0]], [r["transactionHash"] for r in receipts])
@@ -0,0 +1,110 @@
+"""
+Test waiting for transactions over WebSocket endpoints
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+
+from click.testing import CliRunner
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_DIRECTORY_ENV_VAR
+from tests.mock_node import MockWebSocketNode
+from tests.temp_dirs import use_temp_directories
+
+HASHES = ["0x" + f"{i:02x}" * 32 for i in range(1, 4)]
+
+
+def add_receipt_handlers(node: MockWebSocketNode, blocks: Dict[str, int]) -> None:
+    """
+    Serve receipts for the transactions in `blocks`, once the node reaches the
+    given block numbers.
+    """
+
+    def receipt(tx_hash: str) -> Dict[str, Any]:
+        return {"transactionHash": tx_hash, "blockNumber": hex(blocks[tx_hash])}
+
+    def get_transaction_receipt(params: List[Any]) -> Optional[Dict[str, Any]]:
+        if blocks.get(params[0], node.head + 1) > node.head:
+            return None
+        return {**receipt(params[0]), "status": "0x1"}
+
+    def get_block_receipts(params: List[Any]) -> List[Dict[str, Any]]:
+        number = int(params[0], 16)
+        return [
+            {**receipt(tx_hash), "status": "0x1"}
+            for tx_hash, block in blocks.items()
+            if block == number
+        ]
+
+    node.handlers["eth_getTransactionReceipt"] = get_transaction_receipt
+    node.handlers["eth_getBlockReceipts"] = get_block_receipts
+
+
+class TestTxWait(TestCase):
+    """
+    Test waiting for transactions over WebSocket endpoints
+    """
+
+    def setUp(self) -> None:
+        use_temp_directories(self, CACHE_DIRECTORY_ENV_VAR)
+
+    def test_wait(self) -> None:
+        """
+        `tx wait` subscribes to new blocks, rather than polling for the
+        receipt.
+        """
+
+        with MockWebSocketNode() as node:
+            add_receipt_handlers(node, {HASHES[0]: 1005})
+            result = CliRunner().invoke(
+                aut, ["tx", "wait", "-r", node.endpoint, "-t", "5", HASHES[0]]
+            )
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertEqual(1, node.rpc_calls["eth_subscribe"])
+            self.assertEqual(1, node.rpc_calls["eth_getTransactionReceipt"])
+            self.assertEqual(2, node.rpc_calls["eth_blockNumber"])
+            # The subscription is closed normally, rather than as an error.
+            self.assertEqual([1000], node.wait_closed(1))
+
+        self.assertEqual(1005, json.loads(result.output)["blockNumber"])
+
+    def test_wait_slow_subscription(self) -> None:
+        """
+        If the subscription is not confirmed before the timeout, `tx wait`
+        reports the timeout.
+        """
+
+        with MockWebSocketNode() as node:
+            node.subscribe_latency = 1.0
+            add_receipt_handlers(node, {HASHES[0]: 1005})
+            result = CliRunner(mix_stderr=False).invoke(
+                aut, ["tx", "wait", "-r", node.endpoint, "-t", "0.2", HASHES[0]]
+            )
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIsInstance(result.exception, SystemExit)
+        self.assertIn(f"Transaction {HASHES[0]} timed out", result.stderr)
+
+    def test_wait_batch(self) -> None:
+        """
+        `tx wait-batch` only requests receipts when a new block arrives, and
+        reports transactions which are not included in time.
+        """
+
+        with MockWebSocketNode() as node:
+            add_receipt_handlers(node, {HASHES[0]: 1002, HASHES[1]: 1004})
+            result = CliRunner(mix_stderr=False).invoke(
+                aut, ["tx", "wait-batch", "-r", node.endpoint, "-t", "0.5", *HASHES]
+            )
+            self.assertEqual(1, node.rpc_calls["eth_subscribe"])
+            self.assertEqual(2, node.rpc_calls["eth_blockNumber"])
+            self.assertLessEqual(
+                node.rpc_calls["eth_getBlockReceipts"], node.head - 1000
+            )
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("0 transaction(s) failed, 1 timed out", result.stderr)
+        receipts = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(HASHES[:2], [r["transactionHash"] for r in receipts])
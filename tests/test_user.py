@@ -0,0 +1,177 @@
+"""
+Test user functions
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from click.testing import CliRunner
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+
+from autonity_cli.__main__ import aut
+from autonity_cli.cache import CACHE_TTL_ENV_VAR
+from autonity_cli.user import (
+    get_account_stats,
+    get_block_header,
+    pin_block_identifier,
+)
+from tests.mock_node import Handler, MockNode
+
+ACCOUNTS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(1, 11)]
+
+
+def account_handlers(blocks: Optional[List[str]] = None) -> Dict[str, Handler]:
+    """
+    Handlers for a node where account i has nonce i, i AUT and 2*i NTN.  The
+    block parameter of each request is appended to `blocks`, if given.
+    """
+
+    def record_block(block: str) -> None:
+        if blocks is not None:
+            blocks.append(block)
+
+    def account_index(address: str) -> int:
+        return int(address, 16)
+
+    def eth_call(params: List[Any]) -> str:
+        # balanceOf(address): 4-byte selector, then the address
+        data = params[0].get("data") or params[0]["input"]
+        record_block(params[1])
+        return "0x" + f"{2 * account_index(data[10:]) * 10**18:064x}"
+
+    def get_transaction_count(params: List[Any]) -> str:
+        record_block(params[1])
+        return hex(account_index(params[0]))
+
+    def get_balance(params: List[Any]) -> str:
+        record_block(params[1])
+        return hex(account_index(params[0]) * 10**18)
+
+    return {
+        "eth_getTransactionCount": get_transaction_count,
+        "eth_getBalance": get_balance,
+        "eth_call": eth_call,
+    }
+
+
+class TestUser(TestCase):
+    """
+    Test user functions
+    """
+
+    def setUp(self) -> None:
+        # Disable the on-disk cache, so that all lookups reach the node.
+        env = patch.dict(os.environ, {CACHE_TTL_ENV_VAR: "0"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_account_stats_batching(self) -> None:
+        """
+        Batched and unbatched queries give the same results.
+        """
+
+        with MockNode(account_handlers()) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            unbatched = get_account_stats(w3, ACCOUNTS, batch_size=0)
+            # (web3 may also request the chain ID for each unbatched eth_call)
+            self.assertLessEqual(30, node.http_requests)
+
+            node.reset_counters()
+            batched = get_account_stats(w3, ACCOUNTS, batch_size=12)
+            # eth_blockNumber, 2 batches of nonces and balances, then (with no
+            # Multicall3 deployed) 1 batch of NTN balance calls
+            self.assertEqual(4, node.http_requests)
+            self.assertEqual(31, sum(node.rpc_calls.values()))
+
+        self.assertEqual(unbatched, batched)
+        self.assertEqual(
+            {
+                "account": ACCOUNTS[2],
+                "tx_count": 3,
+                "balance": "3.000000000000000000",
+                "ntn_balance": "6.000000000000000000",
+            },
+            batched[2],
+        )
+
+    def test_account_stats_pinned_block(self) -> None:
+        """
+        All values are read from a single block, resolved from the tag.
+        """
+
+        blocks: List[str] = []
+        with MockNode(account_handlers(blocks)) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            get_account_stats(w3, ACCOUNTS)
+            self.assertEqual(1, node.rpc_calls["eth_blockNumber"])
+            self.assertEqual(30, len(blocks))
+            self.assertEqual({hex(1000)}, set(blocks))
+
+            blocks.clear()
+            get_account_stats(w3, ACCOUNTS, 123)
+            self.assertEqual({hex(123)}, set(blocks))
+
+            blocks.clear()
+            get_account_stats(w3, ACCOUNTS, "pending")
+            self.assertEqual({"pending"}, set(blocks))
+
+    def test_block_header(self) -> None:
+        """
+        Headers are requested without the block body, falling back to a block
+        with transaction hashes (with the body fields removed) on nodes which
+        do not support header requests.
+        """
+
+        block = {
+            "number": hex(7),
+            "hash": "0x" + "07" * 32,
+            "timestamp": hex(1700000000),
+            "baseFeePerGas": hex(10),
+        }
+        body = {"transactions": ["0x" + "aa" * 32] * 500, "uncles": []}
+        handlers: Dict[str, Handler] = {
+            "eth_getBlockByNumber": lambda _: {**block, **body},
+            "eth_getBlockByHash": lambda _: {**block, **body},
+        }
+        expected = {
+            "number": 7,
+            "hash": HexBytes(block["hash"]),
+            "timestamp": 1700000000,
+            "baseFeePerGas": 10,
+        }
+
+        with MockNode(handlers) as node:
+            w3 = Web3(Web3.HTTPProvider(node.endpoint))
+            self.assertEqual(expected, dict(get_block_header(w3, 7)))
+            self.assertEqual(
+                expected, dict(get_block_header(w3, HexBytes(block["hash"])))
+            )
+            self.assertEqual(7, pin_block_identifier(w3, HexBytes(block["hash"])))
+
+            node.handlers["eth_getHeaderByNumber"] = lambda _: block
+            node.handlers["eth_getHeaderByHash"] = lambda _: block
+            node.reset_counters()
+            self.assertEqual(expected, dict(get_block_header(w3, 7)))
+            self.assertEqual(expected, dict(get_block_header(w3, "latest")))
+            self.assertEqual(
+                expected, dict(get_block_header(w3, HexBytes(block["hash"])))
+            )
+            self.assertEqual(0, node.rpc_calls["eth_getBlockByNumber"])
+            self.assertEqual(0, node.rpc_calls["eth_getBlockByHash"])
+
+            result = CliRunner(mix_stderr=False).invoke(
+                aut, ["block", "get", "--header-only", "-r", node.endpoint, "7"]
+            )
+            self.assertEqual(0, result.exit_code, result.stderr)
+            self.assertEqual(
+                {**expected, "hash": block["hash"]}, json.loads(result.stdout)
+            )
+
+            node.handlers["eth_getHeaderByNumber"] = lambda _: None
+            with self.assertRaises(BlockNotFound):
+                get_block_header(w3, 8)
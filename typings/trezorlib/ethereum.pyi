@@ -12,6 +12,9 @@ def get_address(
     encoded_network: Optional[bytes] = None,
     chunkify: bool = False,
 ) -> str: ...
+def get_public_node(
+    client: TrezorClient, n: Address, show_display: bool = False
+) -> messages.EthereumPublicKey: ...
 def sign_tx(
     client: TrezorClient,
     n: Address,